@@ -0,0 +1,199 @@
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+import tracing
+from generate_post import generate_post_with_deepseek, save_generated_post
+
+log = logging.getLogger(__name__)
+
+# 批量生成的输出目录、任务队列文件
+OUTPUT_DIR = "generated_posts"
+QUEUE_FILE = os.path.join(OUTPUT_DIR, "queue.json")
+# 同时进行的 DeepSeek 请求数
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "3"))
+MAX_ATTEMPTS = 3
+
+
+def _file_stem(repo):
+    """输出文件名：日期 + 仓库名"""
+    name = re.sub(r"[^A-Za-z0-9\-_.]", "-", repo["name"].replace("/", "__"))
+    return f"{repo.get('date') or datetime.now().strftime('%Y-%m-%d')}-{name}"
+
+
+class JobQueue:
+    """
+    持久化的生成任务队列，以仓库 URL 为键。
+    每次状态变化都以“写临时文件 + rename”的方式原子落盘，进程中断后可继续。
+    """
+
+    PENDING = "pending"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    def __init__(self, path=QUEUE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self.jobs = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.jobs = json.load(f).get("jobs") or {}
+            # 上次中断时正在运行的任务重新排队
+            for job in self.jobs.values():
+                if job["status"] == self.RUNNING:
+                    job["status"] = self.PENDING
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"jobs": self.jobs}, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def add(self, repos):
+        """加入新任务，已在队列中的仓库忽略；返回新增数量"""
+        added = 0
+        with self._lock:
+            for repo in repos:
+                if repo["url"] in self.jobs:
+                    continue
+                self.jobs[repo["url"]] = {
+                    "repo": repo,
+                    "status": self.PENDING,
+                    "attempts": 0,
+                    "error": None,
+                    "output": None,
+                }
+                added += 1
+            self._save()
+        return added
+
+    def retry_failed(self):
+        """把失败的任务重新放回队列"""
+        with self._lock:
+            for job in self.jobs.values():
+                if job["status"] == self.FAILED:
+                    job["status"] = self.PENDING
+                    job["attempts"] = 0
+            self._save()
+
+    def pending(self):
+        with self._lock:
+            return [job["repo"] for job in self.jobs.values() if job["status"] == self.PENDING]
+
+    def update(self, url, **fields):
+        with self._lock:
+            self.jobs[url].update(fields)
+            self._save()
+
+    def get(self, url):
+        with self._lock:
+            return dict(self.jobs[url])
+
+    def summary(self):
+        with self._lock:
+            counts = {}
+            for job in self.jobs.values():
+                counts[job["status"]] = counts.get(job["status"], 0) + 1
+            return counts
+
+
+def _run_job(queue, repo, output_dir, max_attempts):
+    """生成单篇文章，失败时独立重试，不影响其他任务"""
+    url = repo["url"]
+    stem = _file_stem(repo)
+    partial_file = os.path.join(output_dir, f"{stem}.partial")
+    output_file = os.path.join(output_dir, f"{stem}.json")
+
+    while True:
+        attempts = queue.get(url)["attempts"] + 1
+        queue.update(url, status=JobQueue.RUNNING, attempts=attempts)
+        log.info("[%s] 开始生成（第 %d 次）", repo['name'], attempts)
+        try:
+            title, content = generate_post_with_deepseek(repo, partial_file=partial_file)
+            error = None if (title and content) else "生成结果为空"
+        except Exception as e:
+            title, content, error = None, None, str(e)
+
+        if error is None:
+            save_generated_post(title, content, repo, output_file=output_file)
+            queue.update(url, status=JobQueue.DONE, error=None, output=output_file)
+            return True
+
+        log.warning("[%s] 生成失败: %s", repo['name'], error)
+        if attempts >= max_attempts:
+            queue.update(url, status=JobQueue.FAILED, error=error)
+            return False
+        queue.update(url, status=JobQueue.PENDING, error=error)
+        time.sleep(min(30, 2 ** attempts))
+
+
+def run_batch(repos=None, output_dir=OUTPUT_DIR, concurrency=BATCH_CONCURRENCY,
+              max_attempts=MAX_ATTEMPTS, retry_failed=False):
+    """
+    批量生成文章。repos 会先加入持久化队列，然后以有限并发处理所有待处理任务；
+    成功的文章写入 output_dir 下与 generated_post.json 同格式的文件。
+    返回各状态的任务数。
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    queue = JobQueue(os.path.join(output_dir, "queue.json"))
+    if repos:
+        added = queue.add(repos)
+        log.info("新增 %d 个任务", added)
+    if retry_failed:
+        queue.retry_failed()
+
+    pending = queue.pending()
+    log.info("待处理任务: %d，并发数: %d", len(pending), concurrency)
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(_run_job, queue, repo, output_dir, max_attempts): repo for repo in pending}
+        for future in as_completed(futures):
+            repo = futures[future]
+            ok = future.result()
+            log.info("[%s] %s", repo['name'], '✅ 完成' if ok else '❌ 放弃')
+
+    summary = queue.summary()
+    log.info("批量生成结束: %s", summary)
+    return summary
+
+
+def _load_repos(path):
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data if isinstance(data, list) else [data]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="批量生成 GitHub Trending 文章")
+    parser.add_argument("--input", help="仓库列表 JSON 文件；不指定时抓取当前 Trending 列表")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR)
+    parser.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    parser.add_argument("--limit", type=int, default=None, help="最多加入多少个仓库")
+    parser.add_argument("--include-processed", action="store_true", help="不跳过 processed_repos.csv 中的仓库")
+    parser.add_argument("--retry-failed", action="store_true", help="重新处理之前失败的任务")
+    args = parser.parse_args()
+    tracing.configure_logging()
+
+    if args.input:
+        repos = _load_repos(args.input)
+    else:
+        from github_daily import get_trending_repos
+        repos = get_trending_repos() or []
+    if not args.include_processed:
+        from github_daily import load_processed_repos
+        processed = load_processed_repos()
+        repos = [r for r in repos if r["url"] not in processed]
+    if args.limit is not None:
+        repos = repos[:args.limit]
+
+    summary = run_batch(repos, args.output_dir, args.concurrency, retry_failed=args.retry_failed)
+    tracing.log_summary()
+    if summary.get(JobQueue.FAILED):
+        exit(1)
@@ -0,0 +1,380 @@
+"""
+流水线热点函数的微基准。
+
+    python benchmarks/bench.py                       # 全部用例，结果写入 benchmarks/results/latest.json
+    python benchmarks/bench.py -k dedup --sizes 1000,100000
+    python benchmarks/bench.py --save-baseline       # 把本次结果保存为 benchmarks/baseline.json
+    python benchmarks/bench.py --compare             # 与 baseline.json 对比，变慢超过阈值时退出码为 1
+
+输入都是合成数据，不是从线上录制的：
+  fixtures/trending.html       精简的 Trending 页面（25 个 article 占页面约 80%，用于功能性用例）
+  fixtures/trending_full.html  按 github.com/trending（未登录）的结构和体积构造的页面：约 1MB，
+                               页头、语言筛选菜单、内嵌 JSON 等占约 3/4，article 带 svg、hydro 属性和 Sponsor 按钮
+  fixtures/article.html        示例文章，按规模放大
+解析器的回归和提速以 trending_full.html 为准。只测本地计算与磁盘 I/O，不访问网络。
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+# 快照写到临时目录，避免基准污染 trending_history/（必须在导入 github_daily 之前设置）
+_WORKDIR = tempfile.mkdtemp(prefix="onedaygithub-bench-")
+os.environ.setdefault("TRENDING_HISTORY_DIR", os.path.join(_WORKDIR, "history"))
+
+import github_daily  # noqa: E402
+import trending_crawler  # noqa: E402
+import trending_parser  # noqa: E402
+from generate_post import _derive_tags_from_repo, extract_title_and_content  # noqa: E402
+from html_normalizer import normalize_html  # noqa: E402
+from publish_to_halo import generate_unique_slug  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results", "latest.json")
+BASELINE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+# processed_repos.csv 的行数规模
+ROW_SIZES = (1_000, 100_000, 1_000_000)
+# 生成文章的大小（字符数）
+TEXT_SIZES = (10_000, 200_000, 1_000_000)
+# 中位数比基线慢多少（比例）视为回归
+REGRESSION_THRESHOLD = 0.2
+
+_BENCHMARKS = []
+
+
+def benchmark(name: str, sizes=None):
+    """注册一个用例。fn(size) 返回 (被测函数, 每次调用前的准备函数或 None)，准备函数不计时"""
+    def register(fn):
+        _BENCHMARKS.append((name, sizes, fn))
+        return fn
+    return register
+
+
+def _fixture(name: str) -> str:
+    with open(os.path.join(FIXTURES, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+@contextlib.contextmanager
+def _quiet():
+    """被测函数会打印进度，计时时丢弃输出"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+# ---- 合成数据 ----
+def _raw_article(size: int) -> str:
+    """示例文章放大到 size 个字符，并混入 ``` 代码块和行内反引号，形状与 DeepSeek 原始输出一致"""
+    body = _fixture("article.html")
+    block = (
+        "\n<p>安装之后运行 `codex --help` 查看所有子命令：</p>\n"
+        "```bash\nnpm install -g @openai/codex\ncodex \"explain this repo\" <<< 'a && b'\n```\n"
+        "<h3>小结</h3>\n"
+    )
+    parts = ["Codex 降临终端：不再是盯着 IDE 干活的时代了 🤖\n"]
+    total = len(parts[0])
+    while total < size:
+        parts.append(body)
+        parts.append(block)
+        total += len(body) + len(block)
+    return "".join(parts)[:size]
+
+
+def _readme(size: int) -> str:
+    paragraph = (
+        "## Features\n\nCodex is a lightweight coding agent written in Rust and TypeScript. "
+        "It runs in your terminal, talks to the OpenAI API, supports Docker sandboxes, "
+        "MCP servers, and can be scripted from GitHub Actions or a Node.js CLI.\n\n"
+    )
+    return (paragraph * (size // len(paragraph) + 1))[:size]
+
+
+def _write_csv(path: str, rows: int):
+    """写一个 rows 行的 processed_repos.csv（URL 互不相同）"""
+    rng = random.Random(rows)
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        f.write("name,url,processed_date\n")
+        for i in range(rows):
+            name = f"owner{rng.randrange(rows)}/repo-{i}"
+            f.write(f"{name},https://github.com/{name},2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}\n")
+
+
+class _FixtureClient:
+    """代替 http_client：所有 Trending 页面都返回同一份 fixture HTML"""
+
+    def __init__(self, html: str):
+        self.html = html
+
+    def get(self, url, **kwargs):
+        return SimpleNamespace(status_code=200, text=self.html)
+
+
+# ---- Trending 解析 ----
+@benchmark("trending.parse_trending", sizes=tuple(trending_parser.available_backends()))
+def bench_parse_trending(backend):
+    html = _fixture("trending.html")
+    return (lambda: trending_parser.parse_trending(html, backend)), None
+
+
+@benchmark("trending.parse_trending_full", sizes=tuple(trending_parser.available_backends()))
+def bench_parse_trending_full(backend):
+    """接近真实体积的页面，article 之外的部分占大头"""
+    html = _fixture("trending_full.html")
+    return (lambda: trending_parser.parse_trending(html, backend)), None
+
+
+@benchmark("trending.get_trending_repos", sizes=(1, 15))
+def bench_get_trending_repos(pages):
+    """pages 个榜单（since × language）共用同一份接近真实体积的页面，包含解析、合并和快照记录"""
+    trending_crawler.http_client = _FixtureClient(_fixture("trending_full.html"))
+    sinces = list(trending_crawler.SINCE_VALUES)[:max(1, pages // 5)]
+    languages = ["", "python", "typescript", "rust", "go"][:max(1, pages // len(sinces))]
+
+    def run():
+        with _quiet():
+            return github_daily.get_trending_repos(sinces, languages)
+    return run, None
+
+
+# ---- 去重索引 ----
+def _dedup_dir(rows: int) -> str:
+    """每个规模一个工作目录，CSV 只生成一次"""
+    path = os.path.join(_WORKDIR, f"dedup-{rows}")
+    if not os.path.isdir(path):
+        os.makedirs(path)
+        _write_csv(os.path.join(path, github_daily.CSV_FILE), rows)
+    return path
+
+
+def _in_dir(path: str, fn):
+    def run():
+        cwd = os.getcwd()
+        os.chdir(path)
+        try:
+            with _quiet():
+                return fn()
+        finally:
+            os.chdir(cwd)
+    return run
+
+
+@benchmark("dedup.load_processed_repos.cold", sizes=ROW_SIZES)
+def bench_load_cold(rows):
+    """没有 SQLite 索引时首次加载（全量导入 CSV）"""
+    path = _dedup_dir(rows)
+    db = os.path.join(path, "processed_repos.db")
+
+    def reset():
+        if os.path.exists(db):
+            os.remove(db)
+    return _in_dir(path, lambda: github_daily.load_processed_repos().close()), reset
+
+
+@benchmark("dedup.load_processed_repos.warm", sizes=ROW_SIZES)
+def bench_load_warm(rows):
+    """索引已是最新时的启动开销"""
+    path = _dedup_dir(rows)
+    _in_dir(path, lambda: github_daily.load_processed_repos().close())()
+    return _in_dir(path, lambda: github_daily.load_processed_repos().close()), None
+
+
+@benchmark("dedup.save_processed_repo", sizes=ROW_SIZES)
+def bench_save(rows):
+    """向 rows 行的历史追加一个仓库（加锁、fsync、校验、增量更新索引）"""
+    path = _dedup_dir(rows)
+    store = _in_dir(path, github_daily.load_processed_repos)()
+    counter = iter(range(10 ** 9))
+
+    def save():
+        i = next(counter)
+        github_daily.save_processed_repo({"name": f"bench/new-{i}", "url": f"https://github.com/bench/new-{i}"}, store)
+    return _in_dir(path, save), None
+
+
+# ---- 生成文章的规范化 ----
+@benchmark("generate.normalize_html", sizes=TEXT_SIZES)
+def bench_normalize_html(size):
+    text = _raw_article(size)
+    return (lambda: normalize_html(text)), None
+
+
+@benchmark("generate.extract_title_and_content", sizes=TEXT_SIZES)
+def bench_extract_title_and_content(size):
+    text = _raw_article(size)
+    return (lambda: extract_title_and_content(text)), None
+
+
+# ---- 标签与 slug ----
+@benchmark("tags.derive_tags_from_repo", sizes=(0, 20_000))
+def bench_derive_tags(readme_chars):
+    repo = json.loads(_fixture("repo.json"))
+    repo["meta"]["readme_excerpt"] = _readme(readme_chars)
+    return (lambda: _derive_tags_from_repo(repo, exclude=("GitHub", "Trending"))), None
+
+
+@benchmark("publish.generate_unique_slug")
+def bench_generate_unique_slug(_):
+    names = [repo["name"] for repo in trending_parser.parse_trending(_fixture("trending.html"))]
+
+    def run():
+        for name in names:
+            generate_unique_slug(name, "2026-08-22")
+    return run, None
+
+
+# ---- 计时与报告 ----
+def measure(fn, setup=None, repeat: int = 5, min_time: float = 0.2) -> dict:
+    """
+    每轮至少运行 min_time 秒（自动决定调用次数），重复 repeat 轮，返回每次调用的耗时统计（秒）。
+    有 setup 时每次调用前执行一次且不计时，此时每轮只调用一次。
+    """
+    number = 1
+    if setup is None:
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time or number >= 10 ** 6:
+                break
+            number *= 10 if elapsed < min_time / 10 else 2
+
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "number": number,
+        "repeat": repeat,
+    }
+
+
+def run_benchmarks(select=(), sizes=None, repeat: int = 5, min_time: float = 0.2) -> dict:
+    results = {}
+    for name, case_sizes, fn in _BENCHMARKS:
+        if select and not any(s in name for s in select):
+            continue
+        for size in (case_sizes or (None,)):
+            if sizes and case_sizes == ROW_SIZES and size not in sizes:
+                continue
+            label = name if size is None else f"{name}[{size}]"
+            target, setup = fn(size)
+            # 百万行级别的用例单次就要数秒，减少重复次数
+            rounds = min(repeat, 3) if case_sizes == ROW_SIZES and size >= 1_000_000 else repeat
+            stats = measure(target, setup, rounds, min_time)
+            results[label] = stats
+            print(f"{label:<50} {_fmt(stats['median']):>10}  (min {_fmt(stats['min'])}, x{stats['number']})")
+    return results
+
+
+def _fmt(seconds: float) -> str:
+    for unit, scale in (("s", 1), ("ms", 1e-3), ("µs", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:.2f}{unit}"
+    return f"{seconds / 1e-9:.0f}ns"
+
+
+def environment() -> dict:
+    return {
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "parsers": trending_parser.available_backends(),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+    }
+
+
+def save_results(results: dict, path: str):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"environment": environment(), "results": results}, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {path}")
+
+
+def compare(results: dict, baseline: dict, threshold: float = REGRESSION_THRESHOLD) -> list:
+    """按中位数与基线对比，打印每个用例的变化，返回变慢超过 threshold 的用例名"""
+    regressions = []
+    for label, stats in results.items():
+        base = baseline.get(label)
+        if not base:
+            print(f"{label:<50} {'(基线中没有)':>10}")
+            continue
+        ratio = stats["median"] / base["median"] if base["median"] else float("inf")
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  ⚠️ 回归"
+            regressions.append(label)
+        elif ratio < 1 / (1 + threshold):
+            flag = "  ✅ 变快"
+        print(f"{label:<50} {_fmt(base['median']):>10} -> {_fmt(stats['median']):>10}  x{ratio:.2f}{flag}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="流水线热点函数微基准")
+    parser.add_argument("-k", dest="select", action="append", default=[], help="只运行名称包含该字符串的用例（可重复）")
+    parser.add_argument("--sizes", help="去重用例的 CSV 行数，逗号分隔（默认 1000,100000,1000000）")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2, help="每轮最少运行的秒数")
+    parser.add_argument("--output", default=RESULTS_FILE)
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--compare", action="store_true", help="与基线对比，有回归时退出码为 1")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD, help="回归阈值（比例）")
+    parser.add_argument("--list", action="store_true", help="只列出用例")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for name, sizes, _ in _BENCHMARKS:
+            print(name if not sizes else f"{name}{list(sizes)}")
+        return 0
+
+    sizes = {int(s) for s in args.sizes.split(",")} if args.sizes else None
+    try:
+        results = run_benchmarks(args.select, sizes, args.repeat, args.min_time)
+    finally:
+        shutil.rmtree(_WORKDIR, ignore_errors=True)
+    save_results(results, args.output)
+    if args.save_baseline:
+        save_results(results, args.baseline)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"基线文件不存在: {args.baseline}（先用 --save-baseline 生成）")
+            return 1
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f).get("results") or {}
+        print(f"\n=== 与基线对比（阈值 {args.threshold:.0%}）===")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} 个用例变慢: {', '.join(regressions)}")
+            return 1
+        print("\n没有发现回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
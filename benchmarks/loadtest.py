@@ -0,0 +1,243 @@
+"""
+端到端压测：在本地测试桩（benchmarks/stubs.py）上反复运行 抓取 → 生成 → 发布，
+统计每次发布的请求数、各阶段耗时和尾延迟。不会访问 github.com、DeepSeek 或线上 Halo。
+
+    python benchmarks/loadtest.py --runs 50 --repos 100
+    python benchmarks/loadtest.py --runs 20 --concurrency 4 --llm-latency 1.5 --no-stream
+    python benchmarks/loadtest.py --runs 20 --output load.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from stubs import ChatStub, GitHubStub, HaloStub  # noqa: E402
+
+STAGES = ("fetch", "generate", "publish")
+
+
+def percentile(values, pct: float) -> float:
+    """最近秩百分位数，values 为空时返回 0"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, math.ceil(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def _summary(values) -> dict:
+    return {
+        "count": len(values),
+        "p50": percentile(values, 50),
+        "p95": percentile(values, 95),
+        "p99": percentile(values, 99),
+        "max": max(values) if values else 0.0,
+        "total": sum(values),
+    }
+
+
+def configure_environment(workdir: str, github: GitHubStub, chat: ChatStub, halo: HaloStub, stream: bool):
+    """
+    让三个脚本指向测试桩，所有本地状态（CSV、SQLite、台账、缓存、快照）写到 workdir。
+    必须在导入流水线模块之前调用，部分配置在导入时读取。
+    """
+    os.environ.update({
+        "GITHUB_TRENDING_URL": f"{github.url}/trending",
+        "DEEPSEEK_API_URL": f"{chat.url}/chat/completions",
+        "DEEPSEEK_API_KEY": "sk-stub-loadtest",
+        "DEEPSEEK_STREAM": "1" if stream else "0",
+        "HALO_URL": halo.url,
+        "HALO_TOKEN": "pat-stub-loadtest",
+        "LLM_CACHE_BYPASS": "1",
+        "LLM_CACHE_DIR": os.path.join(workdir, ".llm_cache"),
+        "TRENDING_HISTORY_DIR": os.path.join(workdir, "trending_history"),
+        "PUBLISH_LEDGER": os.path.join(workdir, "publish_ledger.json"),
+        "HALO_TAXONOMY_CACHE": os.path.join(workdir, ".halo_taxonomy_cache.json"),
+        "GITHUB_META_CACHE": os.path.join(workdir, ".github_meta_cache.json"),
+        "DEDUP_DB": os.path.join(workdir, "processed_repos.db"),
+        "NO_PROXY": "127.0.0.1,localhost",
+        "no_proxy": "127.0.0.1,localhost",
+    })
+    # 没有 GITHUB_TOKEN 时跳过 GraphQL 元数据补充
+    os.environ.pop("GITHUB_TOKEN", None)
+    os.chdir(workdir)
+
+
+class LoadTest:
+    """按 runs 次发布驱动 github_daily / generate_post / publish_to_halo，记录每个阶段的耗时"""
+
+    def __init__(self, workdir: str):
+        import github_daily
+        import generate_post
+        import publish_to_halo
+
+        self.workdir = workdir
+        self.github_daily = github_daily
+        self.generate_post = generate_post
+        self.publish_to_halo = publish_to_halo
+        self.timings = defaultdict(list)
+        self.outcomes = Counter()
+        self._fetch_lock = threading.Lock()
+        self._timings_lock = threading.Lock()
+
+    def _timed(self, stage: str, fn, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            with self._timings_lock:
+                self.timings[stage].append(time.perf_counter() - start)
+
+    def _fetch(self):
+        # 选仓库并写入 CSV 需要串行，否则并发的运行会选中同一个仓库
+        with self._fetch_lock:
+            return self.github_daily.get_trending_repo()
+
+    def _generate(self, repo: dict, index: int):
+        if self.publish_to_halo.preflight(repo):
+            return None
+        title, content = self.generate_post.generate_post_with_deepseek(
+            repo, partial_file=os.path.join(self.workdir, f"generated_post.{index}.partial"))
+        if not (title and content):
+            return None
+        return self.generate_post.build_post_data(title, content, repo)
+
+    def run_once(self, index: int) -> str:
+        start = time.perf_counter()
+        try:
+            repo = self._timed("fetch", self._fetch)
+            if not repo:
+                return "fetch_failed"
+            post = self._timed("generate", self._generate, repo, index)
+            if not post:
+                return "generate_failed"
+            result = self._timed("publish", self.publish_to_halo.publish_to_halo, post)
+            return "published" if result and not result.get("already_published") else "publish_failed"
+        finally:
+            with self._timings_lock:
+                self.timings["run"].append(time.perf_counter() - start)
+
+    def run(self, runs: int, concurrency: int = 1) -> float:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            for outcome in pool.map(self.run_once, range(runs)):
+                self.outcomes[outcome] += 1
+        return time.perf_counter() - start
+
+
+def build_report(test: LoadTest, servers: dict, wall: float) -> dict:
+    published = test.outcomes["published"]
+    requests_by_route = {}
+    latency_by_route = {}
+    totals = {}
+    for service, server in servers.items():
+        records = list(server.records)
+        totals[service] = {
+            "requests": len(records),
+            "bytes": sum(r.bytes for r in records),
+            "errors": sum(1 for r in records if r.status >= 400),
+        }
+        by_route = defaultdict(list)
+        for r in records:
+            by_route[r.route].append(r)
+        for route, items in sorted(by_route.items()):
+            requests_by_route[route] = len(items)
+            latency_by_route[route] = _summary([r.seconds for r in items])
+    per_publish = {
+        service: (t["requests"] / published if published else None) for service, t in totals.items()
+    }
+    return {
+        "runs": sum(test.outcomes.values()),
+        "outcomes": dict(test.outcomes),
+        "wall_seconds": wall,
+        "publishes_per_minute": published / wall * 60 if wall else 0.0,
+        "requests_per_publish": per_publish,
+        "requests_per_publish_total": (
+            sum(t["requests"] for t in totals.values()) / published if published else None),
+        "services": totals,
+        "requests_by_route": requests_by_route,
+        "stages": {stage: _summary(values) for stage, values in test.timings.items()},
+        "server_latency": latency_by_route,
+    }
+
+
+def print_report(report: dict):
+    print("\n=== 压测结果 ===")
+    print(f"运行 {report['runs']} 次，结果: {report['outcomes']}")
+    print(f"总耗时 {report['wall_seconds']:.2f}s，吞吐 {report['publishes_per_minute']:.1f} 篇/分钟")
+    if report["requests_per_publish_total"] is not None:
+        per = ", ".join(f"{s} {v:.1f}" for s, v in report["requests_per_publish"].items())
+        print(f"每次发布的请求数: {report['requests_per_publish_total']:.1f}（{per}）")
+
+    print(f"\n{'阶段':<12}{'次数':>6}{'p50':>10}{'p95':>10}{'p99':>10}{'max':>10}")
+    for stage in STAGES + ("run",):
+        s = report["stages"].get(stage)
+        if s:
+            print(f"{stage:<12}{s['count']:>6}{s['p50']:>10.3f}{s['p95']:>10.3f}{s['p99']:>10.3f}{s['max']:>10.3f}")
+
+    print(f"\n{'接口':<24}{'请求数':>8}{'p50':>10}{'p95':>10}{'p99':>10}")
+    for route, s in report["server_latency"].items():
+        print(f"{route:<24}{s['count']:>8}{s['p50']:>10.4f}{s['p95']:>10.4f}{s['p99']:>10.4f}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="在本地测试桩上端到端压测 抓取 → 生成 → 发布")
+    parser.add_argument("--runs", type=int, default=20, help="发布次数（每次选一个新仓库）")
+    parser.add_argument("--repos", type=int, default=100, help="Trending 页面上的仓库数")
+    parser.add_argument("--concurrency", type=int, default=1, help="同时进行的运行数")
+    parser.add_argument("--no-stream", dest="stream", action="store_false", help="使用非流式 DeepSeek 调用")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="chat 接口的首 token 延迟（秒）")
+    parser.add_argument("--llm-chunk-delay", type=float, default=0.002, help="流式分块之间的间隔（秒）")
+    parser.add_argument("--llm-chunk-chars", type=int, default=40, help="每个流式分块的字符数")
+    parser.add_argument("--github-latency", type=float, default=0.05, help="Trending 页面的响应延迟（秒）")
+    parser.add_argument("--halo-latency", type=float, default=0.01, help="Halo 接口的响应延迟（秒）")
+    parser.add_argument("--output", help="把结果写入 JSON 文件")
+    parser.add_argument("--verbose", action="store_true", help="保留流水线自身的输出")
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output) if args.output else None
+    servers = {
+        "github": GitHubStub(args.repos, args.github_latency).start(),
+        "llm": ChatStub(args.llm_latency, args.llm_chunk_delay, args.llm_chunk_chars).start(),
+        "halo": HaloStub(args.halo_latency).start(),
+    }
+    cwd = os.getcwd()
+    workdir = tempfile.mkdtemp(prefix="onedaygithub-load-")
+    try:
+        configure_environment(workdir, servers["github"], servers["llm"], servers["halo"], args.stream)
+        test = LoadTest(workdir)
+        print(f"测试桩: github={servers['github'].url} llm={servers['llm'].url} halo={servers['halo'].url}")
+        print(f"开始压测: {args.runs} 次发布，并发 {args.concurrency}，流式={args.stream}")
+        quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+        with quiet:
+            wall = test.run(args.runs, args.concurrency)
+        report = build_report(test, servers, wall)
+    finally:
+        os.chdir(cwd)
+        for server in servers.values():
+            server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    print_report(report)
+    if output:
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"\n结果已写入 {output}")
+    return 0 if report["outcomes"].get("published") == report["runs"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
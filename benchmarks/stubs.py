@@ -0,0 +1,323 @@
+"""
+本地测试桩：GitHub Trending 页面、OpenAI 兼容的 chat 接口（流式 / 非流式）、Halo 的
+content.halo.run 与 api.console.halo.run 接口（内存状态）。
+每个桩一个 HTTP/1.1 服务（支持 keep-alive），记录每个请求的路由、状态码、字节数和服务端耗时。
+GET 的 200 响应带 ETag，请求带匹配的 If-None-Match 时返回 304（用于验证 http_cache 的条件请求）。
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import namedtuple
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+RequestRecord = namedtuple("RequestRecord", "route status bytes seconds")
+
+_LANGUAGES = ("Python", "TypeScript", "Rust", "Go", "C++", "JavaScript", "Zig", "")
+
+
+class StubServer(ThreadingHTTPServer):
+    """在后台线程运行的桩服务，handler 通过 self.server 访问状态"""
+
+    daemon_threads = True
+
+    def __init__(self, handler, host: str = "127.0.0.1", port: int = 0):
+        super().__init__((host, port), handler)
+        self.records = []
+        self._records_lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, route: str, status: int, size: int, seconds: float):
+        with self._records_lock:
+            self.records.append(RequestRecord(route, status, size, seconds))
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _begin(self):
+        self._started = time.perf_counter()
+        self._route = "?"
+        self._sent = 0
+
+    def _body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _send(self, status: int, body, content_type: str = "application/json"):
+        if not isinstance(body, (bytes, str)):
+            body = json.dumps(body, ensure_ascii=False)
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        if self.command == "GET" and status == 200:
+            etag = '"' + hashlib.sha1(body).hexdigest()[:16] + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return self._finish(304)
+        self.send_response(status)
+        if self.command == "GET" and status == 200:
+            self.send_header("ETag", etag)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        self._sent += len(body)
+        self._finish(status)
+
+    def _finish(self, status: int):
+        self.server.record(self._route, status, self._sent, time.perf_counter() - self._started)
+
+
+# ---- GitHub Trending ----
+def trending_html(count: int, offset: int = 0) -> str:
+    """生成一个含 count 个 Box-row 仓库的 Trending 页面，结构与 github.com/trending 一致"""
+    articles = []
+    for i in range(offset, offset + count):
+        name = f"stub-owner{i % 50}/project-{i}"
+        language = _LANGUAGES[i % len(_LANGUAGES)]
+        lang_html = (
+            f'<span class="d-inline-block ml-0 mr-3"><span itemprop="programmingLanguage">{language}</span></span>'
+            if language else ""
+        )
+        articles.append(f"""<article class="Box-row">
+  <h2 class="h3 lh-condensed"><a href="/{name}" class="Link"><span class="text-normal">{name.split('/')[0]} /</span> {name.split('/')[1]}</a></h2>
+  <p class="col-9 color-fg-muted my-1 pr-4">A {language or 'polyglot'} toolkit for building fast command-line agents, number {i}</p>
+  <div class="f6 color-fg-muted mt-2">{lang_html}
+    <a href="/{name}/stargazers" class="Link Link--muted d-inline-block mr-3">{(100000 - i * 37) % 90000 + 500:,}</a>
+    <a href="/{name}/forks" class="Link Link--muted d-inline-block mr-3">{(7000 - i * 11) % 6000 + 20:,}</a>
+    <span class="d-inline-block mr-3">Built by <a href="/u{i}"><img class="avatar mb-1" alt="@u{i}" /></a></span>
+    <span class="d-inline-block float-sm-right">{(4000 - i * 13) % 3900 + 10:,} stars today</span>
+  </div>
+</article>""")
+    return (
+        "<!DOCTYPE html><html><head><title>Trending repositories on GitHub today</title></head><body>"
+        "<header>GitHub</header><main><div class=\"Box\">\n" + "\n".join(articles) +
+        "\n</div></main><footer>© GitHub</footer></body></html>"
+    )
+
+
+class GitHubHandler(_Handler):
+    """GET /trending[/language]?since=...；每个榜单返回 server.repo_count 个仓库"""
+
+    def do_GET(self):
+        self._begin()
+        parts = urlsplit(self.path)
+        if not parts.path.startswith("/trending"):
+            self._route = "github.other"
+            return self._send(404, {"message": "Not Found"})
+        self._route = "github.trending"
+        time.sleep(self.server.latency)
+        self._send(200, self.server.page(parts.path), "text/html; charset=utf-8")
+
+
+class GitHubStub(StubServer):
+    def __init__(self, repo_count: int = 25, latency: float = 0.0, **kwargs):
+        super().__init__(GitHubHandler, **kwargs)
+        self.repo_count = repo_count
+        self.latency = latency
+        self._pages = {}
+
+    def page(self, path: str) -> str:
+        # 不同语言的榜单给出不同（部分重叠）的仓库
+        page = self._pages.get(path)
+        if page is None:
+            offset = 0 if path.rstrip("/") == "/trending" else (len(self._pages) * self.repo_count // 2)
+            page = self._pages.setdefault(path, trending_html(self.repo_count, offset))
+        return page
+
+
+# ---- DeepSeek（OpenAI 兼容 chat/completions）----
+def _article_template() -> str:
+    with open(os.path.join(FIXTURES, "article.html"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+class ChatHandler(_Handler):
+    """
+    POST */chat/completions。latency 为首 token 延迟；流式时按 chunk_chars 分块、
+    每块间隔 chunk_delay 秒，非流式时等价地等待全部生成完再返回。
+    """
+
+    def do_POST(self):
+        self._begin()
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._route = "llm.other"
+            return self._send(404, {"error": {"message": "not found"}})
+        if not (self.headers.get("Authorization") or "").startswith("Bearer "):
+            self._route = "llm.chat"
+            return self._send(401, {"error": {"message": "missing api key"}})
+        request = json.loads(self._body() or b"{}")
+        stream = bool(request.get("stream"))
+        self._route = "llm.chat.stream" if stream else "llm.chat"
+        prompt = "".join(m.get("content") or "" for m in request.get("messages") or [])
+        content = self.server.completion(prompt)
+        usage = {
+            "prompt_tokens": len(prompt) // 2,
+            "completion_tokens": len(content) // 2,
+            "total_tokens": (len(prompt) + len(content)) // 2,
+        }
+        chunks = [content[i:i + self.server.chunk_chars] for i in range(0, len(content), self.server.chunk_chars)]
+        time.sleep(self.server.latency)
+        if not stream:
+            time.sleep(self.server.chunk_delay * len(chunks))
+            return self._send(200, {
+                "id": "stub", "object": "chat.completion", "model": request.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, piece in enumerate(chunks):
+            if i:
+                time.sleep(self.server.chunk_delay)
+            self._event({"choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}]})
+        self._event({"choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}], "usage": usage})
+        self._write_chunk(b"data: [DONE]\n\n")
+        self._write_chunk(b"")
+        self._finish(200)
+
+    def _event(self, payload: dict):
+        self._write_chunk(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+        self._sent += len(data)
+
+
+class ChatStub(StubServer):
+    def __init__(self, latency: float = 0.5, chunk_delay: float = 0.005, chunk_chars: int = 40, **kwargs):
+        super().__init__(ChatHandler, **kwargs)
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self._article = _article_template()
+
+    def completion(self, prompt: str) -> str:
+        """标题行 + 录制的正文；标题里带上提示词中的项目名，保证每篇文章不同"""
+        match = re.search(r"项目名称：(.+)", prompt)
+        name = match.group(1).strip() if match else "stub/project"
+        return f"{name}：终端里的编码代理 🤖\n{self._article}"
+
+
+# ---- Halo ----
+_CONTENT_API = "/apis/content.halo.run/v1alpha1/"
+_CONSOLE_POSTS = "/apis/api.console.halo.run/v1alpha1/posts"
+
+
+class HaloHandler(_Handler):
+    """分类 / 标签的分页列表与创建、按 name 查询文章、Console 创建文章"""
+
+    def do_GET(self):
+        self._begin()
+        if not self._authorized():
+            return
+        parts = urlsplit(self.path)
+        path = parts.path
+        time.sleep(self.server.latency)
+        if path.startswith(_CONTENT_API + "posts/"):
+            self._route = "halo.post.get"
+            post = self.server.posts.get(path[len(_CONTENT_API + "posts/"):])
+            return self._send(200, post) if post else self._send(404, {"title": "Not Found"})
+        kind = path[len(_CONTENT_API):] if path.startswith(_CONTENT_API) else ""
+        if kind in ("categories", "tags"):
+            self._route = f"halo.{kind}.list"
+            query = parse_qs(parts.query)
+            page = int((query.get("page") or ["1"])[0])
+            size = int((query.get("size") or ["100"])[0])
+            return self._send(200, self.server.list_page(kind, page, size))
+        self._route = "halo.other"
+        self._send(404, {"title": "Not Found"})
+
+    def do_POST(self):
+        self._begin()
+        if not self._authorized():
+            return
+        path = urlsplit(self.path).path
+        body = json.loads(self._body() or b"{}")
+        time.sleep(self.server.latency)
+        if path == _CONSOLE_POSTS:
+            self._route = "halo.post.create"
+            return self._send(*self.server.create_post(body))
+        kind = path[len(_CONTENT_API):] if path.startswith(_CONTENT_API) else ""
+        if kind in ("categories", "tags"):
+            self._route = f"halo.{kind}.create"
+            return self._send(*self.server.create_taxonomy(kind, body))
+        self._route = "halo.other"
+        self._send(404, {"title": "Not Found"})
+
+    def _authorized(self) -> bool:
+        if (self.headers.get("Authorization") or "").startswith("Bearer "):
+            return True
+        self._route = "halo.unauthorized"
+        self._body()
+        self._send(401, {"title": "Unauthorized"})
+        return False
+
+
+class HaloStub(StubServer):
+    def __init__(self, latency: float = 0.0, **kwargs):
+        super().__init__(HaloHandler, **kwargs)
+        self.latency = latency
+        self.state = {"categories": {}, "tags": {}}
+        self.posts = {}
+        self._state_lock = threading.Lock()
+
+    def list_page(self, kind: str, page: int, size: int) -> dict:
+        with self._state_lock:
+            items = list(self.state[kind].values())
+        start = (max(page, 1) - 1) * size
+        return {
+            "page": page, "size": size, "total": len(items),
+            "items": items[start:start + size],
+            "hasNext": start + size < len(items),
+        }
+
+    def create_taxonomy(self, kind: str, body: dict):
+        name = (body.get("metadata") or {}).get("name")
+        if not name:
+            return 400, {"title": "Bad Request", "detail": "metadata.name 不能为空"}
+        with self._state_lock:
+            if name in self.state[kind]:
+                return 409, {"title": "Conflict", "detail": "名称重复"}
+            self.state[kind][name] = body
+        return 200, body
+
+    def create_post(self, body: dict):
+        post = body.get("post") or {}
+        name = (post.get("metadata") or {}).get("name")
+        if not name:
+            return 400, {"title": "Bad Request", "detail": "metadata.name 不能为空"}
+        with self._state_lock:
+            if name in self.posts:
+                return 400, {"title": "Bad Request", "detail": "名称重复"}
+            self.posts[name] = post
+        return 200, post
@@ -0,0 +1,223 @@
+import hashlib
+import math
+import os
+import re
+
+# 提示词中 README 上下文的 token 预算
+CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKENS", "1500"))
+# 剩余预算小于该值时不再截断塞入新的章节
+MIN_CHUNK_TOKENS = 48
+# 单个代码块最多保留的行数
+MAX_CODE_LINES = 15
+# 进程内记忆的条目数上限
+MEMO_SIZE = 256
+
+_CJK = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+_HEADING = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+
+_NOISE = [
+    (re.compile(r"<!--.*?-->", re.S), ""),
+    # 徽章：[![alt](img)](link) 以及单独的图片
+    (re.compile(r"\[!\[[^\]]*\]\([^)]*\)\]\([^)]*\)"), ""),
+    (re.compile(r"!\[[^\]]*\]\([^)]*\)"), ""),
+    (re.compile(r"!\[[^\]]*\]\[[^\]]*\]"), ""),
+    (re.compile(r"<(img|picture|source|svg|video|br|hr)\b[^>]*>", re.I), ""),
+    (re.compile(r"<(svg|picture|video)\b.*?</\1>", re.I | re.S), ""),
+    # 链接只保留文字
+    (re.compile(r"\[([^\]]+)\]\((?:[^()]|\([^)]*\))*\)"), r"\1"),
+    # 引用式链接定义
+    (re.compile(r"^\s*\[[^\]]+\]:\s*\S+.*$", re.M), ""),
+    (re.compile(r"</?[a-zA-Z][^>]*>"), ""),
+    (re.compile(r"[ \t]+$", re.M), ""),
+]
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+# 章节标题关键词权重：越高越优先放入上下文，负数表示基本不放
+_SECTION_WEIGHTS = [
+    (re.compile(r"feature|highlight|特性|功能|亮点", re.I), 6),
+    (re.compile(r"overview|introduction|about|what is|why|motivation|简介|介绍|概述|为什么", re.I), 5),
+    (re.compile(r"usage|quick ?start|getting started|example|demo|tutorial|使用|用法|快速开始|示例|上手", re.I), 5),
+    (re.compile(r"install|setup|安装|部署", re.I), 4),
+    (re.compile(r"architecture|design|how it works|benchmark|performance|架构|设计|原理|性能", re.I), 4),
+    (re.compile(r"config|api|options|配置|参数", re.I), 2),
+    (re.compile(r"faq|roadmap|路线", re.I), 0),
+    (re.compile(r"licen[cs]e|contribut|contributor|sponsor|backer|acknowledg|thank|"
+                r"changelog|star history|citation|cite|table of contents|contents|toc|"
+                r"community|support|code of conduct|协议|许可|贡献|致谢|赞助|更新日志|目录|交流群", re.I), -10),
+]
+
+
+def estimate_tokens(text: str) -> int:
+    """本地估算 token 数：中日韩字符按 1 个计，其余按约 4 个字符 1 个 token 计"""
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
+
+
+def _trim_code(lines: list) -> list:
+    """过长的代码块只保留前若干行"""
+    if len(lines) <= MAX_CODE_LINES + 2:
+        return lines
+    return lines[:MAX_CODE_LINES + 1] + ["...", lines[-1]]
+
+
+def clean_markdown(text: str) -> str:
+    """去掉徽章、图片、HTML 标签与注释等噪音；代码块内容保持原样（只截短）"""
+    out = []
+    prose = []
+    code = None
+
+    def flush():
+        if prose:
+            chunk = "\n".join(prose)
+            for pattern, repl in _NOISE:
+                chunk = pattern.sub(repl, chunk)
+            out.append(chunk)
+            prose.clear()
+
+    for line in text.replace("\r\n", "\n").split("\n"):
+        if _FENCE.match(line):
+            if code is None:
+                flush()
+                code = [line]
+            else:
+                code.append(line)
+                out.append("\n".join(_trim_code(code)))
+                code = None
+        elif code is not None:
+            code.append(line)
+        else:
+            prose.append(line)
+    if code is not None:
+        out.append("\n".join(_trim_code(code + ["```"])))
+    flush()
+    return _BLANK_LINES.sub("\n\n", "\n".join(out)).strip()
+
+
+def split_sections(text: str) -> list:
+    """按 Markdown 标题切分章节，返回 [(标题, 层级, 正文)]；代码块中的 # 不算标题"""
+    sections = []
+    title, level, body = "", 0, []
+    in_code = False
+    for line in text.split("\n"):
+        if _FENCE.match(line):
+            in_code = not in_code
+        match = None if in_code else _HEADING.match(line)
+        if match:
+            sections.append((title, level, "\n".join(body).strip()))
+            title, level, body = match.group(2).strip(), len(match.group(1)), [line]
+        else:
+            body.append(line)
+    sections.append((title, level, "\n".join(body).strip()))
+    return [s for s in sections if s[2]]
+
+
+def _score(index: int, title: str, level: int, body: str) -> float:
+    """章节相关性得分：标题关键词 + 位置（开头的简介最重要）+ 篇幅"""
+    if index == 0 and level <= 1:
+        score = 8.0
+    else:
+        score = 1.0
+        for pattern, weight in _SECTION_WEIGHTS:
+            if pattern.search(title):
+                score = float(weight)
+                break
+        # 子章节略低于同类的顶级章节
+        score -= 0.5 * max(0, level - 2)
+    # 几乎只有标题或只有代码的章节价值较低
+    prose = re.sub(r"```.*?```", "", body, flags=re.S)
+    if len(prose.strip()) < 40:
+        score -= 2
+    return score - index * 0.01
+
+
+def _fit_chars(text: str, budget: int) -> str:
+    """预算内最长的前缀（estimate_tokens 随长度单调，二分查找）"""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if estimate_tokens(text[:mid]) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo]
+
+
+def _truncate(text: str, budget: int) -> str:
+    """按段落截断到预算内；放不下的那一段再按行截断，一行也放不下时按字符截断"""
+    budget -= 1  # 结尾的 "…"
+    kept = []
+    used = 0
+    for para in text.split("\n\n"):
+        cost = estimate_tokens(para) + 1
+        if used + cost <= budget:
+            kept.append(para)
+            used += cost
+            continue
+        lines = []
+        for line in para.split("\n"):
+            cost = estimate_tokens(line) + 1
+            if used + cost > budget:
+                if not lines:
+                    lines.append(_fit_chars(line, budget - used - 1).rstrip())
+                break
+            lines.append(line)
+            used += cost
+        partial = "\n".join(lines).rstrip()
+        if partial:
+            return "\n\n".join(kept + [partial]) + " …"
+        break
+    return "\n\n".join(kept) + "\n\n…"
+
+
+def pack_sections(sections: list, budget: int) -> str:
+    """
+    按得分从高到低把章节放进 token 预算，放不下的最后一个章节按段落截断；
+    输出保持章节在原文中的顺序。得分相同按原顺序，结果是确定的。
+    """
+    scored = sorted(
+        ((_score(i, *s), i) for i, s in enumerate(sections)),
+        key=lambda item: (-item[0], item[1]),
+    )
+    chosen = {}
+    remaining = budget
+    for score, i in scored:
+        if score < 0 or remaining < MIN_CHUNK_TOKENS:
+            break
+        body = sections[i][2]
+        cost = estimate_tokens(body) + 1
+        if cost <= remaining:
+            chosen[i] = body
+            remaining -= cost
+        elif not chosen or remaining >= 4 * MIN_CHUNK_TOKENS:
+            chosen[i] = _truncate(body, remaining)
+            remaining -= estimate_tokens(chosen[i]) + 1
+    return "\n\n".join(chosen[i] for i in sorted(chosen))
+
+
+_memo = {}
+
+
+def build_readme_context(readme: str, budget: int = CONTEXT_TOKEN_BUDGET,
+                         revision: str | None = None) -> str:
+    """
+    把 README 清洗、分节、按相关性打包进 token 预算。
+    结果按 (revision, budget) 记忆；revision 缺省时使用 README 内容的 sha1。
+    """
+    if not readme:
+        return ""
+    revision = revision or hashlib.sha1(readme.encode("utf-8")).hexdigest()
+    key = (revision, budget)
+    if key not in _memo:
+        if len(_memo) >= MEMO_SIZE:
+            _memo.clear()
+        _memo[key] = pack_sections(split_sections(clean_markdown(readme)), budget)
+    return _memo[key]
+
+
+def repo_revision(repo: dict) -> str | None:
+    """仓库版本标识：url + 最近推送时间（来自 github_enrich 的元数据）"""
+    pushed_at = (repo.get("meta") or {}).get("pushed_at")
+    return f"{repo.get('url')}@{pushed_at}" if pushed_at else None
@@ -0,0 +1,376 @@
+import csv
+import hashlib
+import io
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import fcntl
+except ImportError:  # Windows 上没有 fcntl，退化为不加锁
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# processed_repos.csv 仍是唯一的数据源（追加写、随仓库提交），
+# SQLite 只是它的索引：记录已导入到的字节偏移，每次启动只导入新增的尾部。
+CSV_FILE = os.getenv("PROCESSED_CSV", "processed_repos.csv")
+DB_FILE = os.getenv("DEDUP_DB", "processed_repos.db")
+# 去重时间窗口（天）：超过这么多天的仓库可以再次推荐；0 表示永久去重
+WINDOW_DAYS = int(os.getenv("DEDUP_WINDOW_DAYS", "0"))
+CSV_FIELDS = ['name', 'url', 'processed_date']
+# 校验 CSV 前缀未被改写时使用的字节数
+_SIGNATURE_BYTES = 4096
+# Trending 抓到的 URL 基本已是规范形式，匹配时跳过 urlsplit
+_CANONICAL_URL = re.compile(r"https://github\.com/[\w.-]+/[\w.-]+")
+
+
+@contextmanager
+def _file_lock(path: str, exclusive: bool = True):
+    """
+    基于独立 .lock 文件的进程间锁（CSV 压缩时会被替换，所以不能锁 CSV 本身）。
+    注意同一进程内不要嵌套获取，flock 对不同的文件描述符同样会互斥。
+    """
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def normalize_repo_url(url: str) -> str:
+    """规范化仓库 URL：统一 https://github.com/owner/repo、小写、去掉结尾斜杠和 .git"""
+    url = (url or "").strip()
+    if not url:
+        return ""
+    if _CANONICAL_URL.fullmatch(url) and not url.endswith(".git"):
+        return url.lower()
+    if "://" not in url:
+        url = "https://" + url.lstrip("/")
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    path = parts.path.rstrip("/")
+    if path.endswith(".git"):
+        path = path[:-4]
+    segments = [s for s in path.split("/") if s]
+    if host == "github.com" and len(segments) >= 2:
+        # 只保留 owner/repo，去掉 /tree/main 之类的后缀
+        segments = segments[:2]
+    return f"https://{host}/{'/'.join(segments)}".lower()
+
+
+class DedupStore:
+    """
+    已处理仓库的去重索引。
+    - 成员判断走 SQLite 主键索引，不随历史增长而变慢；
+    - 启动时只解析 CSV 新增的尾部；
+    - URL 规范化 + 改名别名表；
+    - 可配置时间窗口，超过窗口的仓库视为未处理。
+    支持 `url in store` 与 `len(store)`，可直接替代原来的 set。
+    read_only=True 时以只读方式打开已有的索引：不建表、不导入 CSV、不创建 .lock 文件，
+    索引文件不存在时抛出 sqlite3.OperationalError。
+    """
+
+    def __init__(self, csv_path: str = CSV_FILE, db_path: str = DB_FILE,
+                 window_days: int = WINDOW_DAYS, read_only: bool = False):
+        self.csv_path = csv_path
+        self.db_path = db_path
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        if read_only:
+            uri = Path(db_path).absolute().as_uri() + "?mode=ro"
+            self._conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            self._aliases = dict(self._conn.execute("SELECT url, canonical FROM aliases"))
+            return
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS processed (
+                url TEXT PRIMARY KEY,
+                name TEXT,
+                processed_date TEXT
+            );
+            CREATE TABLE IF NOT EXISTS aliases (
+                url TEXT PRIMARY KEY,
+                canonical TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            );
+        """)
+        # 别名表很小，常驻内存
+        self._aliases = dict(self._conn.execute("SELECT url, canonical FROM aliases"))
+        self.sync()
+
+    # ---- 元信息 ----
+    def _meta(self, key, default=None):
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # ---- CSV 同步 ----
+    @staticmethod
+    def _signature(f, offset: int) -> str:
+        """offset 之前一段字节的哈希，用于判断 CSV 是否被改写过"""
+        start = max(0, offset - _SIGNATURE_BYTES)
+        f.seek(start)
+        return hashlib.sha1(f.read(offset - start)).hexdigest()
+
+    def sync(self) -> int:
+        """把 CSV 中尚未导入的行导入索引，返回导入的行数"""
+        if not os.path.exists(self.csv_path):
+            return 0
+        with _file_lock(self.csv_path, exclusive=False):
+            return self._sync_locked()
+
+    def _sync_locked(self) -> int:
+        with self._lock, open(self.csv_path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            offset = int(self._meta("csv_offset", 0))
+            if offset > size or (offset and self._signature(f, offset) != self._meta("csv_signature")):
+                # CSV 被截断或改写（例如手动删除了历史），全量重建
+                log.warning("CSV 与索引不一致，重建去重索引")
+                self._conn.execute("DELETE FROM processed")
+                offset = 0
+            if offset == size:
+                return 0
+
+            f.seek(offset)
+            text = f.read(size - offset).decode("utf-8")
+            if offset == 0:
+                rows = list(csv.DictReader(io.StringIO(text)))
+            else:
+                rows = [dict(zip(CSV_FIELDS, r)) for r in csv.reader(io.StringIO(text)) if r]
+            count = self._upsert(rows)
+            rows_before = int(self._meta("csv_rows", 0)) if offset else 0
+            self._set_meta("csv_offset", size)
+            self._set_meta("csv_signature", self._signature(f, size))
+            self._set_meta("csv_rows", rows_before + count)
+            self._conn.commit()
+            return count
+
+    def _upsert(self, rows) -> int:
+        params = [
+            (self.canonical(row['url']), (row.get('name') or '').strip(),
+             (row.get('processed_date') or '').strip())
+            for row in rows if (row.get('url') or '').strip()
+        ]
+        # 同一仓库保留最近一次的处理日期
+        self._conn.executemany(
+            """INSERT INTO processed (url, name, processed_date) VALUES (?, ?, ?)
+               ON CONFLICT(url) DO UPDATE SET
+                   name = excluded.name,
+                   processed_date = max(processed_date, excluded.processed_date)""",
+            params,
+        )
+        return len(params)
+
+    # ---- 写入 ----
+    def record(self, repos, date: str | None = None) -> list[dict]:
+        """
+        记录一个或多个已处理的仓库：持锁后一次性追加到 CSV（单次 write + 一次 fsync），
+        写完只回读新增的尾部做校验，再增量更新索引。返回写入的行。
+        """
+        default_date = date or datetime.now().strftime("%Y-%m-%d")
+        rows = [
+            {'name': r['name'], 'url': r['url'], 'processed_date': r.get('date') or default_date}
+            for r in repos
+        ]
+        if not rows:
+            return []
+
+        buf = io.StringIO()
+        writer = csv.DictWriter(buf, fieldnames=CSV_FIELDS)
+        writer.writerows(rows)
+        body = buf.getvalue()
+
+        with _file_lock(self.csv_path):
+            fd = os.open(self.csv_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                start = os.fstat(fd).st_size
+                if start == 0:
+                    header = io.StringIO()
+                    csv.DictWriter(header, fieldnames=CSV_FIELDS).writeheader()
+                    body = header.getvalue() + body
+                data = body.encode("utf-8")
+                view = memoryview(data)
+                while view:
+                    written = os.write(fd, view)
+                    view = view[written:]
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+            # 只回读本次追加的部分做校验
+            with open(self.csv_path, "rb") as f:
+                f.seek(start)
+                if f.read(len(data)) != data:
+                    raise IOError(f"写入 {self.csv_path} 后校验失败")
+            self._sync_locked()
+        return rows
+
+    # ---- 规范化与别名 ----
+    def canonical(self, url: str) -> str:
+        """规范化 URL，并解析改名别名（最多跟随几跳，防止环）"""
+        url = normalize_repo_url(url)
+        for _ in range(5):
+            target = self._aliases.get(url)
+            if not target or target == url:
+                break
+            url = target
+        return url
+
+    def add_alias(self, old_url: str, new_url: str):
+        """记录仓库改名（old -> new），已有记录合并到新 URL 下"""
+        old = normalize_repo_url(old_url)
+        new = self.canonical(new_url)
+        if old == new:
+            return
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO aliases (url, canonical) VALUES (?, ?)", (old, new))
+            self._aliases[old] = new
+            row = self._conn.execute(
+                "SELECT name, processed_date FROM processed WHERE url = ?", (old,)).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM processed WHERE url = ?", (old,))
+                self._upsert([{"url": new, "name": row[0], "processed_date": row[1]}])
+            self._conn.commit()
+
+    def resolve_redirect(self, url: str) -> str:
+        """通过 GitHub 的 301 跳转发现仓库改名并记录别名，返回规范 URL"""
+        import http_client
+
+        canonical = self.canonical(url)
+        try:
+            r = http_client.request("HEAD", canonical, allow_redirects=False, timeout=10)
+        except Exception as e:
+            log.warning("检查仓库跳转失败 %s: %s", canonical, e)
+            return canonical
+        location = r.headers.get("Location")
+        if r.status_code in (301, 308) and location:
+            self.add_alias(canonical, location)
+            return self.canonical(location)
+        return canonical
+
+    # ---- 查询 ----
+    def _cutoff(self, today: str | None) -> str | None:
+        if not self.window_days:
+            return None
+        base = datetime.strptime(today, "%Y-%m-%d") if today else datetime.now()
+        return (base - timedelta(days=self.window_days)).strftime("%Y-%m-%d")
+
+    def contains(self, url: str, today: str | None = None) -> bool:
+        """仓库是否在去重窗口内处理过"""
+        canonical = self.canonical(url)
+        # 连接在线程间共享（check_same_thread=False），查询也要和 record / sync / compact 的写入互斥
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT processed_date FROM processed WHERE url = ?", (canonical,)).fetchone()
+        if row is None:
+            return False
+        cutoff = self._cutoff(today)
+        return cutoff is None or (row[0] or "") > cutoff
+
+    def __contains__(self, url) -> bool:
+        return self.contains(url)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM processed").fetchone()[0]
+
+    def recent(self, limit: int = 10) -> list:
+        """最近处理过的仓库 URL（按处理日期从新到旧）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM processed ORDER BY processed_date DESC, rowid DESC LIMIT ?", (limit,)).fetchall()
+        return [row[0] for row in rows]
+
+    # ---- 压缩 ----
+    def needs_compaction(self) -> bool:
+        """CSV 行数明显多于唯一仓库数时需要压缩"""
+        with self._lock:
+            rows = int(self._meta("csv_rows", 0))
+        return rows > 100 and rows > len(self) * 1.5
+
+    def compact(self, resolve_redirects: bool = False):
+        """
+        压缩 CSV：每个规范 URL 只保留最近一条记录，原子替换后重建偏移。
+        resolve_redirects=True 时先检查时间窗口内的仓库是否改名（每个仓库一次 HEAD 请求）。
+        """
+        self.sync()
+        if resolve_redirects:
+            cutoff = self._cutoff(None) or ""
+            with self._lock:
+                urls = [r[0] for r in self._conn.execute(
+                    "SELECT url FROM processed WHERE processed_date > ?", (cutoff,))]
+            for url in urls:
+                self.resolve_redirect(url)
+
+        with _file_lock(self.csv_path):
+            # 持锁后再同步一次，避免丢掉其他进程刚追加的行
+            self._sync_locked()
+            with self._lock:
+                rows = self._conn.execute(
+                    "SELECT name, url, processed_date FROM processed ORDER BY processed_date, url").fetchall()
+                tmp = f"{self.csv_path}.tmp"
+                with open(tmp, "w", encoding="utf-8", newline="") as f:
+                    writer = csv.writer(f)
+                    writer.writerow(CSV_FIELDS)
+                    writer.writerows(rows)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.csv_path)
+                with open(self.csv_path, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    self._set_meta("csv_offset", size)
+                    self._set_meta("csv_signature", self._signature(f, size))
+                self._set_meta("csv_rows", len(rows))
+                self._conn.commit()
+        with self._lock:
+            self._conn.execute("VACUUM")
+        log.info("已压缩 %s，保留 %d 条记录", self.csv_path, len(rows))
+
+    def close(self):
+        self._conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="维护已处理仓库的去重索引")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("sync", help="从 CSV 导入新增记录")
+    p_compact = sub.add_parser("compact", help="压缩 CSV（每个仓库只保留最新记录）")
+    p_compact.add_argument("--resolve-redirects", action="store_true", help="检查窗口内仓库是否改名")
+    p_alias = sub.add_parser("alias", help="记录仓库改名")
+    p_alias.add_argument("old_url")
+    p_alias.add_argument("new_url")
+    p_check = sub.add_parser("check", help="检查仓库是否已处理")
+    p_check.add_argument("url")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    store = DedupStore()
+    if args.command == "sync":
+        print(f"索引中共有 {len(store)} 个仓库")
+    elif args.command == "compact":
+        store.compact(resolve_redirects=args.resolve_redirects)
+    elif args.command == "alias":
+        store.add_alias(args.old_url, args.new_url)
+        print(f"{normalize_repo_url(args.old_url)} -> {store.canonical(args.new_url)}")
+    elif args.command == "check":
+        print("已处理" if args.url in store else "未处理")
+    store.close()
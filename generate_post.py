@@ -1,108 +1,95 @@
+import hashlib
 import json
-import requests
+import logging
 import os
+import time
 from datetime import datetime
 import re
 
-def read_repo_data():
+import http_client
+import llm_cache
+import tracing
+from context_builder import build_readme_context, repo_revision
+from github_enrich import get_readme
+from html_normalizer import INSERT_TOC, HtmlNormalizer, insert_toc_html
+from tag_index import derive_tags
+
+log = logging.getLogger(__name__)
+
+# 可用 DEEPSEEK_API_URL 指向其他 OpenAI 兼容接口或本地测试桩
+DEEPSEEK_API_URL = os.getenv("DEEPSEEK_API_URL", "https://api.deepseek.com/chat/completions")
+DEEPSEEK_MODEL = "deepseek-v4-flash"
+# 采样参数（同时参与响应缓存的键计算）
+SAMPLING_PARAMS = {"temperature": 0.7, "max_tokens": 32000}
+# 流式模式下的空闲超时（秒）：超过这么久没有收到新数据才判定为中断
+STREAM_INACTIVITY_TIMEOUT = int(os.getenv("DEEPSEEK_INACTIVITY_TIMEOUT", "60"))
+# 流式输出的部分内容，用于断线续写或兜底
+PARTIAL_FILE = "generated_post.partial"
+# 输入的仓库信息与输出的文章（可用环境变量指定路径）
+REPO_FILE = os.getenv("GITHUB_DAILY_FILE", "github_daily.json")
+POST_FILE = os.getenv("GENERATED_POST_FILE", "generated_post.json")
+MAX_STREAM_RESUMES = 2
+# 续写失败时，已收到的内容达到这个长度才作为兜底结果使用
+MIN_SALVAGE_CHARS = 1500
+# 可用文章的最短正文长度（validate_post 用，过短的结果不缓存、推测生成时不采用）
+MIN_POST_CHARS = int(os.getenv("MIN_POST_CHARS", "1500"))
+RESUME_INSTRUCTION = "上面的回答因为网络中断被截断了。请从截断处直接继续输出剩余内容，不要重复已经输出的部分，也不要添加任何说明文字。"
+
+def read_repo_data(path=REPO_FILE):
     """读取 GitHub Trending 数据"""
     try:
-        with open('github_daily.json', 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
-        print("github_daily.json 文件不存在")
+        log.error("%s 文件不存在", path)
         return None
     except json.JSONDecodeError:
-        print("github_daily.json 文件格式错误")
+        log.error("%s 文件格式错误", path)
         return None
 
-def format_code_blocks(content):
-    """将代码块转换为 HTML 格式"""
-    # 处理 ```language\ncode\n``` 格式的代码块
-    content = re.sub(
-        r'```(\w+)?\s*\n(.*?)\n```',
-        lambda m: f'<pre><code class="language-{m.group(1) or ""}">{m.group(2)}</code></pre>',
-        content,
-        flags=re.DOTALL
-    )
-    
-    # 处理行内代码 `code`
-    content = re.sub(r'`([^`]+)`', r'<code>\1</code>', content)
-    
-    return content
-
 def extract_title_and_content(full_content):
-    """从 API 返回的内容中提取标题和正文"""
-    
-    # 如果内容以 <!DOCTYPE 开头，说明返回了完整 HTML 文档
-    if full_content.strip().startswith('<!DOCTYPE') or full_content.strip().startswith('<html'):
-        # 使用 BeautifulSoup 解析 HTML
-        try:
-            from bs4 import BeautifulSoup
-            soup = BeautifulSoup(full_content, 'html.parser')
-            
-            # 提取标题 - 优先找 h1，如果没有就找 title
-            title_tag = soup.find('h1')
-            if title_tag:
-                title = title_tag.get_text().strip()
-            else:
-                title_tag = soup.find('title')
-                title = title_tag.get_text().strip() if title_tag else ""
-            
-            # 提取正文 - 找 body 或者直接取所有内容
-            body_tag = soup.find('body')
-            if body_tag:
-                content = str(body_tag)
-            else:
-                content = full_content
-                
-            return title, content
-            
-        except ImportError:
-            # 如果没有 BeautifulSoup，使用正则表达式简单处理
-            print("警告: 未安装 BeautifulSoup，使用正则表达式提取内容")
-            title_match = re.search(r'<title[^>]*>(.*?)</title>', full_content, re.IGNORECASE | re.DOTALL)
-            title = title_match.group(1).strip() if title_match else ""
-            
-            body_match = re.search(r'<body[^>]*>(.*?)</body>', full_content, re.IGNORECASE | re.DOTALL)
-            content = body_match.group(1) if body_match else full_content
-            
-            return title, content
-    else:
-        # 如果不是完整 HTML，尝试提取第一行作为标题
-        lines = full_content.strip().split('\n')
-        title = ""
-        content = full_content
-        
-        # 找第一个有意义的行作为标题
-        for line in lines:
-            clean_line = line.strip()
-            if clean_line and len(clean_line) < 100:  # 标题不会太长
-                # 移除 HTML 标签
-                clean_title = re.sub(r'<[^>]+>', '', clean_line)
-                if clean_title and len(clean_title) > 5:
-                    title = clean_title
-                    break
-        
-        return title, content
+    """从 API 返回的完整内容中提取标题并规范化正文，等同于一次性喂给 StreamingArticleParser"""
+    with tracing.span("format", chars=len(full_content)):
+        parser = StreamingArticleParser()
+        parser.feed(full_content)
+        return parser.finish()
 
-def generate_post_with_deepseek(repo_data):
-    """使用 DeepSeek API 生成博客文章"""
-    
-    # 从环境变量获取 API 密钥
-    DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
-    
-    if not DEEPSEEK_API_KEY:
-        print("错误: 未找到 DEEPSEEK_API_KEY 环境变量")
-        print("请在 GitHub Secrets 中设置 DEEPSEEK_API_KEY")
-        return None, None
-    
-    print(f"API Key 前几位: {DEEPSEEK_API_KEY[:10]}...")
-    
-    DEEPSEEK_API_URL = "https://api.deepseek.com/chat/completions"
+def _describe_repo_meta(repo_data):
+    """把 github_enrich 补充的元数据整理成提示词中的若干行（没有元数据时返回空字符串）"""
+    meta = repo_data.get('meta')
+    if not meta:
+        return ""
+    lines = []
+    if meta.get('primary_language'):
+        lines.append(f"- 主要语言：{meta['primary_language']}")
+    if meta.get('topics'):
+        lines.append(f"- 主题标签：{', '.join(meta['topics'])}")
+    if meta.get('license'):
+        lines.append(f"- 开源协议：{meta['license']}")
+    if meta.get('stars') is not None:
+        lines.append(f"- Star / Fork：{meta['stars']} / {meta.get('forks')}")
+    if meta.get('pushed_at'):
+        lines.append(f"- 最近推送：{meta['pushed_at']}")
+    release = meta.get('latest_release')
+    if release:
+        lines.append(f"- 最新版本：{release.get('tag') or release.get('name')}（{release.get('published_at')}）")
+    if meta.get('homepage'):
+        lines.append(f"- 项目主页：{meta['homepage']}")
+    text = "\n".join(lines)
+
+    # README 经清洗、按章节相关性打包进固定 token 预算（PROMPT_CONTEXT_TOKENS）
+    readme = get_readme(repo_data)
+    revision = repo_revision(repo_data) if readme else None
+    readme = build_readme_context(readme or meta.get('readme_excerpt') or "", revision=revision)
+    if readme:
+        text += f"\n\nREADME 摘录（仅供参考，请用自己的语言介绍）：\n<<<\n{readme.strip()}\n>>>"
+    return "\n" + text
+
+
+def build_prompt(repo_data):
+    """根据仓库信息构建 DeepSeek 提示词"""
     
     # 根据项目名称生成一个随机种子，用于选择不同的文章结构
-    import hashlib
     seed = int(hashlib.md5(repo_data['name'].encode()).hexdigest()[:8], 16) % 6
     
     # 多样化的文章结构模板（根据 seed 选择不同的结构）
@@ -149,7 +136,7 @@ def generate_post_with_deepseek(repo_data):
 - 项目名称：{repo_data['name']}
 - 项目地址：{repo_data['url']}
 - 项目描述：{repo_data['desc']}
-- 推荐日期：{repo_data['date']}
+- 推荐日期：{repo_data['date']}{_describe_repo_meta(repo_data)}
 
 🎯 写作策略（重要！）：
 根据项目特点，选择最适合的文章结构。不要使用固定模板，要让每篇文章都有独特的风格和视角。
@@ -210,76 +197,362 @@ class Example:
 文章标题（第一行，不要HTML标签）
 <html内容>（从第二行开始）
 """
+    return prompt
+
+
+def validate_post(title, content):
+    """检查生成结果是否可以发布，可用返回 None，否则返回原因"""
+    if not title:
+        return "缺少标题"
+    if not content:
+        return "正文为空"
+    if len(content) < MIN_POST_CHARS:
+        return f"正文过短（{len(content)} 字符）"
+    if not re.search(r"<(p|h[1-6]|ul|ol|pre)[\s>]", content):
+        return "正文中没有 HTML 段落或标题"
+    return None
+
+
+def _title_from_line(line):
+    """判断一行是否可以作为标题，可以则返回去掉 HTML 标签后的标题"""
+    clean_line = line.strip()
+    if clean_line and len(clean_line) < 100:  # 标题不会太长
+        # 移除 HTML 标签
+        clean_title = re.sub(r'<[^>]+>', '', clean_line)
+        if clean_title and len(clean_title) > 5:
+            return clean_title
+    return ""
+
+
+class StreamingArticleParser:
+    """
+    增量解析流式返回的文章。
+    标题行一完整就立即提取；正文交给 HtmlNormalizer 边接收边规范化
+    （代码块、转义、标题 id、目录、标签过滤），每个字符只处理一次。
+    返回的是完整 HTML 文档时（少见），标题取第一个 <h1>，没有则取 <title>。
+    """
+
+    # 超过这个长度还没换行的行不可能是标题，不再缓存
+    MAX_TITLE_LINE = 1000
+
+    def __init__(self, on_title=None):
+        self.on_title = on_title
+        self.title = ""
+        self.normalizer = HtmlNormalizer()
+        self._raw = []
+        self._formatted = []
+        self._line = ""
+        self._skip_line = False
+        self._html_doc = None
+
+    @property
+    def raw(self):
+        return "".join(self._raw)
+
+    def feed(self, text):
+        if not text:
+            return
+        self._raw.append(text)
+        self._formatted.append(self.normalizer.feed(text))
+        if not (self.title or self._html_doc):
+            self._scan_title(text)
+
+    def _scan_title(self, text):
+        """只在找到标题之前逐行检查"""
+        self._line += text
+        while not (self.title or self._html_doc):
+            nl = self._line.find("\n")
+            if nl < 0:
+                if len(self._line) > self.MAX_TITLE_LINE:
+                    self._check_line(self._line)
+                    self._line = ""
+                    self._skip_line = True
+                return
+            line, self._line = self._line[:nl], self._line[nl + 1:]
+            if self._skip_line:
+                self._skip_line = False
+                continue
+            self._check_line(line)
+
+    def _check_line(self, line):
+        stripped = line.strip()
+        if self._html_doc is None and stripped:
+            self._html_doc = stripped.startswith('<!DOCTYPE') or stripped.startswith('<html')
+            if self._html_doc:
+                return
+        self.title = _title_from_line(line)
+        if self.title and self.on_title:
+            self.on_title(self.title)
+
+    def finish(self):
+        """流结束，返回 (title, content)"""
+        self._formatted.append(self.normalizer.finish())
+        if not (self.title or self._html_doc or self._skip_line):
+            # 最后一行没有换行符时也可能是标题
+            self._check_line(self._line)
+        if self._html_doc:
+            self.title = self.normalizer.first_h1 or self.normalizer.doc_title
+        self._line = ""
+        content = "".join(self._formatted)
+        if INSERT_TOC:
+            content = insert_toc_html(content, self.normalizer)
+        return self.title, content
+
+
+def _iter_sse_deltas(response):
+    """逐条读取 SSE 流，产出增量文本；流在结束标记之前断开时抛出异常"""
+    finished = False
+    # text/event-stream 通常不带 charset，requests 会按 ISO-8859-1 解码；SSE 规定是 UTF-8，按字节读入后自行解码
+    for raw in response.iter_lines():
+        line = raw.decode("utf-8", errors="replace")
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except json.JSONDecodeError:
+            continue
+        # 最后一个数据块带有 usage（stream_options.include_usage）
+        tracing.record_usage(chunk.get("model") or DEEPSEEK_MODEL, chunk.get("usage"))
+        for choice in chunk.get("choices") or []:
+            delta = (choice.get("delta") or {}).get("content")
+            if delta:
+                yield delta
+            if choice.get("finish_reason"):
+                finished = True
+    if not finished:
+        raise http_client.ChunkedEncodingError("SSE 流在结束标记之前断开")
+
+
+def _load_partial(repo_data, partial_file):
+    """读取上次中断留下的部分内容（仅当属于同一仓库时）"""
+    if not os.path.exists(partial_file):
+        return ""
+    try:
+        with open(partial_file, 'r', encoding='utf-8') as f:
+            header = json.loads(f.readline() or "{}")
+            if header.get("repo") != repo_data.get("url"):
+                return ""
+            return f.read()
+    except (OSError, json.JSONDecodeError):
+        return ""
+
+
+def _open_partial(repo_data, partial_file, existing=""):
+    """创建部分内容文件：首行为元信息，其后追加原始输出"""
+    f = open(partial_file, 'w', encoding='utf-8')
+    f.write(json.dumps({"repo": repo_data.get("url"), "started_at": datetime.now().isoformat()}) + "\n")
+    f.write(existing)
+    f.flush()
+    return f
+
+
+def _stream_deepseek(repo_data, prompt, headers, partial_file=PARTIAL_FILE, cancel=None):
+    """
+    流式调用 DeepSeek，断线时基于已收到的内容续写；返回 (title, content)。
+    cancel 为 threading.Event，被设置后在下一个增量到达时断开连接并返回 (None, None)。
+    """
+    parser = StreamingArticleParser(on_title=lambda t: log.info("已解析标题: %s", t))
+    existing = _load_partial(repo_data, partial_file)
+    if existing:
+        log.info("发现上次中断的部分内容（%d 字符），将从断点续写", len(existing))
+        parser.feed(existing)
+
+    partial = _open_partial(repo_data, partial_file, existing)
+    attempts = 0
+    # 流式规范化分散在每个增量里，累计耗时记到 format span 上
+    feed_seconds = 0.0
+    cancelled = False
+    try:
+        while True:
+            if cancel is not None and cancel.is_set():
+                cancelled = True
+                break
+            messages = [{"role": "user", "content": prompt}]
+            if parser.raw:
+                messages += [
+                    {"role": "assistant", "content": parser.raw},
+                    {"role": "user", "content": RESUME_INSTRUCTION},
+                ]
+            payload = {
+                "model": DEEPSEEK_MODEL,
+                "messages": messages,
+                **SAMPLING_PARAMS,
+                "stream": True,
+                "stream_options": {"include_usage": True}
+            }
+            try:
+                log.info("正在调用 DeepSeek API（流式）...")
+                # 读超时即无数据的空闲超时，而不是整体耗时上限
+                response = http_client.post(
+                    DEEPSEEK_API_URL, headers=headers, json=payload, stream=True,
+                    timeout=(10, STREAM_INACTIVITY_TIMEOUT)
+                )
+                log.info("API 响应状态码: %d", response.status_code)
+                if response.status_code != 200:
+                    log.error("DeepSeek API 错误: %d", response.status_code)
+                    log.error("错误详情: %s", response.text)
+                    return None, None
+                with response:
+                    for delta in _iter_sse_deltas(response):
+                        if cancel is not None and cancel.is_set():
+                            cancelled = True
+                            break
+                        started = time.perf_counter()
+                        parser.feed(delta)
+                        feed_seconds += time.perf_counter() - started
+                        partial.write(delta)
+                        partial.flush()
+                break
+            except http_client.RequestException as e:
+                attempts += 1
+                log.warning("流式读取中断（已收到 %d 字符）: %s", len(parser.raw), e)
+                if attempts > MAX_STREAM_RESUMES:
+                    break
+                log.info("尝试续写 (%d/%d)...", attempts, MAX_STREAM_RESUMES)
+    finally:
+        partial.close()
+
+    if cancelled:
+        log.info("[%s] 生成已取消（已收到 %d 字符）", repo_data.get('name'), len(parser.raw))
+        os.remove(partial_file)
+        return None, None
+
+    if attempts > MAX_STREAM_RESUMES:
+        if len(parser.raw) < MIN_SALVAGE_CHARS:
+            log.warning("部分内容已保存到 %s，下次运行会自动续写", partial_file)
+            return None, None
+        log.warning("⚠️ 多次续写失败，使用已收到的 %d 字符内容", len(parser.raw))
+
+    with tracing.span("format", chars=len(parser.raw), feed_seconds=round(feed_seconds, 6)):
+        title, content = parser.finish()
+    os.remove(partial_file)
+    return title, content
+
+
+def generate_post_with_deepseek(repo_data, stream=None, partial_file=PARTIAL_FILE, use_cache=None,
+                                cancel=None):
+    """
+    使用 DeepSeek API 生成博客文章。
+    stream 为 None 时由环境变量 DEEPSEEK_STREAM 决定（默认开启流式）；
+    partial_file 为流式输出的断点文件，并发生成时每篇文章应各用一个；
+    use_cache 为 None 时由 LLM_CACHE_BYPASS 决定，相同模型+提示词+采样参数的结果直接复用；
+    cancel 为可选的 threading.Event，用于推测生成时中途放弃（流式模式下按增量检查）。
+    """
+    with tracing.span("generate", repo=repo_data.get("url")) as s:
+        prompt = build_prompt(repo_data)
+        s.set(prompt_chars=len(prompt))
+        if use_cache is None:
+            use_cache = not llm_cache.bypass_enabled()
+
+        key = llm_cache.cache_key(DEEPSEEK_MODEL, prompt, SAMPLING_PARAMS)
+        if use_cache:
+            cached = llm_cache.get(key)
+            if cached and cached[0] and cached[1]:
+                log.info("命中 DeepSeek 响应缓存 (%s)，跳过 API 调用", key[:12])
+                s.set(cache="hit")
+                return cached
+
+        title, content = _call_deepseek(repo_data, prompt, stream, partial_file, cancel)
+        s.set(cache="miss", content_chars=len(content or ""))
+        if cancel is not None and cancel.is_set():
+            s.set(cancelled=True)
+        # 不可用的结果不缓存，避免下次运行直接复用
+        if validate_post(title, content) is None:
+            llm_cache.put(key, title, content, meta={"repo": repo_data.get("url"), "model": DEEPSEEK_MODEL})
+        return title, content
+
+
+def _call_deepseek(repo_data, prompt, stream, partial_file, cancel=None):
+    """实际调用 DeepSeek API，返回 (title, content)"""
+    
+    # 从环境变量获取 API 密钥
+    DEEPSEEK_API_KEY = os.getenv('DEEPSEEK_API_KEY')
+    
+    if not DEEPSEEK_API_KEY:
+        log.error("错误: 未找到 DEEPSEEK_API_KEY 环境变量")
+        log.error("请在 GitHub Secrets 中设置 DEEPSEEK_API_KEY")
+        return None, None
+    
+    log.debug("API Key 前几位: %s...", DEEPSEEK_API_KEY[:10])
+    
+    if stream is None:
+        stream = os.getenv("DEEPSEEK_STREAM", "1") != "0"
     
     headers = {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {DEEPSEEK_API_KEY}"
     }
+
+    if stream:
+        try:
+            title, content = _stream_deepseek(repo_data, prompt, headers, partial_file, cancel)
+        except http_client.RequestException as e:
+            log.error("网络请求错误: %s", e)
+            return None, None
+        if content is None:
+            return None, None
+        if not title:
+            title = f"GitHub Trending 推荐：{repo_data['name']}"
+        log.info("提取的标题: %s", title)
+        log.debug("内容预览: %s...", content[:100])
+        return title, content
     
     payload = {
-        "model": "deepseek-v4-flash",
+        "model": DEEPSEEK_MODEL,
         "messages": [
             {
                 "role": "user",
                 "content": prompt
             }
         ],
-        "temperature": 0.7,
-        "max_tokens": 32000,
+        **SAMPLING_PARAMS,
         "stream": False
     }
     
     try:
-        print("正在调用 DeepSeek API...")
-        response = requests.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
-        print(f"API 响应状态码: {response.status_code}")
+        log.info("正在调用 DeepSeek API...")
+        response = http_client.post(DEEPSEEK_API_URL, headers=headers, json=payload, timeout=60)
+        log.info("API 响应状态码: %d", response.status_code)
         
         if response.status_code == 200:
             result = response.json()
+            tracing.record_usage(result.get("model") or DEEPSEEK_MODEL, result.get("usage"))
             raw_content = result['choices'][0]['message']['content']
             
-            # 提取标题和内容
+            # 提取标题并规范化正文（代码块、标题 id、标签过滤）
             title, content = extract_title_and_content(raw_content)
             
             # 如果提取失败，使用默认标题
             if not title:
                 title = f"GitHub Trending 推荐：{repo_data['name']}"
             
-            # 格式化代码块 - 将 ``` 转换为 HTML
-            content = format_code_blocks(content)
-            
-            print(f"提取的标题: {title}")
-            print(f"内容预览: {content[:100]}...")
+            log.info("提取的标题: %s", title)
+            log.debug("内容预览: %s...", content[:100])
             
             return title, content
         else:
-            print(f"DeepSeek API 错误: {response.status_code}")
-            print(f"错误详情: {response.text}")
+            log.error("DeepSeek API 错误: %d", response.status_code)
+            log.error("错误详情: %s", response.text)
             return None, None
             
-    except requests.exceptions.RequestException as e:
-        print(f"网络请求错误: {e}")
+    except http_client.RequestException as e:
+        log.error("网络请求错误: %s", e)
         return None, None
 
-def _derive_tags_from_repo(repo_data: dict) -> list[str]:
+def _derive_tags_from_repo(repo_data: dict, exclude=()) -> list[str]:
     """
     根据仓库信息推导额外标签（可选）。
-    可从项目名、描述中提取技术关键词，用于丰富标签。
+    由 tag_index 在仓库名、描述、topics、语言和 README 中匹配技术词表，按得分取前 3 个。
     """
-    tags = []
-    name = (repo_data.get("name") or "").lower()
-    desc = (repo_data.get("desc") or "").lower()
-    # 常见技术关键词
-    keywords = ["python", "rust", "javascript", "typescript", "go", "java", "ai", "llm", "quant", "trading", "cli", "web"]
-    for kw in keywords:
-        if kw in name or kw in desc:
-            tags.append(kw.capitalize())
-    return tags[:3]  # 最多 3 个推导标签
-
-
-def save_generated_post(title, content, repo_data, categories=None, tags=None):
+    return derive_tags(repo_data, limit=3, exclude=exclude)  # 最多 3 个推导标签
+
+
+def build_post_data(title, content, repo_data, categories=None, tags=None):
     """
-    保存生成的文章。
+    构建 generated_post.json 格式的文章数据。
     categories: 可选，分类列表，如 ["GitHub Trending", "开源项目"]
     tags: 可选，标签列表。若不传则使用默认 + 从 repo 推导的标签
     """
@@ -287,7 +560,7 @@ def save_generated_post(title, content, repo_data, categories=None, tags=None):
     final_categories = categories or ["GitHub Trending", "开源项目"]
     # 默认标签 + 从仓库推导的标签
     default_tags = ["GitHub", "Trending", "开源项目", "每日推荐", "自动发布", "自动化"]
-    derived = _derive_tags_from_repo(repo_data)
+    derived = _derive_tags_from_repo(repo_data, exclude=default_tags)
     final_tags = tags if tags is not None else (default_tags + [t for t in derived if t not in default_tags])
 
     post_data = {
@@ -298,30 +571,44 @@ def save_generated_post(title, content, repo_data, categories=None, tags=None):
         "tags": final_tags,
         "generated_at": datetime.now().isoformat()
     }
+    return post_data
+
 
-    with open('generated_post.json', 'w', encoding='utf-8') as f:
+def save_generated_post(title, content, repo_data, categories=None, tags=None,
+                        output_file=POST_FILE):
+    """保存生成的文章，参数含义同 build_post_data"""
+    post_data = build_post_data(title, content, repo_data, categories, tags)
+
+    with open(output_file, 'w', encoding='utf-8') as f:
         json.dump(post_data, f, ensure_ascii=False, indent=2)
 
-    print("文章已生成并保存到 generated_post.json")
+    log.info("文章已生成并保存到 %s", output_file)
 
 if __name__ == "__main__":
+    tracing.configure_logging()
     # 读取仓库数据
     repo_data = read_repo_data()
     if not repo_data:
-        print("无法读取仓库数据，退出")
+        log.error("无法读取仓库数据，退出")
         exit(1)
         
-    print(f"处理项目: {repo_data['name']}")
+    log.info("处理项目: %s", repo_data['name'])
+    
+    # 发布预检：今天已经发布过的仓库直接跳过，不消耗 token
+    from publish_to_halo import preflight
+    if preflight(repo_data):
+        exit(0)
     
     # 生成文章
     title, content = generate_post_with_deepseek(repo_data)
+    tracing.log_summary()
     
     if title and content:
         # 保存生成的文章
         save_generated_post(title, content, repo_data)
-        print("文章生成成功！")
-        print(f"标题: {title}")
-        print(f"文章长度: {len(content)} 字符")
+        log.info("文章生成成功！")
+        log.info("标题: %s", title)
+        log.info("文章长度: %d 字符", len(content))
     else:
-        print("文章生成失败")
+        log.error("文章生成失败")
         exit(1)
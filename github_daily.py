@@ -1,146 +1,150 @@
-import requests
-from bs4 import BeautifulSoup
 import json
-import csv
+import logging
 import os
 from datetime import datetime
 
-CSV_FILE = "processed_repos.csv"
+import tracing
+from dedup_store import DedupStore
+from github_enrich import enrich_repos
+from ranking import rank_candidates
+from snapshot_store import HISTORY_DIR, SnapshotStore
+from trending_crawler import crawl_trending
+
+log = logging.getLogger(__name__)
+
+CSV_FILE = os.getenv("PROCESSED_CSV", "processed_repos.csv")
+# 今日推荐的仓库信息（generate_post.py 的输入）
+REPO_FILE = os.getenv("GITHUB_DAILY_FILE", "github_daily.json")
+# 每次最多为多少个未处理的候选仓库补充元数据（一个 GraphQL 批次）
+ENRICH_LIMIT = int(os.getenv("GITHUB_ENRICH_LIMIT", "25"))
+# TRENDING_RANKING=0 时按页面顺序选择第一个未处理的仓库（原来的行为）
+RANKING_ENABLED = os.getenv("TRENDING_RANKING", "1") not in ("", "0", "false")
+
 
 def load_processed_repos():
-    """从 CSV 文件加载已处理的仓库列表"""
-    processed = set()
-    
+    """
+    加载已处理的仓库索引（DedupStore，支持 `url in processed`）。
+    只增量导入 CSV 新增的行，历史再长启动也不会变慢。
+    """
     if not os.path.exists(CSV_FILE):
-        print(f"CSV 文件不存在，将创建新文件: {CSV_FILE}")
-        return processed
-    
-    # 检查文件是否为空
-    if os.path.getsize(CSV_FILE) == 0:
-        print(f"CSV 文件为空，将跳过读取")
-        return processed
+        log.info("CSV 文件不存在，将创建新文件: %s", CSV_FILE)
     
     try:
-        with open(CSV_FILE, 'r', encoding='utf-8') as f:
-            reader = csv.DictReader(f)
-            row_count = 0
-            for row in reader:
-                row_count += 1
-                # 使用 URL 作为唯一标识（更可靠）
-                repo_url = row.get('url', '').strip()
-                if repo_url:
-                    processed.add(repo_url)
-            
-            if row_count == 0:
-                print(f"CSV 文件只包含表头，没有数据行")
-        
-        print(f"已加载 {len(processed)} 个已处理的仓库")
+        with tracing.span("dedup", op="load") as s:
+            processed = DedupStore(CSV_FILE)
+            if processed.needs_compaction():
+                processed.compact()
+            s.set(repos=len(processed))
+        log.info("已加载 %d 个已处理的仓库", len(processed))
         return processed
     except Exception as e:
-        print(f"读取 CSV 文件时出错: {e}")
-        import traceback
-        traceback.print_exc()
-        return processed
+        log.exception("读取去重索引时出错: %s", e)
+        return set()
 
-def save_processed_repo(repo_info):
-    """将已处理的仓库保存到 CSV 文件"""
-    file_exists = os.path.exists(CSV_FILE)
-    
-    print(f"=== 保存仓库到 CSV ===")
-    print(f"文件是否存在: {file_exists}")
-    print(f"仓库信息: {repo_info}")
+def save_processed_repos(repo_list, store=None):
+    """
+    将一个或多个已处理的仓库一次性追加到 CSV。
+    写入持有文件锁、只 fsync 一次，校验时只回读新增的部分。
+    """
+    log.info("=== 保存 %d 个仓库到 CSV ===", len(repo_list))
     
     try:
-        # 使用追加模式打开文件
-        with open(CSV_FILE, 'a', encoding='utf-8', newline='') as f:
-            fieldnames = ['name', 'url', 'processed_date']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            
-            # 如果文件不存在或为空，写入表头
-            if not file_exists or os.path.getsize(CSV_FILE) == 0:
-                print("写入 CSV 表头")
-                writer.writeheader()
-            
-            # 写入新记录
-            new_row = {
-                'name': repo_info['name'],
-                'url': repo_info['url'],
-                'processed_date': repo_info['date']
-            }
-            print(f"写入新行: {new_row}")
-            writer.writerow(new_row)
-            
-            # 确保数据立即写入磁盘
-            f.flush()
-            os.fsync(f.fileno())
-        
-        # 验证写入结果
-        if os.path.exists(CSV_FILE):
-            file_size = os.path.getsize(CSV_FILE)
-            print(f"CSV 文件大小: {file_size} 字节")
-            
-            # 读取并显示最新内容
-            with open(CSV_FILE, 'r', encoding='utf-8') as f:
-                content = f.read()
-                print(f"CSV 文件完整内容:\n{content}")
-        else:
-            print(f"错误: CSV 文件不存在: {CSV_FILE}")
-            
+        with tracing.span("dedup", op="save", rows=len(repo_list)):
+            store = store if isinstance(store, DedupStore) else DedupStore(CSV_FILE)
+            rows = store.record(repo_list)
+        for row in rows:
+            log.debug("写入新行: %s", row)
+        log.debug("CSV 文件大小: %d 字节", os.path.getsize(CSV_FILE))
+        return rows
     except Exception as e:
-        print(f"保存 CSV 文件时出错: {e}")
-        import traceback
-        traceback.print_exc()
-
-def get_trending_repos():
-    """获取所有趋势仓库"""
-    url = "https://github.com/trending"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-    }
-    
+        log.exception("保存 CSV 文件时出错: %s", e)
+        return []
+
+
+def save_processed_repo(repo_info, store=None):
+    """将已处理的仓库保存到 CSV 文件"""
+    return save_processed_repos([repo_info], store)
+
+def record_snapshot(repo_list, day=None):
+    """把当天抓到的完整 Trending 列表追加到历史快照（TRENDING_HISTORY_DIR 为空时不记录，失败不影响主流程）"""
+    if not HISTORY_DIR:
+        return 0
     try:
-        response = requests.get(url, headers=headers, timeout=30)
-        if response.status_code != 200:
-            print(f"Failed to fetch GitHub Trending. Status code: {response.status_code}")
-            return None
+        added = SnapshotStore(HISTORY_DIR).record(repo_list, day)
+        log.info("Trending 快照新增 %d 行", added)
+        return added
+    except Exception as e:
+        log.warning("记录 Trending 快照时出错: %s", e)
+        return 0
 
-        soup = BeautifulSoup(response.text, "html.parser")
-        repos = soup.find_all("article", class_="Box-row")
+def get_trending_repos(sinces=None, languages=None):
+    """
+    获取所有趋势仓库。
+    默认只抓取每日全部语言榜单；可通过参数或 TRENDING_SINCE / TRENDING_LANGUAGES
+    环境变量并发抓取多个榜单，合并去重后返回（lists 字段记录所在榜单和排名）。
+    完整列表同时追加到 trending_history/ 历史快照。
+    """
+    try:
+        with tracing.span("scrape") as s:
+            repo_list = crawl_trending(sinces, languages)
+            s.set(repos=len(repo_list))
 
-        if not repos:
-            print("No repositories found.")
+        if not repo_list:
+            log.warning("No repositories found.")
             return None
 
-        repo_list = []
-        for repo in repos:
-            try:
-                repo_name = repo.h2.a.get_text(strip=True).replace("\n", "").replace(" ", "")
-                repo_url = "https://github.com" + repo.h2.a["href"]
-                
-                description_tag = repo.p
-                repo_desc = description_tag.get_text(strip=True) if description_tag else "No description"
-
-                # 获取星标数
-                stars_tag = repo.find("a", href=lambda x: x and "stargazers" in x)
-                stars = stars_tag.get_text(strip=True) if stars_tag else "N/A"
-
-                repo_list.append({
-                    "name": repo_name,
-                    "url": repo_url,
-                    "desc": repo_desc,
-                    "stars": stars,
-                    "date": datetime.now().strftime("%Y-%m-%d")
-                })
-            except Exception as e:
-                print(f"解析仓库信息时出错: {e}")
-                continue
+        today = datetime.now().strftime("%Y-%m-%d")
+        for repo in repo_list:
+            repo["date"] = today
+        record_snapshot(repo_list, today)
         
         return repo_list
         
     except Exception as e:
-        print(f"Error fetching trending repo: {e}")
+        log.error("Error fetching trending repo: %s", e)
         return None
 
+def rank_unprocessed(candidates, processed_repos):
+    """按 ranking.py 的得分排序候选仓库（Star 速度、动量、新鲜度、语言多样性、榜单排名），出错时保持原顺序"""
+    if not RANKING_ENABLED or not candidates:
+        return candidates
+    try:
+        store = SnapshotStore(HISTORY_DIR) if HISTORY_DIR else None
+        recent = processed_repos.recent(10) if isinstance(processed_repos, DedupStore) else []
+        ranked = rank_candidates(candidates, store, recent)
+        log.info("候选排序: %s", ", ".join(f"{r['name']}({r['score']})" for r in ranked[:5]))
+        return ranked
+    except Exception as e:
+        log.warning("候选排序出错，按页面顺序选择: %s", e)
+        return candidates
+
+def enrich_candidates(repo_list, processed_repos):
+    """
+    过滤掉已处理的仓库并排序，为排在前面的若干个候选仓库批量补充元数据
+    （topics、License、README 等），返回排序后的候选列表
+    """
+    candidates = [repo for repo in repo_list if repo['url'] not in processed_repos]
+    candidates = rank_unprocessed(candidates, processed_repos)
+    try:
+        enrich_repos(candidates[:ENRICH_LIMIT])
+    except Exception as e:
+        log.warning("补充仓库元数据时出错（不影响后续流程）: %s", e)
+    return candidates
+
+def pick_unprocessed(repo_list, processed_repos):
+    """找到第一个未处理过的仓库并记录到 CSV"""
+    for repo in repo_list:
+        if repo['url'] not in processed_repos:
+            log.info("找到未处理的仓库: %s (%s)", repo['name'], repo['url'])
+            # 保存到 CSV
+            save_processed_repo(repo, processed_repos)
+            return repo
+        else:
+            log.debug("仓库已处理过，跳过: %s (%s)", repo['name'], repo['url'])
+    
+    log.warning("所有趋势仓库都已处理过")
+    return None
+
 def get_trending_repo():
     """获取第一个未处理过的趋势仓库"""
     processed_repos = load_processed_repos()
@@ -149,29 +153,21 @@ def get_trending_repo():
     if not repo_list:
         return None
     
-    # 遍历趋势列表，找到第一个未处理过的仓库
-    for repo in repo_list:
-        if repo['url'] not in processed_repos:
-            print(f"找到未处理的仓库: {repo['name']} ({repo['url']})")
-            # 保存到 CSV
-            save_processed_repo(repo)
-            return repo
-        else:
-            print(f"仓库已处理过，跳过: {repo['name']} ({repo['url']})")
-    
-    print("所有趋势仓库都已处理过")
-    return None
+    candidates = enrich_candidates(repo_list, processed_repos)
+    return pick_unprocessed(candidates, processed_repos)
 
-def save_to_json(data, file_path="github_daily.json"):
+def save_to_json(data, file_path=REPO_FILE):
     with open(file_path, "w", encoding="utf-8") as f:
         json.dump(data, f, ensure_ascii=False, indent=2)
-    print(f"Saved trending repo to {file_path}")
+    log.info("Saved trending repo to %s", file_path)
 
 if __name__ == "__main__":
+    tracing.configure_logging()
     repo_info = get_trending_repo()
+    tracing.log_summary()
     if repo_info:
         save_to_json(repo_info)
-        print(f"今日推荐: {repo_info['name']}")
+        log.info("今日推荐: %s", repo_info['name'])
     else:
-        print("未能获取 Trending 数据")
+        log.error("未能获取 Trending 数据")
         exit(1)
\ No newline at end of file
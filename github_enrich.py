@@ -0,0 +1,254 @@
+import json
+import logging
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import http_client
+
+log = logging.getLogger(__name__)
+
+GRAPHQL_URL = os.getenv("GITHUB_GRAPHQL_URL", "https://api.github.com/graphql")
+# 仓库元数据缓存：TTL 内直接使用；过期后先用轻量查询探测 pushedAt，没变化就不重新拉 README
+CACHE_FILE = os.getenv("GITHUB_META_CACHE", ".github_meta_cache.json")
+CACHE_TTL = int(os.getenv("GITHUB_META_TTL", str(6 * 3600)))
+CACHE_MAX_AGE = 7 * 24 * 3600
+# 每个 GraphQL 请求查询的仓库数
+BATCH_SIZE = int(os.getenv("GITHUB_GRAPHQL_BATCH", "25"))
+README_MAX_CHARS = 200_000
+README_EXCERPT_CHARS = 500
+README_PATHS = ("README.md", "readme.md", "README.rst", "README")
+
+_FULL_FIELDS = """
+    nameWithOwner
+    description
+    homepageUrl
+    stargazerCount
+    forkCount
+    pushedAt
+    isArchived
+    primaryLanguage { name }
+    licenseInfo { spdxId name }
+    repositoryTopics(first: 20) { nodes { topic { name } } }
+    latestRelease { tagName name publishedAt }
+""" + "".join(
+    f'    readme{i}: object(expression: "HEAD:{path}") {{ ... on Blob {{ text }} }}\n'
+    for i, path in enumerate(README_PATHS)
+)
+# 探测用的轻量字段
+_PROBE_FIELDS = """
+    nameWithOwner
+    stargazerCount
+    forkCount
+    pushedAt
+"""
+
+
+def _repo_key(url: str) -> tuple | None:
+    """从仓库 URL 得到 (owner, name)"""
+    parts = [p for p in urlsplit(url).path.split("/") if p]
+    if len(parts) < 2:
+        return None
+    return parts[0], parts[1]
+
+
+def _cache_id(owner: str, name: str) -> str:
+    return f"{owner}/{name}".lower()
+
+
+# 缓存文件里有每个仓库的 README（最多约 200KB），同一进程内只解析一次：
+# path -> ((mtime_ns, size), cache)，文件被其他进程改写后重新读取
+_memo = {}
+_memo_lock = threading.Lock()
+
+
+def _signature(path: str):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _load_cache(path: str) -> dict:
+    """读取元数据缓存；返回的字典在进程内共享，修改后应调用 _save_cache"""
+    if not path:
+        return {}
+    with _memo_lock:
+        sig = _signature(path)
+        if sig is None:
+            return {}
+        memo = _memo.get(path)
+        if memo and memo[0] == sig:
+            return memo[1]
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+        _memo[path] = (sig, cache)
+        return cache
+
+
+def _save_cache(path: str, cache: dict):
+    if not path:
+        return
+    now = time.time()
+    cache = {k: v for k, v in cache.items() if now - v.get("fetched_at", 0) < CACHE_MAX_AGE}
+    tmp = f"{path}.tmp"
+    with _memo_lock:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+        os.replace(tmp, path)
+        _memo[path] = (_signature(path), cache)
+
+
+def _build_query(keys: list, fields: str) -> tuple:
+    """为一批仓库构建带别名的 GraphQL 查询，仓库名通过变量传入"""
+    decls = []
+    selections = []
+    variables = {}
+    for i, (owner, name) in enumerate(keys):
+        decls.append(f"$o{i}: String!, $n{i}: String!")
+        selections.append(f"  r{i}: repository(owner: $o{i}, name: $n{i}) {{{fields}  }}")
+        variables[f"o{i}"] = owner
+        variables[f"n{i}"] = name
+    query = f"query({', '.join(decls)}) {{\n" + "\n".join(selections) + "\n}"
+    return query, variables
+
+
+def _run_batch(keys: list, fields: str, token: str) -> dict:
+    """
+    执行一批查询，返回 {别名序号: 节点}，不存在的仓库节点为 None；
+    请求整体失败返回 None。
+    """
+    query, variables = _build_query(keys, fields)
+    response = http_client.post(
+        GRAPHQL_URL,
+        headers={"Authorization": f"bearer {token}", "Content-Type": "application/json"},
+        json={"query": query, "variables": variables},
+        timeout=30,
+    )
+    if response.status_code != 200:
+        log.warning("GitHub GraphQL 请求失败: %d - %s", response.status_code, response.text[:200])
+        return None
+    body = response.json()
+    for err in body.get("errors") or []:
+        log.warning("GitHub GraphQL 警告: %s", err.get("message"))
+    data = body.get("data") or {}
+    return {int(alias[1:]): node for alias, node in data.items()}
+
+
+def _normalize(node: dict) -> dict:
+    """把 GraphQL 节点整理成扁平的元数据"""
+    readme = ""
+    for i in range(len(README_PATHS)):
+        blob = node.get(f"readme{i}") or {}
+        if blob.get("text"):
+            readme = blob["text"][:README_MAX_CHARS]
+            break
+    release = node.get("latestRelease") or None
+    license_info = node.get("licenseInfo") or {}
+    return {
+        "full_name": node.get("nameWithOwner"),
+        "description": node.get("description") or "",
+        "homepage": node.get("homepageUrl") or "",
+        "stars": node.get("stargazerCount"),
+        "forks": node.get("forkCount"),
+        "pushed_at": node.get("pushedAt"),
+        "archived": bool(node.get("isArchived")),
+        "primary_language": (node.get("primaryLanguage") or {}).get("name") or "",
+        "license": license_info.get("spdxId") or license_info.get("name") or "",
+        "topics": [n["topic"]["name"] for n in (node.get("repositoryTopics") or {}).get("nodes") or []],
+        "latest_release": {
+            "tag": release.get("tagName"),
+            "name": release.get("name"),
+            "published_at": release.get("publishedAt"),
+        } if release else None,
+        "readme": readme,
+    }
+
+
+def _batched(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _public_meta(record: dict) -> dict:
+    """写入 repo dict 的元数据（README 只保留摘要，全文通过 get_readme 读取）"""
+    meta = {k: v for k, v in record.items() if k != "readme"}
+    meta["readme_excerpt"] = (record.get("readme") or "")[:README_EXCERPT_CHARS]
+    return meta
+
+
+def enrich_repos(repos: list, token: str | None = None, force: bool = False,
+                 cache_file: str = CACHE_FILE) -> list:
+    """
+    为候选仓库补充 topics、主语言、License、最近推送时间、最新 Release 与 README。
+    每批仓库只发一个带别名的 GraphQL 请求；结果写入 repo["meta"]。
+    未配置 GITHUB_TOKEN 时（GraphQL 需要认证）直接跳过。
+    """
+    token = token or os.getenv("GITHUB_TOKEN")
+    if not token:
+        log.info("未设置 GITHUB_TOKEN，跳过仓库元数据补充")
+        return repos
+
+    cache = _load_cache(cache_file)
+    now = time.time()
+    keyed = [(repo, _repo_key(repo.get("url") or "")) for repo in repos]
+    keyed = [(repo, key) for repo, key in keyed if key]
+
+    fresh, stale, missing = [], [], []
+    for repo, key in keyed:
+        entry = cache.get(_cache_id(*key))
+        if entry is None or force:
+            missing.append(key)
+        elif now - entry.get("fetched_at", 0) < CACHE_TTL:
+            fresh.append(key)
+        else:
+            stale.append(key)
+    missing = list(dict.fromkeys(missing))
+    stale = list(dict.fromkeys(stale))
+
+    # 过期条目：轻量探测，pushedAt 没变只更新计数，变了再完整拉取
+    for batch in _batched(stale, BATCH_SIZE):
+        nodes = _run_batch(batch, _PROBE_FIELDS, token) or {}
+        for i, key in enumerate(batch):
+            node = nodes.get(i)
+            entry = cache[_cache_id(*key)]
+            if entry["data"] is None or not node:
+                missing.append(key)
+            elif node.get("pushedAt") == entry["data"].get("pushed_at"):
+                entry["data"]["stars"] = node.get("stargazerCount")
+                entry["data"]["forks"] = node.get("forkCount")
+                entry["fetched_at"] = now
+            else:
+                missing.append(key)
+
+    for batch in _batched(missing, BATCH_SIZE):
+        nodes = _run_batch(batch, _FULL_FIELDS, token)
+        if nodes is None:
+            continue
+        for i, key in enumerate(batch):
+            # 不存在/无权限的仓库也缓存（data 为 None），TTL 内不再重复查询
+            node = nodes.get(i)
+            cache[_cache_id(*key)] = {"fetched_at": now, "data": _normalize(node) if node else None}
+
+    log.info("仓库元数据: 缓存命中 %d，探测 %d，完整拉取 %d", len(fresh), len(stale), len(missing))
+    _save_cache(cache_file, cache)
+
+    for repo, key in keyed:
+        entry = cache.get(_cache_id(*key))
+        if entry and entry["data"]:
+            repo["meta"] = _public_meta(entry["data"])
+    return repos
+
+
+def get_readme(repo: dict, cache_file: str = CACHE_FILE) -> str:
+    """从元数据缓存读取仓库 README 全文（需先调用 enrich_repos）"""
+    key = _repo_key(repo.get("url") or "")
+    if not key:
+        return ""
+    entry = _load_cache(cache_file).get(_cache_id(*key))
+    return ((entry or {}).get("data") or {}).get("readme") or ""
@@ -0,0 +1,408 @@
+import html
+import os
+import re
+
+# 为 1 时把目录（h2/h3）插入到第一个目录标题之前；默认只生成、不插入（主题一般自带目录）
+INSERT_TOC = os.getenv("ARTICLE_TOC", "0") == "1"
+TOC_LEVELS = (2, 3)
+
+# 允许保留的标签；不在其中的标签去掉标签本身、保留内容（html、body、font…）
+ALLOWED_TAGS = {
+    "p", "h1", "h2", "h3", "h4", "h5", "h6", "ul", "ol", "li", "pre", "code", "strong", "em",
+    "b", "i", "u", "s", "del", "blockquote", "a", "br", "hr", "img", "span", "div", "table",
+    "thead", "tbody", "tr", "th", "td", "sup", "sub", "kbd", "mark", "details", "summary",
+    "figure", "figcaption", "nav", "section",
+}
+# 连同内容一起去掉的标签
+DROPPED_TAGS = {"head", "title", "iframe", "object", "embed", "svg", "math", "noscript", "form", "select"}
+# 内容不按 HTML 解析、直接跳到结束标签的标签
+RAW_TEXT_TAGS = {"script", "style", "textarea", "template"}
+
+# 跨行未闭合的标签最多保留这么多字符，超过则按普通文本处理（保证线性时间）
+MAX_TAG_CHARS = 2048
+
+_TAG = re.compile(r"<(/?)([a-zA-Z][a-zA-Z0-9]*)([^<>]*)>")
+_TAG_START = re.compile(r"<(?:/?[a-zA-Z]|!)")
+_ENTITY = re.compile(r"&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);")
+_ID_ATTR = re.compile(r"""\bid\s*=\s*["']([^"']*)["']""", re.IGNORECASE)
+_EVENT_ATTR = re.compile(r"""[\s/]+on[a-z]+\s*=\s*(?:"[^"]*"|'[^']*'|[^\s>]+)""", re.IGNORECASE)
+_JS_URL_ATTR = re.compile(
+    r"""[\s/]+(?:href|src)\s*=\s*(?:"\s*javascript:[^"]*"|'\s*javascript:[^']*'|javascript:[^\s>]*)""",
+    re.IGNORECASE)
+# <pre>/<code> 内位于行尾、可能被拆开的 </code>、</pre>
+_PARTIAL_CODE_TAG = re.compile(r"</?(?:c|co|cod|code|p|pr|pre)?\s*$", re.IGNORECASE)
+_FENCE_LANG = re.compile(r"\w+")
+_SLUG_SEP = re.compile(r"[^\w]+")
+
+# 各状态下需要特殊处理的字符，其余字符整段原样复制
+_TEXT_SPECIAL = re.compile(r"[<&`]")
+_CODE_SPECIAL = re.compile(r"[<>&]")
+_INLINE_SPECIAL = re.compile(r"[<`\n]")
+# 出现这些标签说明行内代码没有闭合（Vec<T> 之类不是 HTML 标签，仍算代码内容）
+_HTML_TAGS = ALLOWED_TAGS | DROPPED_TAGS | RAW_TEXT_TAGS | {"html", "body"}
+
+
+class HtmlNormalizer:
+    """
+    生成文章的流式 HTML 规范化：每个字符只处理一次，可以边接收边调用 feed。
+    - ``` 代码块转换为 <pre><code class="language-xxx">，内容做 HTML 转义
+    - 行内 `code` 转换为 <code>（不跨段落，不处理已有 <code>/<pre> 里的反引号）
+    - 已有 <code>/<pre> 中未转义的 <、>、& 补上转义（已有的实体保持不变）
+    - 缺少 id 的标题补上 id，并收集 h2/h3 生成目录
+    - 去掉不允许的标签、事件属性和 javascript: 链接；完整 HTML 文档只保留正文
+    """
+
+    def __init__(self):
+        self.toc = []            # [(级别, id, 标题 HTML)]
+        self.toc_offset = None   # 第一个目录标题在输出中的位置
+        self.first_h1 = ""
+        self.doc_title = ""
+        self._out = []
+        self._emitted = 0
+        self._pending = []       # 还没有换行符的一行
+        self._carry = ""         # 跨行未闭合的标签
+        self._fence = False
+        self._fence_first = False
+        self._pre = False
+        self._code = False
+        self._inline = None      # 行内代码内容（在 `...` 之中时）
+        self._raw_close = None   # 在 script/style 等标签中时为 "</script" 等
+        self._comment = False
+        self._suppress = []      # 正在被整体去掉的标签
+        self._heading = None
+        self._title_parts = None
+        self._ids = set()
+        self._id_next = {}       # 重名标题的下一个序号
+
+    # ---- 输入 ----
+    def feed(self, text: str) -> str:
+        """输入一段文本，返回这段文本产生的规范化输出（未完成的行会留到下次）"""
+        if not text:
+            return ""
+        if "\n" not in text:
+            self._pending.append(text)
+            return ""
+        lines = ("".join(self._pending) + text).split("\n")
+        tail = lines.pop()
+        self._pending = [tail] if tail else []
+        for line in lines:
+            self._line(line + "\n")
+        return self._drain()
+
+    def finish(self) -> str:
+        """输入结束：处理最后一行并闭合所有未闭合的结构，返回剩余输出"""
+        if self._pending:
+            self._line("".join(self._pending))
+            self._pending = []
+        self._end_inline(closed=False)
+        if self._carry:
+            self._text(html.escape(self._carry, quote=False))
+            self._carry = ""
+        if self._fence:
+            self._emit("</code></pre>")
+            self._fence = False
+        if self._heading:
+            self._end_heading()
+        if self._code:
+            self._emit("</code>")
+        if self._pre:
+            self._emit("</pre>")
+        self._code = self._pre = False
+        return self._drain()
+
+    def toc_html(self) -> str:
+        """目录 HTML（h3 嵌套在前一个 h2 之下）；没有目录标题时返回空字符串"""
+        if not self.toc:
+            return ""
+        parts = ['<nav class="toc"><ul>']
+        top = min(level for level, _, _ in self.toc)
+        depth = 0
+        for i, (level, anchor, label) in enumerate(self.toc):
+            nested = 1 if level > top else 0
+            if i:
+                if nested > depth:
+                    parts.append("<ul>")
+                elif nested < depth:
+                    parts.append("</li></ul></li>")
+                else:
+                    parts.append("</li>")
+            depth = nested
+            parts.append(f'<li><a href="#{anchor}">{label}</a>')
+        parts.append("</li></ul></li>" if depth else "</li>")
+        parts.append("</ul></nav>\n")
+        return "".join(parts)
+
+    # ---- 输出 ----
+    def _drain(self) -> str:
+        out = "".join(self._out)
+        self._out = []
+        return out
+
+    def _emit(self, s: str):
+        if self._suppress or not s:
+            return
+        if self._heading is not None:
+            self._heading["parts"].append(s)
+        else:
+            self._out.append(s)
+            self._emitted += len(s)
+
+    def _text(self, s: str):
+        """正文文本（已转义），同时收集标题 / <title> 的文字"""
+        if self._title_parts is not None:
+            self._title_parts.append(s)
+        if self._heading is not None and not self._suppress:
+            self._heading["text"].append(s)
+        self._emit(s)
+
+    # ---- 行级：``` 代码块 ----
+    def _line(self, line: str):
+        if self._carry:
+            line, self._carry = self._carry + line, ""
+        elif self._inline is not None and not line.strip():
+            # 行内代码不跨段落：遇到空行说明那个反引号只是普通字符
+            self._end_inline(closed=False)
+        elif not (self._fence or self._pre or self._code or self._raw_close
+                  or self._comment or self._heading or self._inline is not None):
+            stripped = line.strip()
+            if stripped.startswith("```"):
+                lang = _FENCE_LANG.match(stripped, 3)
+                self._emit(f'<pre><code class="language-{lang.group(0) if lang else ""}">')
+                self._fence = True
+                self._fence_first = True
+                return
+        if self._fence:
+            if line.strip().startswith("```"):
+                self._emit("</code></pre>")
+                self._fence = False
+                self._scan(line.split("```", 1)[1])
+                return
+            code = line[:-1] if line.endswith("\n") else line
+            self._emit(("" if self._fence_first else "\n") + html.escape(code, quote=False))
+            self._fence_first = False
+            return
+        self._scan(line)
+
+    # ---- 字符级 ----
+    def _scan(self, s: str):
+        pos, n = 0, len(s)
+        low = None
+        while pos < n:
+            if self._comment:
+                end = s.find("-->", pos)
+                if end < 0:
+                    return
+                self._comment = False
+                pos = end + 3
+            elif self._raw_close:
+                low = low or s.lower()
+                end = low.find(self._raw_close, pos)
+                if end < 0:
+                    return
+                close = s.find(">", end)
+                self._raw_close = None
+                pos = n if close < 0 else close + 1
+            elif self._inline is not None:
+                m = _INLINE_SPECIAL.search(s, pos)
+                end = m.start() if m else n
+                self._inline.append(s[pos:end])
+                if not m:
+                    return
+                ch = s[end]
+                if ch == "`":
+                    self._end_inline(closed=True)
+                    pos = end + 1
+                elif ch == "<" and not self._is_html_tag(s, end):
+                    self._inline.append("<")
+                    pos = end + 1
+                else:
+                    # 到换行或 HTML 标签仍未闭合：那个反引号只是普通字符，标签 / 换行照常处理
+                    self._end_inline(closed=False)
+                    pos = end
+            elif self._pre or self._code:
+                pos = self._scan_code(s, pos)
+            else:
+                pos = self._scan_text(s, pos)
+                if pos is None:
+                    return
+
+    def _scan_text(self, s: str, pos: int):
+        m = _TEXT_SPECIAL.search(s, pos)
+        end = m.start() if m else len(s)
+        self._text(s[pos:end])
+        if not m:
+            return len(s)
+        ch = s[end]
+        if ch == "`":
+            if s.startswith("``", end):
+                self._text("``")
+                return end + 2
+            self._inline = []
+            return end + 1
+        if ch == "&":
+            self._text(self._amp(s, end))
+            return end + 1
+        if s.startswith("<!--", end):
+            self._comment = True
+            return end + 4
+        if not _TAG_START.match(s, end):
+            self._text("&lt;")
+            return end + 1
+        close = s.find(">", end)
+        if close < 0:
+            if len(s) - end <= MAX_TAG_CHARS:
+                self._carry = s[end:]
+                return None
+            self._text("&lt;")
+            return end + 1
+        if s[end + 1] == "!":
+            return close + 1  # <!DOCTYPE ...> 之类
+        m = _TAG.match(s, end)
+        if not m:
+            self._text("&lt;")
+            return end + 1
+        self._tag(m.group(1) == "/", m.group(2).lower(), m.group(3), m.group(0))
+        return m.end()
+
+    def _scan_code(self, s: str, pos: int) -> int:
+        """<pre>/<code> 内：只识别 <code>、</code>、</pre>，其余 <、>、& 转义"""
+        m = _CODE_SPECIAL.search(s, pos)
+        end = m.start() if m else len(s)
+        self._text(s[pos:end])
+        if not m:
+            return len(s)
+        ch = s[end]
+        if ch == "&":
+            self._text(self._amp(s, end))
+            return end + 1
+        if ch == ">":
+            self._text("&gt;")
+            return end + 1
+        tag = _TAG.match(s, end)
+        name = tag.group(2).lower() if tag else ""
+        closing = tag is not None and tag.group(1) == "/"
+        if (closing and name in ("code", "pre")) or (name == "code" and not closing and not self._code):
+            self._tag(closing, name, tag.group(3), tag.group(0))
+            return tag.end()
+        if tag is None and _PARTIAL_CODE_TAG.match(s, end):
+            self._carry = s[end:]  # 结束标签被拆到了下一行
+            return len(s)
+        self._text("&lt;")
+        return end + 1
+
+    @staticmethod
+    def _amp(s: str, pos: int) -> str:
+        return "&" if _ENTITY.match(s, pos) else "&amp;"
+
+    @staticmethod
+    def _is_html_tag(s: str, pos: int) -> bool:
+        if s.startswith("<!--", pos):
+            return True
+        m = _TAG.match(s, pos)
+        return m is not None and m.group(2).lower() in _HTML_TAGS
+
+    def _end_inline(self, closed: bool):
+        if self._inline is None:
+            return
+        raw = "".join(self._inline)
+        self._inline = None
+        if closed:
+            code = "".join(
+                self._amp(raw, i) if ch == "&" else html.escape(ch, quote=False) if ch in "<>" else ch
+                for i, ch in enumerate(raw)
+            ) if _CODE_SPECIAL.search(raw) else raw
+            self._text(f"<code>{code}</code>")
+            return
+        # 未闭合：反引号和缓存的内容按普通正文重新扫描，不做转义
+        self._text("`")
+        pos = 0
+        while pos is not None and pos < len(raw):
+            pos = self._scan_text(raw, pos)
+
+    # ---- 标签 ----
+    def _tag(self, closing: bool, name: str, attrs: str, raw: str):
+        if name in RAW_TEXT_TAGS:
+            if not closing:
+                self._raw_close = "</" + name
+            return
+        if name in DROPPED_TAGS:
+            if closing:
+                if name in self._suppress:
+                    del self._suppress[len(self._suppress) - 1 - self._suppress[::-1].index(name):]
+                if name == "title" and self._title_parts is not None:
+                    self.doc_title = html.unescape("".join(self._title_parts)).strip()
+                    self._title_parts = None
+            else:
+                self._suppress.append(name)
+                if name == "title" and not self.doc_title:
+                    self._title_parts = []
+            return
+        if self._suppress or name not in ALLOWED_TAGS:
+            return
+        if name == "pre":
+            self._pre = not closing
+        elif name == "code":
+            self._code = not closing
+        if len(name) == 2 and name[0] == "h" and name[1] in "123456":
+            if closing:
+                if self._heading and self._heading["name"] == name:
+                    self._end_heading()
+                    return
+            else:
+                if self._heading:
+                    self._end_heading()
+                self._heading = {"name": name, "attrs": self._clean_attrs(attrs), "parts": [], "text": []}
+                return
+        self._emit(raw if closing else f"<{name}{self._clean_attrs(attrs)}>")
+
+    @staticmethod
+    def _clean_attrs(attrs: str) -> str:
+        if not attrs:
+            return ""
+        return _JS_URL_ATTR.sub("", _EVENT_ATTR.sub("", attrs))
+
+    def _end_heading(self):
+        heading, self._heading = self._heading, None
+        name, attrs = heading["name"], heading["attrs"]
+        label = "".join(heading["text"]).strip()
+        existing = _ID_ATTR.search(attrs)
+        if existing:
+            anchor = existing.group(1)
+            self._ids.add(anchor)
+        else:
+            anchor = self._make_id(label)
+            attrs = attrs.rstrip() + f' id="{anchor}"'
+        level = int(name[1])
+        if level == 1 and not self.first_h1:
+            self.first_h1 = html.unescape(re.sub(r"<[^>]+>", "", label)).strip()
+        if level in TOC_LEVELS and label:
+            if self.toc_offset is None:
+                self.toc_offset = self._emitted
+            self.toc.append((level, anchor, re.sub(r"<[^>]+>", "", label)))
+        self._emit(f"<{name}{attrs}>{''.join(heading['parts'])}</{name}>")
+
+    def _make_id(self, label: str) -> str:
+        plain = html.unescape(re.sub(r"<[^>]+>", "", label)).lower()
+        base = _SLUG_SEP.sub("-", plain).strip("-_")[:60].rstrip("-_") or f"section-{len(self._ids) + 1}"
+        anchor, n = base, self._id_next.get(base, 2)
+        while anchor in self._ids:
+            anchor, n = f"{base}-{n}", n + 1
+        self._id_next[base] = n
+        self._ids.add(anchor)
+        return anchor
+
+
+def normalize_html(text: str, insert_toc: bool = INSERT_TOC) -> str:
+    """一次性规范化整篇文章（非流式场景）"""
+    normalizer = HtmlNormalizer()
+    content = normalizer.feed(text) + normalizer.finish()
+    return insert_toc_html(content, normalizer) if insert_toc else content
+
+
+def insert_toc_html(content: str, normalizer: HtmlNormalizer) -> str:
+    """把目录插入到第一个目录标题之前"""
+    toc = normalizer.toc_html()
+    if not toc:
+        return content
+    offset = normalizer.toc_offset or 0
+    return content[:offset] + toc + content[offset:]
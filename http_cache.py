@@ -0,0 +1,402 @@
+import base64
+import contextlib
+import fnmatch
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+import requests
+from requests.models import PreparedRequest
+from requests.structures import CaseInsensitiveDict
+
+log = logging.getLogger(__name__)
+
+# http_client 的传输层缓存，三个脚本的请求共用。模式（HTTP_CACHE）：
+#   on（默认） GET 响应存到 HTTP_CACHE_DIR，新鲜期内直接使用，过期后带 ETag / Last-Modified 条件请求，304 时复用
+#   off        不缓存
+#   record     正常请求，并把每个请求的最终响应录制到 HTTP_CASSETTE（所有方法，含 POST；流式响应先完整读入）
+#   replay     只从 HTTP_CASSETTE 回放，不访问网络；没有录制的请求抛出 ReplayMissError
+MODE = os.getenv("HTTP_CACHE", "on").strip().lower() or "on"
+MODES = ("on", "off", "record", "replay")
+CACHE_DIR = os.getenv("HTTP_CACHE_DIR", ".http_cache")
+CASSETTE_DIR = os.getenv("HTTP_CASSETTE", ".http_cassette")
+# 缓存目录的总大小上限（字节）和条目最长保存时间（秒，超过后连重新验证也不再使用）
+MAX_BYTES = int(os.getenv("HTTP_CACHE_MAX_BYTES", str(100 * 1024 * 1024)))
+MAX_AGE = int(os.getenv("HTTP_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+# 各接口的新鲜期（秒），按 "host/path" 通配符匹配，先匹配到的生效；
+# 没有匹配的接口使用响应的 Cache-Control: max-age，都没有时每次都重新验证。
+# HTTP_CACHE_TTL="github.com/trending*=1800,*/apis/content.halo.run/*=0" 追加（优先于默认规则）
+DEFAULT_TTLS = {
+    # Trending 榜单更新不频繁，十分钟内重跑直接复用
+    "github.com/trending*": 600,
+    # Halo 的分类/标签列表和文章查询决定是否创建、是否已发布，只做条件请求
+    "*/apis/content.halo.run/*": 0,
+}
+CACHEABLE_METHODS = ("GET", "HEAD")
+# 这些响应头不落盘：正文已解码、连接相关或带会话信息
+_DROP_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+
+
+def parse_ttls(spec: str) -> dict:
+    """解析 "pattern=seconds,..." 形式的 TTL 配置"""
+    ttls = {}
+    for item in (spec or "").split(","):
+        pattern, sep, seconds = item.strip().rpartition("=")
+        if not sep or not pattern:
+            continue
+        try:
+            ttls[pattern.strip().lower()] = float(seconds)
+        except ValueError:
+            log.warning("忽略无效的 HTTP_CACHE_TTL 配置: %s", item)
+    return ttls
+
+
+class ReplayMissError(requests.exceptions.RequestException):
+    """回放模式下没有这个请求的录制（不会重试）"""
+
+
+def _body_bytes(kwargs: dict) -> bytes:
+    """请求体的规范形式，用于计算键：json 按键排序，表单和原始数据按原样"""
+    if kwargs.get("json") is not None:
+        return json.dumps(kwargs["json"], ensure_ascii=False, sort_keys=True).encode("utf-8")
+    data = kwargs.get("data")
+    if data is None:
+        return b""
+    if isinstance(data, bytes):
+        return data
+    if isinstance(data, str):
+        return data.encode("utf-8")
+    if isinstance(data, dict):
+        return json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    return repr(data).encode("utf-8")
+
+
+def _full_url(url: str, params) -> str:
+    prepared = PreparedRequest()
+    prepared.prepare_url(url, params)
+    return prepared.url
+
+
+def _cache_control(headers) -> dict:
+    directives = {}
+    for part in (headers.get("Cache-Control") or "").split(","):
+        name, _, value = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = value.strip('"')
+    return directives
+
+
+def _encode_response(response) -> dict:
+    content = response.content
+    try:
+        body, encoding = content.decode("utf-8"), "utf-8"
+    except UnicodeDecodeError:
+        body, encoding = base64.b64encode(content).decode("ascii"), "base64"
+    return {
+        "status": response.status_code,
+        "reason": response.reason,
+        "headers": {k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS},
+        "body": body,
+        "body_encoding": encoding,
+        # 原响应的文本编码（可能为 None），还原时不再按响应头重新推断
+        "encoding": response.encoding,
+    }
+
+
+def _build_response(data: dict, url: str):
+    """由落盘的数据还原 requests.Response（正文已读入内存，iter_lines / iter_content 照常可用）"""
+    response = requests.Response()
+    response.status_code = data["status"]
+    response.reason = data.get("reason") or ""
+    response.headers = CaseInsensitiveDict(data.get("headers") or {})
+    body = data.get("body") or ""
+    response._content = base64.b64decode(body) if data.get("body_encoding") == "base64" else body.encode("utf-8")
+    response._content_consumed = True
+    response.url = url
+    if "encoding" in data:
+        response.encoding = data["encoding"]
+    elif "charset" in (response.headers.get("Content-Type") or "").lower() or data.get("body_encoding") != "utf-8":
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    else:
+        # 旧录制没有记下编码：正文本来就是按 UTF-8 存的，没有 charset 时不要退回 ISO-8859-1
+        response.encoding = "utf-8"
+    response.elapsed = timedelta(0)
+    return response
+
+
+def _write_json(path: str, data: dict):
+    tmp = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp, path)
+
+
+def _read_json(path: str) -> dict | None:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+class Exchange:
+    """
+    一次经过缓存层的请求。response 不为 None 时无需访问网络（source 为 hit / replay）；
+    validators 是要附加到请求上的条件请求头。
+    """
+
+    def __init__(self, cache: "HttpCache", method: str, url: str, key: str, request_headers):
+        self.cache = cache
+        self.method = method
+        self.url = url
+        self.key = key
+        self.request_headers = request_headers
+        self.entry = None
+        self.validators = {}
+        self.response = None
+        self.source = None
+
+    def complete(self, response):
+        """网络响应返回后调用：304 换成缓存的响应，可缓存的响应落盘，record 模式录制"""
+        return self.cache.complete(self, response)
+
+
+class HttpCache:
+    def __init__(self, mode: str = MODE, cache_dir: str = CACHE_DIR, cassette_dir: str = CASSETTE_DIR,
+                 ttls: dict | None = None, max_bytes: int = MAX_BYTES, max_age: int = MAX_AGE):
+        if mode not in MODES:
+            log.warning("未知的 HTTP_CACHE 模式 %s，按 off 处理", mode)
+            mode = "off"
+        self.mode = mode
+        self.cache_dir = cache_dir
+        self.cassette_dir = cassette_dir
+        if ttls is None:
+            ttls = parse_ttls(os.getenv("HTTP_CACHE_TTL", ""))
+            for pattern, ttl in DEFAULT_TTLS.items():
+                ttls.setdefault(pattern, ttl)
+        self.ttls = ttls
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        # record / replay：键 -> 本次运行中的交互列表 / 回放位置
+        self._recorded = {}
+        self._cursors = {}
+        self._evicted = False
+
+    # ---- 键与规则 ----
+    def ttl_for(self, url: str) -> float | None:
+        parts = urlsplit(url)
+        target = f"{(parts.hostname or '').lower()}{parts.path or '/'}"
+        for pattern, ttl in self.ttls.items():
+            if fnmatch.fnmatchcase(target, pattern):
+                return ttl
+        return None
+
+    @staticmethod
+    def _key(*material) -> str:
+        digest = hashlib.sha256()
+        for item in material:
+            digest.update(item if isinstance(item, bytes) else str(item).encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _cassette_path(self, method: str, url: str, key: str) -> str:
+        host = (urlsplit(url).hostname or "local").lower()
+        return os.path.join(self.cassette_dir, f"{host}-{method.lower()}-{key[:20]}.json")
+
+    def _cache_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    # ---- 请求前 ----
+    def begin(self, method: str, url: str, kwargs: dict, session_headers) -> Exchange | None:
+        """在发请求前调用；不经过缓存层的请求返回 None"""
+        if self.mode == "off":
+            return None
+        method = method.upper()
+        if self.mode == "on" and (method not in CACHEABLE_METHODS or kwargs.get("stream")):
+            return None
+        full_url = _full_url(url, kwargs.get("params"))
+        headers = CaseInsensitiveDict(session_headers or {})
+        headers.update(kwargs.get("headers") or {})
+        if self.mode == "on":
+            # 不同凭据拿到的内容可能不同，键里带上 Authorization 的摘要
+            key = self._key(method, full_url, hashlib.sha256((headers.get("Authorization") or "").encode()).hexdigest())
+        else:
+            # 录制与回放不依赖凭据，离线回放时可以不配置 token
+            key = self._key(method, full_url, _body_bytes(kwargs))
+        exchange = Exchange(self, method, full_url, key, headers)
+        if self.mode == "replay":
+            self._replay(exchange)
+        elif self.mode == "on":
+            self._lookup(exchange)
+        return exchange
+
+    def _replay(self, exchange: Exchange):
+        path = self._cassette_path(exchange.method, exchange.url, exchange.key)
+        with self._lock:
+            recording = self._recorded.get(path)
+            if recording is None:
+                recording = (_read_json(path) or {}).get("responses")
+                if not recording:
+                    raise ReplayMissError(f"没有录制的响应: {exchange.method} {exchange.url}")
+                self._recorded[path] = recording
+            # 同一个请求多次出现时按录制顺序返回，用完后重复最后一个
+            index = self._cursors.get(path, 0)
+            self._cursors[path] = index + 1
+        exchange.response = _build_response(recording[min(index, len(recording) - 1)], exchange.url)
+        exchange.source = "replay"
+
+    def _lookup(self, exchange: Exchange):
+        entry = _read_json(self._cache_path(exchange.key))
+        if not entry:
+            return
+        now = time.time()
+        if now - entry.get("stored_at", 0) > self.max_age:
+            return
+        for name, value in (entry.get("vary") or {}).items():
+            if (exchange.request_headers.get(name) or "") != value:
+                return
+        exchange.entry = entry
+        if now - entry.get("stored_at", 0) < entry.get("ttl", 0):
+            exchange.response = _build_response(entry, exchange.url)
+            exchange.source = "hit"
+            return
+        headers = entry.get("headers") or {}
+        etag = next((v for k, v in headers.items() if k.lower() == "etag"), None)
+        last_modified = next((v for k, v in headers.items() if k.lower() == "last-modified"), None)
+        if etag:
+            exchange.validators["If-None-Match"] = etag
+        if last_modified:
+            exchange.validators["If-Modified-Since"] = last_modified
+
+    # ---- 请求后 ----
+    def complete(self, exchange: Exchange, response):
+        if self.mode == "record":
+            self._record(exchange, response)
+            return response
+        if response.status_code == 304 and exchange.entry is not None:
+            entry = exchange.entry
+            # 304 可能带新的 ETag / Cache-Control，合并后刷新新鲜期
+            headers = CaseInsensitiveDict(entry.get("headers") or {})
+            headers.update({k: v for k, v in response.headers.items() if k.lower() not in _DROP_HEADERS})
+            entry["headers"] = dict(headers)
+            entry["stored_at"] = time.time()
+            self._store(exchange.key, entry)
+            response.close()
+            exchange.source = "revalidated"
+            return _build_response(entry, exchange.url)
+        if response.status_code == 200:
+            self._maybe_store(exchange, response)
+        return response
+
+    def _maybe_store(self, exchange: Exchange, response):
+        directives = _cache_control(response.headers)
+        request_directives = _cache_control(exchange.request_headers)
+        if "no-store" in directives or "no-store" in request_directives:
+            return
+        vary = [v.strip() for v in (response.headers.get("Vary") or "").split(",") if v.strip()]
+        if "*" in vary:
+            return
+        ttl = self.ttl_for(exchange.url)
+        if ttl is None:
+            ttl = 0.0
+            if "no-cache" not in directives and directives.get("max-age", "").isdigit():
+                ttl = float(directives["max-age"])
+        has_validator = bool(response.headers.get("ETag") or response.headers.get("Last-Modified"))
+        # 既不能直接复用也无法重新验证的响应没有缓存价值
+        if ttl <= 0 and not has_validator:
+            return
+        entry = {
+            "method": exchange.method,
+            "url": exchange.url,
+            **_encode_response(response),
+            "vary": {name: exchange.request_headers.get(name) or "" for name in vary},
+            "ttl": ttl,
+            "stored_at": time.time(),
+        }
+        self._store(exchange.key, entry)
+
+    def _store(self, key: str, entry: dict):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            _write_json(self._cache_path(key), entry)
+        except OSError as e:
+            log.warning("HTTP 缓存写入失败: %s", e)
+            return
+        if not self._evicted:
+            self._evicted = True
+            self.evict()
+
+    def _record(self, exchange: Exchange, response):
+        path = self._cassette_path(exchange.method, exchange.url, exchange.key)
+        data = _encode_response(response)
+        with self._lock:
+            # 本次运行第一次遇到这个请求时覆盖旧录制，之后按顺序追加
+            recording = self._recorded.setdefault(path, [])
+            recording.append(data)
+            os.makedirs(self.cassette_dir, exist_ok=True)
+            _write_json(path, {"method": exchange.method, "url": exchange.url, "responses": recording})
+
+    # ---- 维护 ----
+    def evict(self) -> int:
+        """删除超过 max_age 的条目；总大小超限时从最旧的开始删除。返回删除的条目数"""
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        now = time.time()
+        entries = []
+        removed = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json"):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                # 其他线程 / 进程可能同时在淘汰，文件已不存在就跳过
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    removed += 1
+            else:
+                entries.append((st.st_mtime, st.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                removed += 1
+            total -= size
+        return removed
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> HttpCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HttpCache()
+    return _cache
+
+
+def configure(mode: str | None = None, **kwargs) -> HttpCache:
+    """替换进程内的缓存层，例如 configure("replay", cassette_dir="fixtures/run")"""
+    global _cache
+    with _cache_lock:
+        _cache = HttpCache(mode or MODE, **kwargs)
+    return _cache
+
+
+def begin(method: str, url: str, kwargs: dict, session_headers) -> Exchange | None:
+    return get_cache().begin(method, url, kwargs, session_headers)
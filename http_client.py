@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+import tracing
+
+# requests（连同 urllib3、certifi）和 resilience 在第一次发请求时才导入，
+# 只读本地文件的命令（publish --dry-run、status）不必为它们付出约 100ms 的启动时间
+if TYPE_CHECKING:
+    import requests
+    from resilience import RetryPolicy
+
+# 可以通过 http_client.<名称> 引用的 requests 异常，按需从 requests.exceptions 取出
+_EXCEPTIONS = ("RequestException", "ConnectionError", "HTTPError", "Timeout", "ReadTimeout", "ChunkedEncodingError")
+
+# 每个 host 的连接池大小（可通过环境变量调整）
+POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "10"))
+DEFAULT_TIMEOUT = 30
+# 默认重试策略与熔断参数
+DEFAULT_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "3"))
+BREAKER_THRESHOLD = int(os.getenv("HTTP_BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("HTTP_BREAKER_RESET", "60"))
+
+
+def _accept_encoding() -> str:
+    """安装了 brotli 时额外协商 br 压缩（urllib3 会自动解码）"""
+    for mod in ("brotli", "brotlicffi"):
+        try:
+            __import__(mod)
+            return "gzip, deflate, br"
+        except ImportError:
+            continue
+    return "gzip, deflate"
+
+
+# host -> {"headers": {...}, "timeout": ..., "retry": RetryPolicy}
+_host_defaults = {}
+# host -> requests.Session
+_sessions = {}
+# host -> CircuitBreaker / TokenBucket（限流器首次请求时按 _limit_specs 创建）
+_breakers = {}
+_limiters = {}
+_limit_specs = {}
+_lock = threading.Lock()
+
+# 整个进程的时间预算（秒），HTTP_DEADLINE 未设置时不限制；从第一次请求开始计时
+_deadline_seconds = float(os.environ["HTTP_DEADLINE"]) if os.getenv("HTTP_DEADLINE") else None
+_deadline = None
+
+
+def __getattr__(name):
+    if name in _EXCEPTIONS:
+        import requests.exceptions
+        return getattr(requests.exceptions, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def configure_host(host: str, headers: dict | None = None, timeout=None,
+                   retry: "RetryPolicy | None" = None, rate: float | None = None,
+                   burst: float | None = None):
+    """
+    设置某个 host 的默认请求头、超时、重试策略和限流（rate 个/秒，最多突发 burst 个）。
+    已创建的 Session 会同步更新请求头。
+    """
+    host = host.lower()
+    with _lock:
+        conf = _host_defaults.setdefault(host, {"headers": {}, "timeout": None})
+        if headers:
+            conf["headers"].update(headers)
+        if timeout is not None:
+            conf["timeout"] = timeout
+        if retry is not None:
+            conf["retry"] = retry
+        if rate is not None:
+            _limit_specs[host] = (rate, burst)
+            _limiters.pop(host, None)
+        session = _sessions.get(host)
+        if session is not None and headers:
+            session.headers.update(headers)
+
+
+def set_deadline(seconds: float | None):
+    """设置整体时间预算，超出后所有请求（含重试等待）都会快速失败"""
+    global _deadline
+    from resilience import Deadline
+
+    _deadline = Deadline(seconds)
+
+
+def _current_deadline():
+    global _deadline
+    if _deadline is None:
+        from resilience import Deadline
+
+        with _lock:
+            if _deadline is None:
+                _deadline = Deadline(_deadline_seconds)
+    return _deadline
+
+
+def _host_of(url: str) -> str:
+    return (urlsplit(url).hostname or "").lower()
+
+
+def get_session(url: str) -> "requests.Session":
+    """返回该 URL 所在 host 的共享 Session（keep-alive + 连接池）"""
+    host = _host_of(url)
+    session = _sessions.get(host)
+    if session is not None:
+        return session
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    with _lock:
+        session = _sessions.get(host)
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers["Accept-Encoding"] = _accept_encoding()
+            session.headers["Connection"] = "keep-alive"
+            session.headers.update(_host_defaults.get(host, {}).get("headers") or {})
+            _sessions[host] = session
+    return session
+
+
+def _breaker_for(host: str):
+    breaker = _breakers.get(host)
+    if breaker is None:
+        from resilience import CircuitBreaker
+
+        with _lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker(BREAKER_THRESHOLD, BREAKER_RESET))
+    return breaker
+
+
+def _limiter_for(host: str):
+    spec = _limit_specs.get(host)
+    if spec is None:
+        return None
+    limiter = _limiters.get(host)
+    if limiter is None:
+        from resilience import TokenBucket
+
+        with _lock:
+            limiter = _limiters.setdefault(host, TokenBucket(*spec))
+    return limiter
+
+
+def request(method: str, url: str, retry: "RetryPolicy | None" = None, cache: bool = True,
+            **kwargs) -> "requests.Response":
+    """
+    通过共享 Session 发送请求。
+    未指定 timeout 时使用 host 默认值；按 host 限流、熔断，并对瞬时错误指数退避重试
+    （遵循 Retry-After）。传入 retry=RetryPolicy(max_retries=0) 可关闭重试。
+    请求经过 http_cache（HTTP_CACHE 模式），cache=False 时绕过缓存层。
+    """
+    import http_cache
+    from resilience import RetryPolicy, call_with_resilience
+
+    host = _host_of(url)
+    conf = _host_defaults.get(host) or {}
+    timeout = kwargs.pop("timeout", None)
+    if timeout is None:
+        timeout = conf.get("timeout") or DEFAULT_TIMEOUT
+    policy = retry or conf.get("retry") or RetryPolicy(max_retries=DEFAULT_MAX_RETRIES)
+    session = get_session(url)
+    attempts = 0
+
+    exchange = http_cache.begin(method, url, kwargs, session.headers) if cache else None
+    if exchange is not None:
+        if exchange.response is not None:
+            # 新鲜的缓存或回放：不访问网络，也不占用限流令牌
+            tracing.record_http(method, host, exchange.response.status_code, 0, 0.0, cache=exchange.source)
+            return exchange.response
+        if exchange.validators:
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), **exchange.validators}
+
+    def send(clip):
+        nonlocal attempts
+        attempts += 1
+        return session.request(method, url, timeout=clip(timeout), **kwargs)
+
+    started = time.perf_counter()
+    try:
+        response = call_with_resilience(
+            send, method, policy,
+            breaker=_breaker_for(host),
+            limiter=_limiter_for(host),
+            deadline=_current_deadline(),
+            label=host,
+        )
+    except Exception as e:
+        tracing.record_http(method, host, None, None, time.perf_counter() - started,
+                            max(0, attempts - 1), type(e).__name__)
+        raise
+    status, nbytes = response.status_code, _response_bytes(response, kwargs.get("stream"))
+    if exchange is not None:
+        response = exchange.complete(response)
+    tracing.record_http(method, host, status, nbytes, time.perf_counter() - started,
+                        max(0, attempts - 1), cache=exchange.source if exchange else None)
+    return response
+
+
+def _response_bytes(response: "requests.Response", stream) -> int | None:
+    """响应体大小：流式响应不读取正文，只看 Content-Length"""
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit():
+        return int(length)
+    return None if stream else len(response.content)
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    return request("POST", url, **kwargs)
+
+
+def close_all():
+    """关闭所有 Session，释放连接"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
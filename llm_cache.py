@@ -0,0 +1,94 @@
+import contextlib
+import hashlib
+import json
+import os
+import time
+
+# 大模型响应缓存目录，每个条目一个 JSON 文件，文件名为请求内容的 sha256
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+# 总大小上限（字节）和最长保存时间（秒）
+MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+MAX_AGE = int(os.getenv("LLM_CACHE_MAX_AGE", str(7 * 24 * 3600)))
+
+
+def bypass_enabled() -> bool:
+    """LLM_CACHE_BYPASS=1 时跳过缓存读取（仍会写入新结果）"""
+    return os.getenv("LLM_CACHE_BYPASS", "0") not in ("", "0", "false")
+
+
+def cache_key(model: str, prompt: str, params: dict) -> str:
+    """由模型、完整提示词和采样参数计算缓存键"""
+    material = json.dumps(
+        {"model": model, "prompt": prompt, "params": params},
+        ensure_ascii=False, sort_keys=True,
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def _path(key: str, cache_dir: str) -> str:
+    return os.path.join(cache_dir, f"{key}.json")
+
+
+def get(key: str, cache_dir: str = CACHE_DIR, max_age: int = MAX_AGE):
+    """命中时返回 (title, content)，否则返回 None"""
+    path = _path(key, cache_dir)
+    try:
+        if time.time() - os.path.getmtime(path) > max_age:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return entry.get("title"), entry.get("content")
+
+
+def put(key: str, title: str, content: str, meta: dict | None = None,
+        cache_dir: str = CACHE_DIR):
+    """写入缓存（原子替换），然后按大小/时间淘汰旧条目"""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry = {"title": title, "content": content, "meta": meta or {}, "created_at": time.time()}
+    path = _path(key, cache_dir)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(entry, f, ensure_ascii=False)
+    os.replace(tmp, path)
+    evict(cache_dir)
+
+
+def evict(cache_dir: str = CACHE_DIR, max_bytes: int = MAX_BYTES, max_age: int = MAX_AGE):
+    """
+    删除过期条目；总大小超限时按写入时间从最旧的开始删除（FIFO：命中不刷新 mtime，
+    这样 max_age 始终从生成时算起）。返回删除的条目数
+    """
+    if not os.path.isdir(cache_dir):
+        return 0
+    now = time.time()
+    entries = []
+    removed = 0
+    for name in os.listdir(cache_dir):
+        if not name.endswith(".json"):
+            continue
+        path = os.path.join(cache_dir, name)
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if now - st.st_mtime > max_age:
+            # 并发的 put 也在淘汰，文件可能已被别的线程删掉
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(path)
+                removed += 1
+        else:
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+            removed += 1
+        total -= size
+    return removed
@@ -0,0 +1,352 @@
+"""
+onedaygithub 统一命令行入口：
+
+    python onedaygithub.py fetch                   # 抓取 Trending，选出今日推荐写入 github_daily.json
+    python onedaygithub.py generate                # 调用 DeepSeek 生成文章写入 generated_post.json
+    python onedaygithub.py publish --dry-run       # 只在本地演练发布：slug、分类标签、台账状态
+    python onedaygithub.py run --resume            # 单进程流水线（同 pipeline.py）
+    python onedaygithub.py status                  # 今天的检查点、最近发布和已处理仓库数
+    python onedaygithub.py imports --budget 60     # 各子命令的冷启动导入耗时报告
+    python onedaygithub.py --http-cache replay run # 用录制的 HTTP 响应离线重现一次运行
+
+子命令用到的模块在子命令内部才导入，requests 也只在真正发请求时由 http_client 导入，
+所以 status、publish --dry-run 这类只读本地文件的命令只需几十毫秒。
+配置仍以环境变量为准：-e KEY=VALUE / --env-file 在导入任何模块之前写入环境变量。
+"""
+import argparse
+import logging
+import os
+import sys
+
+log = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 各子命令会导入的模块，imports 报告按这张表测量冷启动耗时
+COMMAND_MODULES = {
+    "fetch": ("github_daily",),
+    "generate": ("generate_post", "publish_to_halo"),
+    "publish": ("publish_to_halo",),
+    "run": ("pipeline", "github_daily", "generate_post", "publish_to_halo", "speculative"),
+    "status": ("pipeline", "publish_ledger", "dedup_store"),
+}
+
+
+# ---- 子命令 ----
+def _cmd_fetch(args) -> int:
+    import github_daily
+    import tracing
+
+    repo_info = github_daily.get_trending_repo()
+    tracing.log_summary()
+    if not repo_info:
+        log.error("未能获取 Trending 数据")
+        return 1
+    github_daily.save_to_json(repo_info, args.output or github_daily.REPO_FILE)
+    log.info("今日推荐: %s", repo_info['name'])
+    return 0
+
+
+def _cmd_generate(args) -> int:
+    import generate_post
+    import tracing
+    from publish_to_halo import preflight
+
+    repo_data = generate_post.read_repo_data(args.input or generate_post.REPO_FILE)
+    if not repo_data:
+        log.error("无法读取仓库数据，退出")
+        return 1
+    log.info("处理项目: %s", repo_data['name'])
+    # 发布预检：今天已经发布过的仓库直接跳过，不消耗 token
+    if preflight(repo_data):
+        return 0
+
+    title, content = generate_post.generate_post_with_deepseek(
+        repo_data, stream=False if args.no_stream else None, use_cache=False if args.no_cache else None)
+    tracing.log_summary()
+    if not (title and content):
+        log.error("文章生成失败")
+        return 1
+    generate_post.save_generated_post(title, content, repo_data, output_file=args.output or generate_post.POST_FILE)
+    log.info("标题: %s", title)
+    log.info("文章长度: %d 字符", len(content))
+    return 0
+
+
+def _cmd_publish(args) -> int:
+    import json
+
+    import publish_to_halo
+    import tracing
+
+    post_data = publish_to_halo.read_generated_post(args.input or publish_to_halo.POST_FILE)
+    if not post_data:
+        log.error("无法读取生成的文章数据")
+        return 1
+    if args.dry_run:
+        payload = publish_to_halo.dry_run(post_data)
+        if payload is None:
+            return 1
+        if args.payload:
+            print(json.dumps(payload, ensure_ascii=False, indent=2))
+        return 0
+
+    log.info("开始发布文章到 Halo...")
+    result = publish_to_halo.publish_to_halo(post_data)
+    tracing.log_summary()
+    if not result:
+        log.error("❌ 发布失败")
+        return 1
+    log.info("🎉 文章已发布到 Halo")
+    return 0
+
+
+def _cmd_run(args) -> int:
+    import pipeline
+    import tracing
+
+    ok = pipeline.run_pipeline(args.state or pipeline.STATE_FILE, args.resume, args.until, args.speculative)
+    tracing.log_summary()
+    if not ok:
+        return 1
+    log.info("\n🎉 流水线完成")
+    return 0
+
+
+def _status(state_file: str | None) -> dict:
+    import pipeline
+    from dedup_store import CSV_FILE, DB_FILE, DedupStore
+    from publish_ledger import PublishLedger
+
+    checkpoint = pipeline.Checkpoint(state_file or pipeline.STATE_FILE)
+    loaded = checkpoint.load()
+    ledger = PublishLedger()
+    latest = max(ledger.entries.values(), key=lambda e: e.get("published_at") or "", default=None)
+    processed = None
+    # 只读打开去重索引（不导入 CSV、不建库、不加锁）；索引还没建立时不显示
+    if os.path.exists(CSV_FILE) and os.path.exists(DB_FILE):
+        store = DedupStore(CSV_FILE, read_only=True)
+        processed = {"count": len(store), "recent": store.recent(3)}
+        store.close()
+    return {
+        "date": checkpoint.date,
+        "checkpoint": checkpoint.path if loaded else None,
+        "stages": {
+            stage: (checkpoint.stages[stage].get("seconds") if checkpoint.done(stage) else None)
+            for stage in pipeline.STAGE_NAMES
+        },
+        "failed": checkpoint.failed,
+        "repo": ((checkpoint.output("generate") or {}).get("repo_info")
+                 or checkpoint.output("enrich") or {}).get("name"),
+        "processed": processed,
+        "published": len(ledger),
+        "latest": latest,
+    }
+
+
+def _cmd_status(args) -> int:
+    status = _status(args.state)
+    if args.json:
+        import json
+
+        print(json.dumps(status, ensure_ascii=False, indent=2))
+        return 0
+
+    if status["checkpoint"]:
+        stages = []
+        for stage, seconds in status["stages"].items():
+            if seconds is not None:
+                stages.append(f"{stage} ✅ {seconds:.1f}s")
+            else:
+                stages.append(f"{stage} {'❌' if stage == status['failed'] else '—'}")
+        print(f"今天（{status['date']}）的流水线: " + "，".join(stages))
+        if status["repo"]:
+            print(f"今日推荐: {status['repo']}")
+    else:
+        print(f"今天（{status['date']}）还没有运行过流水线")
+    if status["processed"]:
+        recent = "，".join(status["processed"]["recent"])
+        print(f"已处理仓库: {status['processed']['count']}（最近: {recent}）")
+    latest = status["latest"]
+    if latest:
+        print(f"已发布文章: {status['published']}，最近一篇: {latest.get('title')}"
+              f"（{latest.get('slug')}，{latest.get('published_at')}）")
+    else:
+        print("发布台账为空")
+    return 0
+
+
+# ---- 导入耗时报告 ----
+_IMPORT_MARK = "-- onedaygithub imports --"
+
+
+def _parse_importtime(stderr: str) -> list:
+    """解析 -X importtime 的输出（标记行之后的部分），返回 [(模块, 自身微秒, 累计微秒, 是否顶层)]"""
+    rows = []
+    started = False
+    for line in stderr.splitlines():
+        if line == _IMPORT_MARK:
+            started = True
+            continue
+        if not started or not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue
+        name = fields[2].rstrip()
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), not name[1:].startswith(" ")))
+    return rows
+
+
+def measure_imports(modules, repeat: int = 3) -> dict:
+    """
+    在新的解释器里冷启动导入 onedaygithub 和 modules，重复 repeat 次取导入耗时最短的一次。
+    解释器自身启动（site 等）时导入的模块不计入。
+    """
+    import subprocess
+    import time
+
+    code = f"import sys; sys.stderr.write({_IMPORT_MARK!r} + '\\n'); import " + ", ".join(("onedaygithub",) + tuple(modules))
+    best = None
+    for _ in range(max(1, repeat)):
+        started = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                              cwd=ROOT, capture_output=True, text=True)
+        wall = time.perf_counter() - started
+        if proc.returncode != 0:
+            raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "导入失败")
+        rows = _parse_importtime(proc.stderr)
+        result = {
+            "import_ms": sum(cumulative for _, _, cumulative, top in rows if top) / 1000,
+            "process_ms": wall * 1000,
+            "modules": len(rows),
+            "requests": any(name == "requests" for name, *_ in rows),
+            "top": [(name, self_us / 1000) for name, self_us, _, _ in sorted(rows, key=lambda r: -r[1])],
+        }
+        if best is None or result["import_ms"] < best["import_ms"]:
+            best = result
+    return best
+
+
+def _cmd_imports(args) -> int:
+    import json
+
+    commands = args.commands or list(COMMAND_MODULES)
+    unknown = [c for c in commands if c not in COMMAND_MODULES]
+    if unknown:
+        log.error("未知的子命令: %s（可选: %s）", ", ".join(unknown), ", ".join(COMMAND_MODULES))
+        return 2
+    # cli 一行只含命令行入口本身，其余各行是入口加上子命令用到的模块
+    report = {"cli": measure_imports((), args.repeat)}
+    for command in commands:
+        report[command] = measure_imports(COMMAND_MODULES[command], args.repeat)
+    over = [c for c in commands if args.budget is not None and report[c]["import_ms"] > args.budget]
+
+    if args.json:
+        for entry in report.values():
+            entry["top"] = entry["top"][:args.top]
+        print(json.dumps({"commands": report, "budget_ms": args.budget, "over_budget": over},
+                         ensure_ascii=False, indent=2))
+        return 1 if over else 0
+
+    print(f"{'子命令':<12}{'导入(ms)':>10}{'进程(ms)':>10}{'模块数':>8}  requests")
+    for command, entry in report.items():
+        print(f"{command:<12}{entry['import_ms']:>10.1f}{entry['process_ms']:>10.1f}{entry['modules']:>8}"
+              f"  {'已导入' if entry['requests'] else '-'}")
+    if args.top:
+        for command in commands:
+            top = "，".join(f"{name} {ms:.1f}" for name, ms in report[command]["top"][:args.top])
+            print(f"\n{command} 自身耗时最多的模块（ms）: {top}")
+    if over:
+        print(f"\n⚠️ 超出 {args.budget:.0f}ms 预算: {', '.join(over)}")
+        return 1
+    return 0
+
+
+# ---- 入口 ----
+def _apply_env(args):
+    """--env-file 中的 KEY=VALUE（不覆盖已有的环境变量），再应用 -e KEY=VALUE（覆盖）"""
+    if args.env_file:
+        with open(args.env_file, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith("#") or "=" not in line:
+                    continue
+                key, value = line.split("=", 1)
+                os.environ.setdefault(key.strip(), value.strip().strip("'\""))
+    for item in args.env or ():
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise SystemExit(f"-e 需要 KEY=VALUE 格式: {item}")
+        os.environ[key] = value
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="onedaygithub", description="GitHub Trending → DeepSeek 文章 → Halo 发布")
+    parser.add_argument("-C", "--workdir", help="在此目录下读写数据文件（默认当前目录）")
+    parser.add_argument("-e", "--env", action="append", metavar="KEY=VALUE", help="设置环境变量，可重复")
+    parser.add_argument("--env-file", help="从文件读取 KEY=VALUE 形式的环境变量")
+    parser.add_argument("--log-level", help="日志级别（默认取 LOG_LEVEL，INFO）")
+    parser.add_argument("--http-cache", choices=("on", "off", "record", "replay"),
+                        help="HTTP 缓存模式（默认取 HTTP_CACHE，on）；record 录制本次运行的请求，replay 离线回放")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("fetch", help="抓取 Trending 并选出今日推荐")
+    p.add_argument("--output", help="输出文件（默认 GITHUB_DAILY_FILE 或 github_daily.json）")
+    p.set_defaults(func=_cmd_fetch)
+
+    p = sub.add_parser("generate", help="调用 DeepSeek 生成文章")
+    p.add_argument("--input", help="仓库信息文件（默认 GITHUB_DAILY_FILE 或 github_daily.json）")
+    p.add_argument("--output", help="输出文件（默认 GENERATED_POST_FILE 或 generated_post.json）")
+    p.add_argument("--no-stream", action="store_true", help="使用非流式调用")
+    p.add_argument("--no-cache", action="store_true", help="不使用 DeepSeek 响应缓存")
+    p.set_defaults(func=_cmd_generate)
+
+    p = sub.add_parser("publish", help="发布文章到 Halo")
+    p.add_argument("--input", help="文章文件（默认 GENERATED_POST_FILE 或 generated_post.json）")
+    p.add_argument("--dry-run", action="store_true", help="只校验并显示将要发布的内容，不访问 Halo")
+    p.add_argument("--payload", action="store_true", help="与 --dry-run 一起使用，输出完整的请求体 JSON")
+    p.set_defaults(func=_cmd_publish)
+
+    p = sub.add_parser("run", help="单进程运行 抓取 → 补充元数据 → 生成 → 发布")
+    p.add_argument("--resume", action="store_true", help="从当天的检查点继续，跳过已完成的阶段")
+    p.add_argument("--until", choices=("fetch", "enrich", "generate", "publish"), default="publish",
+                   help="运行到指定阶段为止")
+    p.add_argument("--state", help="检查点文件（默认 PIPELINE_STATE 或 .pipeline_state.json）")
+    p.add_argument("--speculative", type=int, metavar="K",
+                   help="同时为前 K 个候选生成文章，采用第一篇可用的（默认 SPECULATIVE_K）")
+    p.set_defaults(func=_cmd_run)
+
+    p = sub.add_parser("status", help="查看今天的流水线进度和发布记录")
+    p.add_argument("--state", help="检查点文件（默认 PIPELINE_STATE 或 .pipeline_state.json）")
+    p.add_argument("--json", action="store_true", help="输出 JSON")
+    p.set_defaults(func=_cmd_status)
+
+    p = sub.add_parser("imports", help="测量各子命令的冷启动导入耗时")
+    p.add_argument("commands", nargs="*", metavar="command",
+                   help=f"要测量的子命令（默认全部：{', '.join(COMMAND_MODULES)}）")
+    p.add_argument("--repeat", type=int, default=3, help="每个子命令测量几次，取最快的一次")
+    p.add_argument("--top", type=int, default=5, help="列出自身耗时最多的前 N 个模块")
+    p.add_argument("--budget", type=float, help="导入耗时预算（毫秒），超出时退出码为 1")
+    p.add_argument("--json", action="store_true", help="输出 JSON")
+    p.set_defaults(func=_cmd_imports)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    _apply_env(args)
+    if args.http_cache:
+        os.environ["HTTP_CACHE"] = args.http_cache
+    if args.workdir:
+        os.chdir(args.workdir)
+
+    # 环境变量就绪后才导入：tracing 等模块在导入时读取配置
+    import tracing
+
+    tracing.configure_logging(args.log_level.upper() if args.log_level else None)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from datetime import datetime
+
+import tracing
+
+log = logging.getLogger(__name__)
+
+# 流水线检查点：每个阶段完成后记录其输出，--resume 时跳过已完成的阶段
+STATE_FILE = os.getenv("PIPELINE_STATE", ".pipeline_state.json")
+STAGE_NAMES = ("fetch", "enrich", "generate", "publish")
+
+
+class Checkpoint:
+    """
+    流水线检查点文件（原子写入）：
+    {"date": "YYYY-MM-DD", "stages": {阶段名: {"output": ..., "seconds": ...}}, "failed": 阶段名}
+    只有同一天的检查点才会被恢复，避免把昨天的结果当成今天的。
+    """
+
+    def __init__(self, path: str = STATE_FILE, date: str | None = None):
+        self.path = path
+        self.date = date or datetime.now().strftime("%Y-%m-%d")
+        self.stages = {}
+        self.failed = None
+
+    def load(self) -> bool:
+        """读取已有检查点，成功返回 True"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning("检查点文件无法读取，将从头运行: %s", e)
+            return False
+        if state.get("date") != self.date:
+            log.info("检查点属于 %s，不是今天，将从头运行", state.get('date'))
+            return False
+        self.stages = state.get("stages") or {}
+        self.failed = state.get("failed")
+        return True
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"date": self.date, "stages": self.stages, "failed": self.failed},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+    def done(self, stage: str) -> bool:
+        return stage in self.stages
+
+    def output(self, stage: str):
+        return (self.stages.get(stage) or {}).get("output")
+
+    def complete(self, stage: str, output, seconds: float):
+        self.stages[stage] = {"output": output, "seconds": round(seconds, 3)}
+        self.failed = None
+        self.save()
+
+    def fail(self, stage: str):
+        self.failed = stage
+        self.save()
+
+
+class Pipeline:
+    """
+    在同一个进程中依次运行 fetch → enrich → generate → publish，阶段之间直接传递对象。
+    speculative > 1 时开启推测生成：enrich 只选出前 K 个候选，generate 并发生成并采用
+    第一篇通过校验的文章，publish 成功后才把该仓库记录到 CSV。
+    """
+
+    def __init__(self, checkpoint: Checkpoint, speculative: int | None = None):
+        self.checkpoint = checkpoint
+        self._processed = None
+        self._speculative = speculative
+
+    @property
+    def processed(self):
+        """已处理仓库索引，首次用到时才加载"""
+        if self._processed is None:
+            import github_daily
+
+            self._processed = github_daily.load_processed_repos()
+        return self._processed
+
+    @property
+    def speculative(self) -> int:
+        """推测生成的候选数，未指定时取 SPECULATIVE_K"""
+        if self._speculative is None:
+            from speculative import SPECULATIVE_K
+
+            self._speculative = SPECULATIVE_K
+        return self._speculative
+
+    def _record(self, repo):
+        """把发布成功的仓库记录到 CSV；普通模式已在 enrich 阶段记录过，这里跳过"""
+        import github_daily
+
+        if repo.get("url") not in self.processed:
+            github_daily.save_processed_repo(repo, self.processed)
+
+    # ---- 阶段 ----
+    def fetch(self):
+        """抓取 Trending 并过滤掉已处理的仓库，返回候选列表"""
+        import github_daily
+
+        repo_list = github_daily.get_trending_repos()
+        if not repo_list:
+            return None
+        candidates = [repo for repo in repo_list if repo["url"] not in self.processed]
+        if not candidates:
+            log.warning("所有趋势仓库都已处理过")
+            return None
+        return candidates
+
+    def enrich(self):
+        """
+        候选仓库排序并补充元数据，选出今日推荐并记录到 CSV / github_daily.json。
+        推测模式下只返回 {"candidates": 前 K 个候选}，不记录。
+        """
+        import github_daily
+
+        candidates = self.checkpoint.output("fetch")
+        candidates = github_daily.enrich_candidates(candidates, self.processed)
+        if self.speculative > 1:
+            top = candidates[:self.speculative]
+            if not top:
+                log.warning("所有趋势仓库都已处理过")
+                return None
+            return {"candidates": top}
+        repo = github_daily.pick_unprocessed(candidates, self.processed)
+        if repo:
+            github_daily.save_to_json(repo)
+            log.info("今日推荐: %s", repo['name'])
+        return repo
+
+    def generate(self):
+        """
+        调用 DeepSeek 生成文章，同时写出 generated_post.json 以兼容原有脚本。
+        生成前先做发布预检，今天已经发布过的仓库不再消耗 token。
+        """
+        from generate_post import build_post_data, generate_post_with_deepseek, save_generated_post
+        from publish_to_halo import preflight
+
+        enriched = self.checkpoint.output("enrich")
+        if "candidates" in enriched:
+            return self._generate_speculative(enriched["candidates"])
+        repo = enriched
+        published = preflight(repo)
+        if published:
+            return {"repo_info": repo, "published": published}
+        title, content = generate_post_with_deepseek(repo)
+        if not (title and content):
+            return None
+        save_generated_post(title, content, repo)
+        log.info("标题: %s", title)
+        log.info("文章长度: %d 字符", len(content))
+        return build_post_data(title, content, repo)
+
+    def _generate_speculative(self, candidates):
+        """并发为候选仓库生成文章，采用第一篇通过校验的；今天已发布过的候选直接沿用"""
+        import github_daily
+        from generate_post import build_post_data, save_generated_post
+        from publish_to_halo import preflight
+        from speculative import generate_first_valid
+
+        for repo in candidates:
+            published = preflight(repo)
+            if published:
+                github_daily.save_to_json(repo)
+                return {"repo_info": repo, "published": published}
+        result = generate_first_valid(candidates, len(candidates))
+        if not result:
+            return None
+        repo, title, content = result
+        github_daily.save_to_json(repo)
+        save_generated_post(title, content, repo)
+        log.info("今日推荐: %s", repo['name'])
+        log.info("标题: %s", title)
+        log.info("文章长度: %d 字符", len(content))
+        return build_post_data(title, content, repo)
+
+    def publish(self):
+        from publish_to_halo import publish_to_halo
+
+        post_data = self.checkpoint.output("generate")
+        published = post_data.get("published")
+        if published:
+            self._record(post_data["repo_info"])
+            return {"name": published.get("post_name"), "slug": published.get("slug"), "title": published.get("title")}
+        result = publish_to_halo(post_data)
+        if not result:
+            return None
+        self._record(post_data["repo_info"])
+        metadata = result.get("metadata") or {}
+        spec = result.get("spec") or {}
+        return {"name": metadata.get("name"), "slug": spec.get("slug"), "title": spec.get("title")}
+
+    # ---- 调度 ----
+    def run(self, until: str = "publish") -> bool:
+        last = STAGE_NAMES.index(until)
+        for stage in STAGE_NAMES[:last + 1]:
+            if self.checkpoint.done(stage):
+                log.info("⏭️ 跳过已完成的阶段: %s", stage)
+                continue
+            log.info("\n=== 阶段: %s ===", stage)
+            start = time.perf_counter()
+            try:
+                with tracing.span(f"stage:{stage}"):
+                    output = getattr(self, stage)()
+            except Exception as e:
+                log.exception("阶段 %s 出错: %s", stage, e)
+                output = None
+            elapsed = time.perf_counter() - start
+            if output is None:
+                self.checkpoint.fail(stage)
+                log.error("❌ 阶段 %s 失败（%.2fs），修复后可用 --resume 从这里继续", stage, elapsed)
+                return False
+            self.checkpoint.complete(stage, output, elapsed)
+            log.info("✅ 阶段 %s 完成（%.2fs）", stage, elapsed)
+        return True
+
+
+def run_pipeline(state: str = STATE_FILE, resume: bool = False, until: str = "publish",
+                 speculative: int | None = None) -> bool:
+    """运行流水线直到 until 阶段；resume=True 时从当天的检查点继续；speculative 见 Pipeline"""
+    checkpoint = Checkpoint(state)
+    if resume and checkpoint.load():
+        done = [s for s in STAGE_NAMES if checkpoint.done(s)]
+        log.info("从检查点恢复，已完成阶段: %s", done or '无')
+    return Pipeline(checkpoint, speculative).run(until)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="单进程运行 抓取 → 补充元数据 → 生成 → 发布 流水线")
+    parser.add_argument("--resume", action="store_true", help="从当天的检查点继续，跳过已完成的阶段")
+    parser.add_argument("--until", choices=STAGE_NAMES, default="publish", help="运行到指定阶段为止")
+    parser.add_argument("--state", default=STATE_FILE, help="检查点文件路径")
+    parser.add_argument("--speculative", type=int, metavar="K",
+                        help="同时为前 K 个候选生成文章，采用第一篇可用的（默认 SPECULATIVE_K）")
+    args = parser.parse_args(argv)
+    tracing.configure_logging()
+
+    ok = run_pipeline(args.state, args.resume, args.until, args.speculative)
+    tracing.log_summary()
+    if not ok:
+        return 1
+    log.info("\n🎉 流水线完成")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
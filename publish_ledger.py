@@ -0,0 +1,65 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime
+
+from dedup_store import normalize_repo_url
+
+log = logging.getLogger(__name__)
+
+# 发布台账：仓库 URL → slug、Halo 文章 name、内容哈希。随仓库提交，跨运行保留
+LEDGER_FILE = os.getenv("PUBLISH_LEDGER", "publish_ledger.json")
+
+
+def content_hash(title: str, content: str) -> str:
+    return hashlib.sha256(f"{title}\n{content}".encode("utf-8")).hexdigest()
+
+
+class PublishLedger:
+    """
+    记录每个仓库最近一次发布的结果：
+    {规范 URL: {"slug", "post_name", "content_hash", "title", "published_at"}}
+    写入时原子替换整个文件。
+    """
+
+    def __init__(self, path: str = LEDGER_FILE):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                log.warning("发布台账无法读取，按空台账处理: %s", e)
+
+    def get(self, url: str) -> dict | None:
+        return self.entries.get(normalize_repo_url(url)) if url else None
+
+    def find(self, url: str, slug: str) -> dict | None:
+        """该仓库是否已经以这个 slug 发布过"""
+        entry = self.get(url)
+        return entry if entry and entry.get("slug") == slug else None
+
+    def record(self, url: str, slug: str, post_name: str | None,
+               title: str | None = None, digest: str | None = None) -> dict:
+        entry = {
+            "slug": slug,
+            "post_name": post_name or slug,
+            "content_hash": digest,
+            "title": title,
+            "published_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        if url:
+            self.entries[normalize_repo_url(url)] = entry
+            self.save()
+        return entry
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def __len__(self):
+        return len(self.entries)
@@ -1,34 +1,23 @@
 import json
+import logging
 import os
 import re
-import requests
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 
+import http_client
+import tracing
+from publish_ledger import PublishLedger, content_hash
+
+log = logging.getLogger(__name__)
+
 # 默认分类和标签（可被 post_data 中的 categories/tags 覆盖）
 DEFAULT_CATEGORIES = ["GitHub Trending", "开源项目"]
 DEFAULT_TAGS = ["GitHub", "Trending", "开源项目", "每日推荐", "自动发布", "自动化"]
 
 
-def retry_request(max_retries=3, delay=2):
-    """网络请求重试装饰器，处理临时失败"""
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            retries = 0
-            while retries < max_retries:
-                try:
-                    result = func(*args, **kwargs)
-                    return result
-                except requests.exceptions.RequestException as e:
-                    retries += 1
-                    if retries >= max_retries:
-                        raise
-                    print(f"  网络请求失败，{delay}秒后重试 ({retries}/{max_retries}): {e}")
-                    time.sleep(delay)
-        return wrapper
-    return decorator
-
-
 def _to_ascii_slug(s: str) -> str:
     """生成 ASCII 安全 slug，用于 metadata.name"""
     s = re.sub(r"[^a-z0-9\-_\u4e00-\u9fa5]", "-", s.lower())
@@ -38,29 +27,49 @@ def _to_ascii_slug(s: str) -> str:
     return (s or "default")[:63]
 
 
-@retry_request(max_retries=3, delay=3)
+# 分类/标签本地缓存（减少对 Halo 列表接口的重复请求）
+TAXONOMY_CACHE_FILE = os.getenv("HALO_TAXONOMY_CACHE", ".halo_taxonomy_cache.json")
+TAXONOMY_CACHE_TTL = int(os.getenv("HALO_TAXONOMY_CACHE_TTL", "3600"))
+TAXONOMY_PAGE_SIZE = 100
+# 并发解析/创建分类和标签时的最大并发数
+HALO_CONCURRENCY = int(os.getenv("HALO_CONCURRENCY", "4"))
+# generate_post.py 输出的文章
+POST_FILE = os.getenv("GENERATED_POST_FILE", "generated_post.json")
+
+
+def _list_all(halo_url: str, headers: dict, kind: str) -> list | None:
+    """分页拉取 categories / tags 的全部条目；任何一页失败都返回 None，不返回不完整的列表"""
+    url = f"{halo_url.rstrip('/')}/apis/content.halo.run/v1alpha1/{kind}"
+    items = []
+    page = 1
+    while True:
+        r = http_client.get(url, headers=headers, params={"page": page, "size": TAXONOMY_PAGE_SIZE}, timeout=15)
+        if r.status_code != 200:
+            log.warning("   拉取 %s 第 %d 页失败: %s", kind, page, r.status_code)
+            return None
+        data = r.json()
+        batch = data.get("items") or []
+        items.extend(batch)
+        # Halo 的 ListResult 带 hasNext；老版本没有时按条数判断
+        has_next = data.get("hasNext")
+        if has_next is None:
+            has_next = len(batch) >= TAXONOMY_PAGE_SIZE
+        if not has_next or not batch:
+            break
+        page += 1
+    return items
+
+
 def list_categories(halo_url: str, headers: dict) -> list:
-    """获取分类列表"""
-    url = f"{halo_url.rstrip('/')}/apis/content.halo.run/v1alpha1/categories"
-    r = requests.get(url, headers=headers, params={"size": 100}, timeout=15)
-    if r.status_code != 200:
-        return []
-    data = r.json()
-    return data.get("items") or []
+    """获取分类列表（全部分页），失败时返回空列表"""
+    return _list_all(halo_url, headers, "categories") or []
 
 
-@retry_request(max_retries=3, delay=3)
 def list_tags(halo_url: str, headers: dict) -> list:
-    """获取标签列表"""
-    url = f"{halo_url.rstrip('/')}/apis/content.halo.run/v1alpha1/tags"
-    r = requests.get(url, headers=headers, params={"size": 100}, timeout=15)
-    if r.status_code != 200:
-        return []
-    data = r.json()
-    return data.get("items") or []
+    """获取标签列表（全部分页），失败时返回空列表"""
+    return _list_all(halo_url, headers, "tags") or []
 
 
-@retry_request(max_retries=3, delay=3)
 def create_category(halo_url: str, headers: dict, display_name: str, slug: str) -> str | None:
     """创建分类，返回 metadata.name"""
     url = f"{halo_url.rstrip('/')}/apis/content.halo.run/v1alpha1/categories"
@@ -79,15 +88,14 @@ def create_category(halo_url: str, headers: dict, display_name: str, slug: str)
             "children": [],
         },
     }
-    r = requests.post(url, headers=headers, json=payload, timeout=15)
+    r = http_client.post(url, headers=headers, json=payload, timeout=15)
     if r.status_code not in (200, 201):
-        print(f"   创建分类失败 [{display_name}]: {r.status_code} - {r.text[:150]}")
+        log.error("   创建分类失败 [%s]: %s - %s", display_name, r.status_code, r.text[:150])
         return None
     data = r.json()
     return data.get("metadata", {}).get("name")
 
 
-@retry_request(max_retries=3, delay=3)
 def create_tag(halo_url: str, headers: dict, display_name: str, slug: str) -> str | None:
     """创建标签，返回 metadata.name"""
     url = f"{halo_url.rstrip('/')}/apis/content.halo.run/v1alpha1/tags"
@@ -98,73 +106,259 @@ def create_tag(halo_url: str, headers: dict, display_name: str, slug: str) -> st
         "metadata": {"name": name},
         "spec": {"displayName": display_name, "slug": slug or name},
     }
-    r = requests.post(url, headers=headers, json=payload, timeout=15)
+    r = http_client.post(url, headers=headers, json=payload, timeout=15)
     if r.status_code not in (200, 201):
-        print(f"   创建标签失败 [{display_name}]: {r.status_code} - {r.text[:150]}")
+        log.error("   创建标签失败 [%s]: %s - %s", display_name, r.status_code, r.text[:150])
         return None
     data = r.json()
     return data.get("metadata", {}).get("name")
 
 
+def _display_name_to_slug(display_name: str) -> str:
+    """由显示名生成 slug（与 Halo 中已有数据的生成规则保持一致）"""
+    slug = re.sub(r"[^a-z0-9\-_\u4e00-\u9fa5]", "-", display_name.lower())
+    return re.sub(r"-+", "-", slug).strip("-") or "default"
+
+
+class TaxonomyResolver:
+    """
+    分类/标签解析器。
+    每种集合只拉取一次（分页拉全），建立 displayName/slug -> metadata.name 的索引，
+    并带 TTL 的本地磁盘缓存；新建标签/分类时就地更新索引和缓存。
+    线程安全：同一集合只会被拉取一次，同一 slug 只会被创建一次。
+    """
+
+    KINDS = ("categories", "tags")
+
+    def __init__(self, halo_url: str, headers: dict,
+                 cache_file: str | None = TAXONOMY_CACHE_FILE,
+                 ttl: int = TAXONOMY_CACHE_TTL):
+        self.halo_url = halo_url.rstrip("/")
+        self.headers = headers
+        self.cache_file = cache_file
+        self.ttl = ttl
+        # kind -> {"items": [...], "by_display": {}, "by_slug": {}, "fetched_at": ts}
+        self._collections = {}
+        self._disk_cache = None
+        self._lock = threading.RLock()
+        self._load_locks = {kind: threading.Lock() for kind in self.KINDS}
+        # (kind, slug) -> Lock，避免并发时重复创建
+        self._create_locks = {}
+
+    # ---- 缓存读写 ----
+    def _read_disk_cache(self) -> dict:
+        if self._disk_cache is not None:
+            return self._disk_cache
+        self._disk_cache = {}
+        if not self.cache_file or not os.path.exists(self.cache_file):
+            return self._disk_cache
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict) and data.get("halo_url") == self.halo_url:
+                self._disk_cache = data
+        except (OSError, json.JSONDecodeError) as e:
+            log.warning("   读取分类/标签缓存失败，忽略: %s", e)
+        return self._disk_cache
+
+    def _write_disk_cache(self):
+        if not self.cache_file:
+            return
+        with self._lock:
+            self._write_disk_cache_locked()
+
+    def _write_disk_cache_locked(self):
+        data = {"halo_url": self.halo_url}
+        for kind, col in self._collections.items():
+            # 拉取失败时的临时集合不落盘，磁盘上保留原来的内容
+            if not col.get("partial"):
+                data[kind] = {"fetched_at": col["fetched_at"], "items": col["items"]}
+        # 保留本次未加载的集合
+        for kind in self.KINDS:
+            if kind not in data and kind in self._read_disk_cache():
+                data[kind] = self._disk_cache[kind]
+        tmp = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+            self._disk_cache = data
+        except OSError as e:
+            log.warning("   写入分类/标签缓存失败: %s", e)
+
+    # ---- 索引 ----
+    @staticmethod
+    def _compact(item: dict) -> dict | None:
+        """只保留解析需要的字段"""
+        name = (item.get("metadata") or {}).get("name")
+        if not name:
+            return None
+        spec = item.get("spec") or {}
+        return {"name": name, "displayName": spec.get("displayName"), "slug": spec.get("slug")}
+
+    def _build(self, items: list, fetched_at: float) -> dict:
+        col = {"items": [], "by_display": {}, "by_slug": {}, "fetched_at": fetched_at}
+        for entry in items:
+            self._index(col, entry)
+        return col
+
+    @staticmethod
+    def _index(col: dict, entry: dict):
+        col["items"].append(entry)
+        # 与原先线性查找一致：同名时以列表中靠前的为准
+        if entry.get("displayName"):
+            col["by_display"].setdefault(entry["displayName"], entry["name"])
+        if entry.get("slug"):
+            col["by_slug"].setdefault(entry["slug"], entry["name"])
+
+    def _load(self, kind: str, force: bool = False) -> dict:
+        col = self._collections.get(kind)
+        if col is not None and not force:
+            return col
+        with self._load_locks[kind]:
+            col = self._collections.get(kind)
+            if col is not None and not force:
+                return col
+            return self._load_locked(kind, force)
+
+    def _load_locked(self, kind: str, force: bool) -> dict:
+        with self._lock:
+            cached = self._read_disk_cache().get(kind)
+        now = time.time()
+        if cached and not force and now - cached.get("fetched_at", 0) < self.ttl:
+            col = self._build(cached.get("items") or [], cached["fetched_at"])
+            self._collections[kind] = col
+            log.info("   使用本地缓存的 %s（%s 条）", kind, len(col['items']))
+            return col
+
+        raw = _list_all(self.halo_url, self.headers, kind)
+        if raw is None:
+            return self._fallback(kind, cached)
+        entries = [e for e in (self._compact(i) for i in raw) if e]
+        col = self._build(entries, now)
+        self._collections[kind] = col
+        self._write_disk_cache()
+        return col
+
+    def _fallback(self, kind: str, cached: dict | None) -> dict:
+        """
+        拉取失败：已有的内存集合保持不变；否则临时使用过期的磁盘缓存（没有则为空），
+        标记为 partial，不写入磁盘缓存，也不会被当作完整列表保存一小时。
+        """
+        col = self._collections.get(kind)
+        if col is not None:
+            log.warning("   拉取 %s 失败，继续使用已加载的 %s 条", kind, len(col['items']))
+            return col
+        col = self._build((cached or {}).get("items") or [], (cached or {}).get("fetched_at", 0))
+        col["partial"] = True
+        self._collections[kind] = col
+        log.warning("   拉取 %s 失败，临时使用本地缓存的 %s 条（不更新缓存）", kind, len(col['items']))
+        return col
+
+    def preload(self, max_workers: int = HALO_CONCURRENCY):
+        """并发加载分类和标签集合；上次拉取失败（partial）的集合重新拉取"""
+        kinds = [k for k in self.KINDS if (self._collections.get(k) or {"partial": True}).get("partial")]
+        if not kinds:
+            return
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(kinds)))) as pool:
+            list(pool.map(tracing.bind(lambda k: self._load(k, force=k in self._collections)), kinds))
+
+    def invalidate(self):
+        """丢弃内存和磁盘缓存，下次访问重新拉取"""
+        with self._lock:
+            self._collections = {}
+            self._disk_cache = {}
+        if self.cache_file and os.path.exists(self.cache_file):
+            try:
+                os.remove(self.cache_file)
+            except OSError:
+                pass
+
+    # ---- 对外接口 ----
+    def lookup(self, kind: str, display_name: str, refresh: bool = False) -> str | None:
+        col = self._load(kind, force=refresh)
+        found = col["by_display"].get(display_name)
+        if found:
+            return found
+        return col["by_slug"].get(_display_name_to_slug(display_name))
+
+    def ensure(self, kind: str, display_name: str) -> str | None:
+        """确保分类/标签存在，返回 metadata.name。不存在则创建"""
+        found = self.lookup(kind, display_name)
+        if found:
+            return found
+
+        slug = _display_name_to_slug(display_name)
+        with self._lock:
+            create_lock = self._create_locks.setdefault((kind, slug), threading.Lock())
+        with create_lock:
+            # 可能已被其他线程创建
+            found = self.lookup(kind, display_name)
+            if found:
+                return found
+
+            creator = create_category if kind == "categories" else create_tag
+            created = creator(self.halo_url, self.headers, display_name, slug)
+            if created:
+                with self._lock:
+                    self._index(self._collections[kind], {"name": created, "displayName": display_name, "slug": slug})
+                self._write_disk_cache()
+                return created
+
+            # 创建失败：可能是其他进程刚刚创建了同名条目，重新拉取一次再查
+            log.warning("   创建 %s 失败，重新拉取 %s 列表确认是否已存在", display_name, kind)
+            found = self.lookup(kind, display_name, refresh=True)
+            if found:
+                return found
+
+        # 仍然没有，返回第一个作为 fallback
+        items = self._collections[kind]["items"]
+        return items[0]["name"] if items else None
+
+    def ensure_category(self, display_name: str) -> str | None:
+        return self.ensure("categories", display_name)
+
+    def ensure_tag(self, display_name: str) -> str | None:
+        return self.ensure("tags", display_name)
+
+    def all_names(self, kind: str) -> list[str]:
+        return [e["name"] for e in self._load(kind)["items"]]
+
+
+_resolver = None
+_resolver_lock = threading.Lock()
+
+
+def _shared_resolver(halo_url: str, headers: dict) -> TaxonomyResolver:
+    """进程内共享的解析器：同一站点的分类/标签集合只拉取一次，批量发布时也复用"""
+    global _resolver
+    with _resolver_lock:
+        if _resolver is None or _resolver.halo_url != halo_url.rstrip("/") or _resolver.headers != headers:
+            _resolver = TaxonomyResolver(halo_url, headers)
+        return _resolver
+
+
 def ensure_category(halo_url: str, headers: dict, display_name: str) -> str | None:
     """确保分类存在，返回 metadata.name。不存在则创建"""
-    slug = re.sub(r"[^a-z0-9\-_\u4e00-\u9fa5]", "-", display_name.lower())
-    slug = re.sub(r"-+", "-", slug).strip("-") or "default"
-    cats = list_categories(halo_url, headers)
-    
-    # 详细检查分类是否存在
-    for c in cats:
-        s = c.get("spec", {})
-        if s.get("displayName") == display_name:
-            return c.get("metadata", {}).get("name")
-        if s.get("slug") == slug:
-            return c.get("metadata", {}).get("name")
-    
-    # 分类不存在，创建新分类
-    created = create_category(halo_url, headers, display_name, slug)
-    if created:
-        return created
-    
-    # 创建失败，返回第一个分类作为 fallback
-    if cats:
-        return cats[0].get("metadata", {}).get("name")
-    return None
+    return _shared_resolver(halo_url, headers).ensure_category(display_name)
 
 
 def ensure_tag(halo_url: str, headers: dict, display_name: str) -> str | None:
     """确保标签存在，返回 metadata.name。不存在则创建"""
-    slug = re.sub(r"[^a-z0-9\-_\u4e00-\u9fa5]", "-", display_name.lower())
-    slug = re.sub(r"-+", "-", slug).strip("-") or "default"
-    tags_list = list_tags(halo_url, headers)
-    
-    # 详细检查标签是否存在
-    for t in tags_list:
-        s = t.get("spec", {})
-        if s.get("displayName") == display_name:
-            return t.get("metadata", {}).get("name")
-        if s.get("slug") == slug:
-            return t.get("metadata", {}).get("name")
-    
-    # 标签不存在，创建新标签
-    created = create_tag(halo_url, headers, display_name, slug)
-    if created:
-        return created
-    
-    # 创建失败，返回第一个标签作为 fallback
-    if tags_list:
-        return tags_list[0].get("metadata", {}).get("name")
-    return None
+    return _shared_resolver(halo_url, headers).ensure_tag(display_name)
 
 
+@tracing.traced("taxonomy")
 def resolve_categories_and_tags(
     halo_url: str,
     headers: dict,
     category_names: list[str],
     tag_names: list[str],
+    max_workers: int = HALO_CONCURRENCY,
 ) -> tuple[list[str], list[str]]:
     """
     将分类、标签的显示名解析为 metadata.name（ID）。
-    不存在则自动创建。若都为空，则使用已有分类/标签作为 fallback。
+    不存在则自动创建（并发执行，最大并发数为 max_workers）。若都为空，则使用已有分类/标签作为 fallback。
     """
     # 去重处理，避免重复创建相同的分类和标签
     unique_category_names = []
@@ -183,35 +377,38 @@ def resolve_categories_and_tags(
             unique_tag_names.append(t_str)
             seen_tags.add(t_str)
     
-    # 解析分类和标签
-    cat_ids = [ensure_category(halo_url, headers, c) for c in unique_category_names]
-    tag_ids = [ensure_tag(halo_url, headers, t) for t in unique_tag_names]
+    # 解析分类和标签（每种集合只拉取一次，缺失的并发创建）
+    resolver = _shared_resolver(halo_url, headers)
+    resolver.preload(max_workers)
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+        cat_futures = [pool.submit(tracing.bind(resolver.ensure_category), c) for c in unique_category_names]
+        tag_futures = [pool.submit(tracing.bind(resolver.ensure_tag), t) for t in unique_tag_names]
+        cat_ids = [f.result() for f in cat_futures]
+        tag_ids = [f.result() for f in tag_futures]
     
     # 过滤无效 ID
     cat_ids = [x for x in cat_ids if x]
     tag_ids = [x for x in tag_ids if x]
 
     # 如果没有分类或标签，使用已有数据作为 fallback
-    cats = list_categories(halo_url, headers)
-    tags_list = list_tags(halo_url, headers)
-    if not cat_ids and cats:
-        cat_ids = [c.get("metadata", {}).get("name") for c in cats if c.get("metadata", {}).get("name")]
-    if not tag_ids and tags_list:
-        tag_ids = [t.get("metadata", {}).get("name") for t in tags_list if t.get("metadata", {}).get("name")]
+    if not cat_ids:
+        cat_ids = resolver.all_names("categories")
+    if not tag_ids:
+        tag_ids = resolver.all_names("tags")
 
     return cat_ids, tag_ids
 
 
-def read_generated_post():
+def read_generated_post(path=POST_FILE):
     """读取生成的文章"""
     try:
-        with open('generated_post.json', 'r', encoding='utf-8') as f:
+        with open(path, 'r', encoding='utf-8') as f:
             return json.load(f)
     except FileNotFoundError:
-        print("generated_post.json 文件不存在")
+        log.error("%s 文件不存在", path)
         return None
     except json.JSONDecodeError:
-        print("generated_post.json 文件格式错误")
+        log.error("%s 文件格式错误", path)
         return None
 
 def get_beijing_time(date_str):
@@ -248,53 +445,8 @@ def generate_unique_slug(repo_name, date_str):
     
     return slug, beijing_date_str
 
-@retry_request(max_retries=3, delay=5)
-def publish_to_halo(post_data):
-    """发布文章到 Halo"""
-    
-    # Halo 配置（支持环境变量覆盖）
-    HALO_URL = (os.getenv("HALO_URL") or "https://veyvin.com").rstrip("/")
-    HALO_TOKEN = os.getenv('HALO_TOKEN')
-    
-    if not HALO_TOKEN:
-        print("错误: 未找到 HALO_TOKEN 环境变量")
-        return None
-
-    repo_info = post_data.get("repo_info") or {}
-    if not repo_info.get("name") or not repo_info.get("date"):
-        print("错误: post_data 缺少 repo_info.name 或 repo_info.date")
-        return None
-    title = post_data.get("title") or ""
-    content = post_data.get("content") or ""
-    if not title or not content:
-        print("错误: post_data 缺少 title 或 content")
-        return None
-
-    # 从 post_data 读取分类和标签，若无或类型错误则使用默认值
-    raw_cats = post_data.get("categories")
-    raw_tags = post_data.get("tags")
-    category_names = raw_cats if isinstance(raw_cats, list) else DEFAULT_CATEGORIES
-    tag_names = raw_tags if isinstance(raw_tags, list) else DEFAULT_TAGS
-
-    # 生成唯一的 slug
-    slug, previous_date_str = generate_unique_slug(repo_info['name'], repo_info['date'])
-
-    print(f"生成的唯一 slug: {slug}")
-    print(f"发布日期: {previous_date_str}")
-
-    headers = {
-        "Authorization": f"Bearer {HALO_TOKEN}",
-        "Content-Type": "application/json"
-    }
-
-    # 解析分类和标签为 Halo 的 metadata.name（ID），不存在则创建
-    print("准备分类和标签...")
-    cat_ids, tag_ids = resolve_categories_and_tags(
-        HALO_URL, headers, category_names, tag_names
-    )
-    print(f"  分类: {category_names} -> {cat_ids}")
-    print(f"  标签: {tag_names[:5]}{'...' if len(tag_names) > 5 else ''} -> {tag_ids[:5]}{'...' if len(tag_ids) > 5 else ''}")
-
+def build_post_payload(title, content, slug, date_str, repo_info, cat_ids=None, tag_ids=None):
+    """构建 Halo 文章创建请求体（分类/标签可稍后填入）"""
     payload = {
         "post": {
             "spec": {
@@ -305,7 +457,7 @@ def publish_to_halo(post_data):
                 "deleted": False,
                 "publish": True,
                 # 使用当前的北京时间（早上8点）
-                "publishTime": f"{previous_date_str}T08:00:00+08:00",
+                "publishTime": f"{date_str}T08:00:00+08:00",
                 "pinned": False,
                 "allowComment": True,
                 "visible": "PUBLIC",
@@ -314,8 +466,8 @@ def publish_to_halo(post_data):
                     "autoGenerate": False,
                     "raw": (repo_info.get("desc") or "")[:150]
                 },
-                "categories": cat_ids,
-                "tags": tag_ids,
+                "categories": cat_ids or [],
+                "tags": tag_ids or [],
                 "htmlMetas": []
             },
             "apiVersion": "content.halo.run/v1alpha1",
@@ -331,9 +483,185 @@ def publish_to_halo(post_data):
             "rawType": "HTML"
         }
     }
+    return payload
+
+
+def _halo_settings():
+    """Halo 站点地址与 token（支持环境变量 HALO_URL / HALO_TOKEN 覆盖）"""
+    return (os.getenv("HALO_URL") or "https://veyvin.com").rstrip("/"), os.getenv('HALO_TOKEN')
+
+
+def find_post(halo_url, headers, name):
+    """按 metadata.name 查询文章，存在返回文章对象，不存在返回 None；请求失败抛出 RequestException"""
+    response = http_client.get(
+        f"{halo_url}/apis/content.halo.run/v1alpha1/posts/{name}",
+        headers=headers,
+        timeout=10
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+# 本进程内已确认 Halo 中不存在的 (halo_url, slug)：生成前预检查过一次后，发布前不再重复查询；
+# 期间若被其他进程发布，创建接口会返回 400/409，届时再回查确认
+_absent = set()
+
+
+def _published_result(entry):
+    """把台账条目转换成与 Halo 创建接口相同形状的返回值"""
+    return {
+        "metadata": {"name": entry.get("post_name")},
+        "spec": {"slug": entry.get("slug"), "title": entry.get("title")},
+        "already_published": True,
+    }
+
+
+def _check_published(halo_url, headers, repo_info, slug, ledger, digest=None, recheck=False):
+    """
+    先查本地台账，再按 slug 查询 Halo（文章的 metadata.name 就是 slug）。
+    已发布返回台账条目（远端存在但台账缺失时补记），否则返回 None。
+    本进程已确认不存在的 slug 不再查询 Halo，recheck=True 时强制查询。
+    """
+    entry = ledger.find(repo_info.get('url'), slug)
+    if entry:
+        if digest and entry.get("content_hash") not in (None, digest):
+            log.warning("⚠️ 本次内容与已发布的版本不同，不会覆盖已发布的文章")
+        return entry
+    if not recheck and (halo_url, slug) in _absent:
+        return None
+    try:
+        post = find_post(halo_url, headers, slug)
+    except http_client.RequestException as e:
+        log.warning("🌐 查询文章是否已存在失败（按未发布处理）: %s", e)
+        return None
+    if post is None:
+        _absent.add((halo_url, slug))
+        return None
+    _absent.discard((halo_url, slug))
+    spec = post.get("spec") or {}
+    return ledger.record(repo_info.get('url'), slug, (post.get("metadata") or {}).get("name"), spec.get("title"))
+
+
+def preflight(repo_info, ledger=None):
+    """
+    生成文章之前的发布预检：该仓库今天的文章是否已经发布过。
+    已发布返回台账条目，否则（包括未配置 HALO_TOKEN、查询失败）返回 None。
+    """
+    halo_url, halo_token = _halo_settings()
+    slug, _ = generate_unique_slug(repo_info['name'], repo_info['date'])
+    ledger = ledger or PublishLedger()
+    if not halo_token:
+        return ledger.find(repo_info.get('url'), slug)
+    headers = {"Authorization": f"Bearer {halo_token}"}
+    entry = _check_published(halo_url, headers, repo_info, slug, ledger)
+    if entry:
+        log.info("⏭️ %s 已发布过（slug: %s），跳过生成与发布", repo_info['name'], slug)
+    return entry
+
+
+def _read_post_data(post_data):
+    """校验文章数据，返回 (repo_info, title, content, 分类名, 标签名)，缺少必要字段时返回 None"""
+    repo_info = post_data.get("repo_info") or {}
+    if not repo_info.get("name") or not repo_info.get("date"):
+        log.error("错误: post_data 缺少 repo_info.name 或 repo_info.date")
+        return None
+    title = post_data.get("title") or ""
+    content = post_data.get("content") or ""
+    if not title or not content:
+        log.error("错误: post_data 缺少 title 或 content")
+        return None
+
+    # 从 post_data 读取分类和标签，若无或类型错误则使用默认值
+    raw_cats = post_data.get("categories")
+    raw_tags = post_data.get("tags")
+    category_names = raw_cats if isinstance(raw_cats, list) else DEFAULT_CATEGORIES
+    tag_names = raw_tags if isinstance(raw_tags, list) else DEFAULT_TAGS
+    return repo_info, title, content, category_names, tag_names
+
+
+def dry_run(post_data, ledger=None):
+    """
+    只在本地演练一次发布：校验文章、计算 slug、查发布台账并构建请求体，不访问 Halo。
+    分类/标签保留为名称（真正发布时才解析成 Halo 的 metadata.name）。返回请求体，校验失败返回 None。
+    """
+    post = _read_post_data(post_data)
+    if not post:
+        return None
+    repo_info, title, content, category_names, tag_names = post
+    slug, date_str = generate_unique_slug(repo_info['name'], repo_info['date'])
+    digest = content_hash(title, content)
+    entry = (ledger or PublishLedger()).find(repo_info.get('url'), slug)
+
+    log.info("📂 项目名称: %s", repo_info['name'])
+    log.info("📝 文章标题: %s（%d 字符）", title, len(content))
+    log.info("🔗 文章 slug: %s", slug)
+    log.info("🕗 发布时间 (北京时间): %sT08:00:00+08:00", date_str)
+    log.info("🏷️ 文章分类: %s", category_names)
+    log.info("🏷️ 文章标签: %s", tag_names)
+    if not entry:
+        log.info("📒 台账中没有记录，将会创建新文章")
+    elif entry.get("content_hash") not in (None, digest):
+        log.info("📒 已于 %s 发布过（内容不同，不会覆盖）", entry.get("published_at"))
+    else:
+        log.info("📒 已于 %s 发布过，重跑会直接跳过", entry.get("published_at"))
+    return build_post_payload(title, content, slug, date_str, repo_info, category_names, tag_names)
+
+
+@tracing.traced("publish")
+def publish_to_halo(post_data, ledger=None):
+    """
+    发布文章到 Halo。发布是幂等的：台账或 Halo 中已有同一 slug 的文章时直接返回，
+    不会重复创建；发布成功后写入发布台账。
+    """
+    
+    # Halo 配置（支持环境变量覆盖）
+    HALO_URL, HALO_TOKEN = _halo_settings()
     
+    if not HALO_TOKEN:
+        log.error("错误: 未找到 HALO_TOKEN 环境变量")
+        return None
+
+    post = _read_post_data(post_data)
+    if not post:
+        return None
+    repo_info, title, content, category_names, tag_names = post
+
+    # 生成唯一的 slug
+    slug, previous_date_str = generate_unique_slug(repo_info['name'], repo_info['date'])
+
+    log.info("生成的唯一 slug: %s", slug)
+    log.info("发布日期: %s", previous_date_str)
+
+    headers = {
+        "Authorization": f"Bearer {HALO_TOKEN}",
+        "Content-Type": "application/json"
+    }
+
+    # 发布前检查：已发布过则直接返回（重跑是安全的空操作）
+    ledger = ledger or PublishLedger()
+    digest = content_hash(title, content)
+    existing = _check_published(HALO_URL, headers, repo_info, slug, ledger, digest)
+    if existing:
+        log.info("⏭️ 文章已存在（slug: %s），跳过发布", slug)
+        return _published_result(existing)
+
+    # 解析分类和标签为 Halo 的 metadata.name（ID），不存在则创建
+    log.info("准备分类和标签...")
+    try:
+        cat_ids, tag_ids = resolve_categories_and_tags(HALO_URL, headers, category_names, tag_names)
+    except http_client.RequestException as e:
+        log.error("🌐 解析分类和标签失败: %s", e)
+        return None
+    payload = build_post_payload(title, content, slug, previous_date_str, repo_info)
+    payload["post"]["spec"]["categories"] = cat_ids
+    payload["post"]["spec"]["tags"] = tag_ids
+    log.info("  分类: %s -> %s", category_names, cat_ids)
+    log.info("  标签: %s%s -> %s%s", tag_names[:5], '...' if len(tag_names) > 5 else '', tag_ids[:5], '...' if len(tag_ids) > 5 else '')
+
     try:
-        response = requests.post(
+        response = http_client.post(
             f"{HALO_URL}/apis/api.console.halo.run/v1alpha1/posts",
             headers=headers,
             json=payload,
@@ -341,56 +669,68 @@ def publish_to_halo(post_data):
         )
         
         if response.status_code == 200:
-            print("✅ 文章发布到 Halo 成功！")
-            print(f"📝 文章标题: {title}")
-            print(f"🔗 文章 slug: {slug}")
-            print(f"📅 GitHub 原始日期: {repo_info['date']}")
-            print(f"🕗 发布时间 (北京时间): {previous_date_str}T08:00:00+08:00")
-            print(f"🏷️ 文章分类: {category_names}")
-            print(f"🏷️ 文章标签: {tag_names}")
-            print(f"📂 项目名称: {repo_info['name']}")
-            return response.json()
+            result = response.json()
+            _absent.discard((HALO_URL, slug))
+            ledger.record(repo_info.get('url'), slug, (result.get("metadata") or {}).get("name"), title, digest)
+            log.info("✅ 文章发布到 Halo 成功！")
+            log.info("📝 文章标题: %s", title)
+            log.info("🔗 文章 slug: %s", slug)
+            log.info("📅 GitHub 原始日期: %s", repo_info['date'])
+            log.info("🕗 发布时间 (北京时间): %sT08:00:00+08:00", previous_date_str)
+            log.info("🏷️ 文章分类: %s", category_names)
+            log.info("🏷️ 文章标签: %s", tag_names)
+            log.info("📂 项目名称: %s", repo_info['name'])
+            return result
         elif response.status_code == 530:
-            # Cloudflare 530 错误，通常是临时网络问题
-            print(f"🌐 Cloudflare 530 错误: {response.text[:200]}")
-            print("💡 提示: 这通常是临时的网络连接问题，重试可能会解决")
-            raise requests.exceptions.RequestException("Cloudflare 530 Tunnel error")
+            # Cloudflare 530 错误，http_client 已按退避策略重试过
+            log.error("🌐 Cloudflare 530 错误: %s", response.text[:200])
+            log.error("💡 提示: 这通常是临时的网络连接问题，多次重试后仍失败，请稍后再试")
+            return None
         else:
-            print(f"❌ 发布失败: {response.status_code}")
-            print(f"📋 错误详情: {response.text}")
+            # 名称冲突可能是上一次发布其实已经成功（例如响应超时），确认后按已发布处理
+            if response.status_code in (400, 409):
+                existing = _check_published(HALO_URL, headers, repo_info, slug, ledger, digest, recheck=True)
+                if existing:
+                    log.info("✅ Halo 中已存在该文章，按已发布处理")
+                    return _published_result(existing)
+
+            log.error("❌ 发布失败: %s", response.status_code)
+            log.error("📋 错误详情: %s", response.text)
             
             # 如果是重复错误，提供更详细的解决方案
             if response.status_code == 400 and "名称重复" in response.text:
-                print("\n💡 解决方案:")
-                print("   虽然使用了唯一 slug，但仍然出现重复，可能是极端情况")
-                print("   建议检查 Halo 后台是否已存在相同标题或 slug 的文章")
-                print(f"   当前 slug: {slug}")
+                log.info("\n💡 解决方案:")
+                log.info("   虽然使用了唯一 slug，但仍然出现重复，可能是极端情况")
+                log.info("   建议检查 Halo 后台是否已存在相同标题或 slug 的文章")
+                log.info("   当前 slug: %s", slug)
             
             return None
             
-    except requests.exceptions.RequestException as e:
-        print(f"🌐 发布请求错误: {e}")
-        raise
+    except http_client.RequestException as e:
+        log.error("🌐 发布请求错误: %s", e)
+        return None
 
 if __name__ == "__main__":
+    tracing.configure_logging()
     # 读取生成的文章
     post_data = read_generated_post()
     if not post_data:
-        print("无法读取生成的文章数据")
+        log.error("无法读取生成的文章数据")
         exit(1)
     
-    print(f"开始发布文章到 Halo...")
-    print(f"项目: {post_data['repo_info']['name']}")
-    print(f"标题: {post_data['title']}")
+    log.info("开始发布文章到 Halo...")
+    log.info("项目: %s", post_data['repo_info']['name'])
+    log.info("标题: %s", post_data['title'])
     
     # 发布到 Halo
     result = publish_to_halo(post_data)
+    tracing.log_summary()
     
     if result:
-        print("\n🎉 自动化流程完成！文章已成功发布到 Halo")
-        print("✅ 文章已设置为当天发布")
-        print("✅ 包含指定的自动化标签")
-        print("✅ 使用唯一 slug 避免重复")
+        log.info("\n🎉 自动化流程完成！文章已成功发布到 Halo")
+        log.info("✅ 文章已设置为当天发布")
+        log.info("✅ 包含指定的自动化标签")
+        log.info("✅ 使用唯一 slug 避免重复")
     else:
-        print("\n❌ 发布失败")
+        log.error("\n❌ 发布失败")
         exit(1)
\ No newline at end of file
@@ -0,0 +1,221 @@
+import math
+import os
+from datetime import datetime, timedelta
+
+from dedup_store import normalize_repo_url
+from trending_parser import parse_count
+
+try:
+    import numpy as np
+except ImportError:  # numpy 是可选依赖，没有时使用纯 Python 实现
+    np = None
+
+# 各特征的权重，可用 RANKING_WEIGHTS="velocity=0.4,novelty=0.2" 覆盖部分或全部
+DEFAULT_WEIGHTS = {
+    "velocity": 0.35,   # 当前每天新增的 Star（对数）
+    "momentum": 0.15,   # 与历史快照中的日均新增相比是否在加速
+    "novelty": 0.2,     # 之前在榜单上出现的天数越少越新
+    "diversity": 0.1,   # 与最近推荐过的仓库语言不同
+    "rank": 0.2,        # 在各榜单上的排名（出现在多个榜单上会累加）
+}
+FEATURES = tuple(DEFAULT_WEIGHTS)
+# 参与计算的历史快照天数
+HISTORY_WINDOW_DAYS = int(os.getenv("RANKING_WINDOW_DAYS", "14"))
+# stars_today 对应的时间跨度（天），用来把周榜/月榜的数字换算成日均
+_PERIOD_DAYS = {"daily": 1, "weekly": 7, "monthly": 30}
+
+
+def load_weights(spec: str | None = None) -> dict:
+    """解析 RANKING_WEIGHTS（name=value，逗号分隔），未给出的特征使用默认权重"""
+    weights = dict(DEFAULT_WEIGHTS)
+    spec = spec if spec is not None else os.getenv("RANKING_WEIGHTS", "")
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"未知的排序特征: {name}（可选: {', '.join(FEATURES)}）")
+        weights[name] = float(value)
+    return weights
+
+
+def select_backend(preferred: str | None = None) -> str:
+    preferred = preferred or os.getenv("RANKING_BACKEND")
+    if preferred == "numpy" and np is None:
+        raise ImportError("RANKING_BACKEND=numpy 但未安装 numpy")
+    return preferred or ("numpy" if np is not None else "python")
+
+
+# ---- 当前榜单上的特征（两种实现共用）----
+def _current_features(candidates: list, recent_languages: list) -> dict:
+    """从候选仓库本身得到：日均新增 Star、榜单排名得分、语言多样性"""
+    language_share = {}
+    for language in recent_languages:
+        language_share[language] = language_share.get(language, 0) + 1 / len(recent_languages)
+
+    rate, rank, diversity = [], [], []
+    for position, repo in enumerate(candidates, start=1):
+        lists = repo.get("lists") or [{"since": "daily", "rank": position}]
+        today = parse_count(repo.get("stars_today"))
+        rate.append(max(today, 0) / _PERIOD_DAYS.get(lists[0].get("since"), 1))
+        rank.append(sum(1 / max(int(item.get("rank", position)), 1) for item in lists))
+        diversity.append(1 - language_share.get(repo.get("language") or "", 0))
+    return {"rate": rate, "rank": rank, "diversity": diversity}
+
+
+def _window(store, today: str, window_days: int) -> tuple:
+    """历史窗口（不含今天）对应的行号区间"""
+    if store is None or not len(store):
+        return 0, 0
+    end = datetime.strptime(today, "%Y-%m-%d").date() - timedelta(days=1)
+    return store.row_range(end - timedelta(days=window_days - 1), end)
+
+
+# ---- 纯 Python 实现 ----
+def _history_python(store, repo_ids: list, lo: int, hi: int, recent_ids: set) -> tuple:
+    """每个候选仓库在窗口内出现的天数、daily 榜单的日均新增 Star；以及最近推荐仓库的语言"""
+    n = len(repo_ids)
+    slot = {repo_id: i for i, repo_id in enumerate(repo_ids) if repo_id is not None}
+    seen_days = [set() for _ in range(n)]
+    hist_sum = [0.0] * n
+    hist_cnt = [0] * n
+    recent_language = {}
+    if hi > lo:
+        daily = [key.startswith("daily/") for key in store.lists.values]
+        c = store.columns
+        for r in range(lo, hi):
+            repo_id = c["repo"][r]
+            if repo_id in recent_ids:
+                recent_language[repo_id] = store.languages.values[c["language"][r]]
+            i = slot.get(repo_id)
+            if i is None:
+                continue
+            seen_days[i].add(c["day"][r])
+            if daily[c["list"][r]] and c["stars_today"][r] >= 0:
+                hist_sum[i] += c["stars_today"][r]
+                hist_cnt[i] += 1
+    return [len(days) for days in seen_days], hist_sum, hist_cnt, recent_language
+
+
+def _scale(values: list) -> list:
+    low, high = min(values), max(values)
+    if high <= low:
+        return [0.0] * len(values)
+    return [(v - low) / (high - low) for v in values]
+
+
+def _score_python(current: dict, seen: list, hist_sum: list, hist_cnt: list, weights: dict) -> list:
+    def signed_log(x):
+        return math.copysign(math.log1p(abs(x)), x)
+
+    rate = current["rate"]
+    momentum = [
+        signed_log(rate[i] - hist_sum[i] / hist_cnt[i]) if hist_cnt[i] else 0.0
+        for i in range(len(rate))
+    ]
+    features = {
+        "velocity": _scale([math.log1p(v) for v in rate]),
+        "momentum": _scale(momentum),
+        "novelty": [1 / (1 + d) for d in seen],
+        "diversity": current["diversity"],
+        "rank": _scale(current["rank"]),
+    }
+    return [
+        sum(weights[name] * features[name][i] for name in FEATURES)
+        for i in range(len(rate))
+    ]
+
+
+# ---- numpy 实现 ----
+def _history_numpy(store, repo_ids: list, lo: int, hi: int, recent_ids: set) -> tuple:
+    n = len(repo_ids)
+    if hi <= lo:
+        return np.zeros(n), np.zeros(n), np.zeros(n), {}
+    c = store.columns
+    repo = np.frombuffer(c["repo"], dtype=np.uint32)[lo:hi]
+    day = np.frombuffer(c["day"], dtype=np.uint16)[lo:hi].astype(np.int64)
+    lst = np.frombuffer(c["list"], dtype=np.uint8)[lo:hi]
+    stars_today = np.frombuffer(c["stars_today"], dtype=np.int32)[lo:hi]
+
+    # 仓库 ID → 候选序号（-1 表示不是候选）
+    lookup = np.full(len(store.repos.values), -1, dtype=np.int64)
+    for i, repo_id in enumerate(repo_ids):
+        if repo_id is not None:
+            lookup[repo_id] = i
+    slot = lookup[repo]
+    hit = slot >= 0
+
+    pairs = np.unique(slot[hit] * 65536 + day[hit])
+    seen = np.bincount(pairs // 65536, minlength=n)
+
+    daily = np.array([key.startswith("daily/") for key in store.lists.values], dtype=bool)
+    counted = hit & daily[lst] & (stars_today >= 0)
+    hist_sum = np.bincount(slot[counted], weights=stars_today[counted], minlength=n)
+    hist_cnt = np.bincount(slot[counted], minlength=n)
+
+    recent_language = {}
+    if recent_ids:
+        mask = np.isin(repo, np.fromiter(recent_ids, dtype=np.uint32))
+        languages = np.frombuffer(c["language"], dtype=np.uint16)[lo:hi]
+        for repo_id, language_id in zip(repo[mask].tolist(), languages[mask].tolist()):
+            recent_language[repo_id] = store.languages.values[language_id]
+    return seen, hist_sum, hist_cnt, recent_language
+
+
+def _scale_numpy(values):
+    low, high = values.min(), values.max()
+    if high <= low:
+        return np.zeros_like(values, dtype=float)
+    return (values - low) / (high - low)
+
+
+def _score_numpy(current: dict, seen, hist_sum, hist_cnt, weights: dict):
+    rate = np.asarray(current["rate"], dtype=float)
+    has_history = hist_cnt > 0
+    baseline = np.divide(hist_sum, hist_cnt, out=np.zeros(len(rate)), where=has_history)
+    delta = rate - baseline
+    momentum = np.where(has_history, np.sign(delta) * np.log1p(np.abs(delta)), 0.0)
+    matrix = np.column_stack([
+        _scale_numpy(np.log1p(rate)),
+        _scale_numpy(momentum),
+        1 / (1 + np.asarray(seen, dtype=float)),
+        np.asarray(current["diversity"], dtype=float),
+        _scale_numpy(np.asarray(current["rank"], dtype=float)),
+    ])
+    return matrix @ np.array([weights[name] for name in FEATURES])
+
+
+def rank_candidates(candidates: list, store=None, recent_urls=(), weights: dict | None = None,
+                    today: str | None = None, window_days: int = HISTORY_WINDOW_DAYS,
+                    backend: str | None = None) -> list:
+    """
+    为候选仓库打分并按得分从高到低排序（得分相同保持原顺序），得分写入 repo["score"]。
+    store 为 SnapshotStore（可选），用于计算历史动量和新鲜度；
+    recent_urls 为最近推荐过的仓库，用于语言多样性。
+    """
+    if not candidates:
+        return []
+    weights = weights or load_weights()
+    backend = select_backend(backend)
+    today = today or candidates[0].get("date") or datetime.now().strftime("%Y-%m-%d")
+
+    lo, hi = _window(store, today, window_days)
+    repo_ids = [store.repos.get(normalize_repo_url(r["url"])) for r in candidates] if store else [None] * len(candidates)
+    recent_ids = set()
+    if store:
+        recent_ids = {i for i in (store.repos.get(normalize_repo_url(u)) for u in recent_urls) if i is not None}
+
+    history = _history_numpy if backend == "numpy" else _history_python
+    seen, hist_sum, hist_cnt, recent_language = history(store, repo_ids, lo, hi, recent_ids)
+    current = _current_features(candidates, list(recent_language.values()))
+
+    if backend == "numpy":
+        scores = _score_numpy(current, seen, hist_sum, hist_cnt, weights)
+        order = np.lexsort((np.arange(len(candidates)), -scores)).tolist()
+        scores = scores.tolist()
+    else:
+        scores = _score_python(current, seen, hist_sum, hist_cnt, weights)
+        order = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))
+
+    for i, repo in enumerate(candidates):
+        repo["score"] = round(scores[i], 4)
+    return [candidates[i] for i in order]
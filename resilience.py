@@ -0,0 +1,254 @@
+import logging
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+
+import requests
+
+log = logging.getLogger(__name__)
+
+# 这些状态码表示请求未被处理或服务暂时不可用，可以安全重试
+RETRY_STATUSES_ALWAYS = {429, 503, 530}
+# 这些状态码只对幂等请求（GET/HEAD 等）重试，避免 POST 重复提交
+RETRY_STATUSES_IDEMPOTENT = {500, 502, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """熔断器打开，快速失败"""
+
+
+class DeadlineExceeded(requests.exceptions.RequestException):
+    """超出整体时间预算"""
+
+
+def parse_retry_after(value) -> float | None:
+    """解析 Retry-After 头（秒数或 HTTP 日期），返回等待秒数"""
+    if not value:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        dt = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if dt is None:
+        return None
+    return max(0.0, dt.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """指数退避 + 抖动（full jitter）的重试策略"""
+
+    def __init__(self, max_retries: int = 3, base_delay: float = 1.0,
+                 max_delay: float = 30.0, max_retry_after: float = 120.0):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Retry-After 超过此值时不再等待，直接失败
+        self.max_retry_after = max_retry_after
+
+    def backoff(self, attempt: int) -> float:
+        """第 attempt 次重试（从 1 开始）前的等待时间"""
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        return random.uniform(0, cap)
+
+    def delay_for(self, attempt: int, retry_after: float | None = None) -> float | None:
+        """综合 Retry-After 计算等待时间；返回 None 表示不应再重试"""
+        if attempt > self.max_retries:
+            return None
+        if retry_after is not None:
+            if retry_after > self.max_retry_after:
+                return None
+            return retry_after
+        return self.backoff(attempt)
+
+    def should_retry_status(self, method: str, status: int) -> bool:
+        if status in RETRY_STATUSES_ALWAYS:
+            return True
+        return method.upper() in IDEMPOTENT_METHODS and status in RETRY_STATUSES_IDEMPOTENT
+
+    @staticmethod
+    def should_retry_exception(method: str, exc: Exception) -> bool:
+        if isinstance(exc, (CircuitOpenError, DeadlineExceeded)):
+            return False
+        # 连接没建立成功，服务端肯定没处理，任何方法都可以重试
+        if isinstance(exc, requests.exceptions.ConnectionError) and not isinstance(
+                exc, requests.exceptions.ReadTimeout):
+            return True
+        if isinstance(exc, requests.exceptions.Timeout):
+            return method.upper() in IDEMPOTENT_METHODS
+        return False
+
+
+class TokenBucket:
+    """令牌桶限流器：rate 个/秒，最多累积 capacity 个"""
+
+    def __init__(self, rate: float, capacity: float | None = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, deadline: "Deadline | None" = None):
+        """取一个令牌，必要时等待；等待会超出时间预算则抛出 DeadlineExceeded"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None and deadline.remaining() < wait:
+                raise DeadlineExceeded("限流等待超出时间预算")
+            time.sleep(wait)
+
+
+class CircuitBreaker:
+    """
+    熔断器：连续失败 failure_threshold 次后打开，reset_timeout 秒内直接失败；
+    之后进入半开状态放行一次探测请求，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    raise CircuitOpenError("服务暂时不可用（熔断中），快速失败")
+                self.state = self.HALF_OPEN
+                self._probing = False
+            if self.state == self.HALF_OPEN:
+                if self._probing:
+                    raise CircuitOpenError("服务暂时不可用（熔断探测中），快速失败")
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self._failures = 0
+            self._probing = False
+
+    def release(self):
+        """调用在得到结果之前中断（超出时间预算、非网络异常）：不计成功或失败，只让出半开状态的探测名额"""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+class Deadline:
+    """整体时间预算"""
+
+    def __init__(self, seconds: float | None):
+        self.expires_at = None if seconds is None else time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        if self.expires_at is None:
+            return float("inf")
+        return self.expires_at - time.monotonic()
+
+    def check(self):
+        if self.remaining() <= 0:
+            raise DeadlineExceeded("已超出整体时间预算")
+
+    def clip_timeout(self, timeout):
+        """把单次请求的超时裁剪到剩余预算以内"""
+        remaining = self.remaining()
+        if remaining == float("inf"):
+            return timeout
+        if isinstance(timeout, tuple):
+            return tuple(min(t, remaining) if t is not None else remaining for t in timeout)
+        return remaining if timeout is None else min(timeout, remaining)
+
+
+def call_with_resilience(send, method: str, policy: RetryPolicy,
+                         breaker: CircuitBreaker | None = None,
+                         limiter: TokenBucket | None = None,
+                         deadline: Deadline | None = None,
+                         label: str = ""):
+    """
+    执行 send(timeout_clip) 并按策略重试。
+    send 接收一个裁剪超时的函数，返回 requests.Response。
+    最后一次的响应（即使状态码仍是可重试的）会原样返回，交给调用方处理。
+    """
+    deadline = deadline or Deadline(None)
+    attempt = 0
+    while True:
+        deadline.check()
+        if breaker is not None:
+            breaker.before_call()
+
+        try:
+            if limiter is not None:
+                limiter.acquire(deadline)
+            response = send(deadline.clip_timeout)
+        except DeadlineExceeded:
+            # 超出时间预算（包括排队等限流令牌时）不是服务故障，不计入熔断，只归还半开探测名额
+            if breaker is not None:
+                breaker.release()
+            raise
+        except requests.exceptions.RequestException as e:
+            if breaker is not None:
+                breaker.record_failure()
+            attempt += 1
+            delay = policy.delay_for(attempt) if policy.should_retry_exception(method, e) else None
+            if delay is None or delay > deadline.remaining():
+                raise
+            log.warning("  网络请求失败 %s，%.1f秒后重试 (%d/%d): %s", label, delay, attempt, policy.max_retries, e)
+            time.sleep(delay)
+            continue
+        except BaseException:
+            # send 中的编程错误、KeyboardInterrupt 等：否则半开状态会一直占着探测名额
+            if breaker is not None:
+                breaker.release()
+            raise
+
+        if not policy.should_retry_status(method, response.status_code):
+            if breaker is not None:
+                # 4xx 是调用方的问题，不代表服务故障；不重试的 5xx（如 POST 的 500）仍计为失败
+                if response.status_code < 500:
+                    breaker.record_success()
+                else:
+                    breaker.record_failure()
+            return response
+
+        if breaker is not None:
+            breaker.record_failure()
+        attempt += 1
+        retry_after = parse_retry_after(response.headers.get("Retry-After"))
+        delay = policy.delay_for(attempt, retry_after)
+        if delay is None or delay > deadline.remaining():
+            return response
+        log.warning("  服务暂时不可用 %s (%d)，%.1f秒后重试 (%d/%d)",
+                    label, response.status_code, delay, attempt, policy.max_retries)
+        response.close()
+        time.sleep(delay)
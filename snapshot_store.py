@@ -0,0 +1,294 @@
+import argparse
+import bisect
+import json
+import logging
+import os
+import sys
+from array import array
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+from dedup_store import normalize_repo_url
+from trending_parser import parse_count
+
+log = logging.getLogger(__name__)
+
+# 每日 Trending 快照的列式存储目录（只追加，随仓库提交）
+HISTORY_DIR = os.getenv("TRENDING_HISTORY_DIR", "trending_history")
+FORMAT_VERSION = 1
+# 日期列保存为距 EPOCH 的天数（uint16，可用到 2179 年）
+EPOCH = date(2000, 1, 1)
+
+# 列名 → array 类型码。每行是某个仓库在某天某个榜单上的一次出现
+COLUMNS = {
+    "day": "H",
+    "list": "B",
+    "rank": "B",
+    "repo": "I",
+    "language": "H",
+    "stars": "i",
+    "stars_today": "i",
+}
+# 追加顺序：先写字典文件，再写各列；day 列最后写，作为一行是否完整的标志
+_APPEND_ORDER = ("list", "rank", "repo", "language", "stars", "stars_today", "day")
+
+Snapshot = namedtuple("Snapshot", "date repo list rank stars stars_today language")
+
+
+def _to_day(value) -> int:
+    if isinstance(value, str):
+        value = datetime.strptime(value, "%Y-%m-%d").date()
+    return (value - EPOCH).days
+
+
+def _from_day(day: int) -> str:
+    return (EPOCH + timedelta(days=day)).isoformat()
+
+
+def list_key(since: str = "daily", language: str = "") -> str:
+    """榜单标识，例如 daily/、weekly/python"""
+    return f"{since}/{language}"
+
+
+class _Interner:
+    """字符串 → 连续整数 ID，持久化为每行一个值的文本文件（只追加）"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.values = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self.values = f.read().split("\n")[:-1]
+        self.ids = {v: i for i, v in enumerate(self.values)}
+        self._pending = []
+
+    def id(self, value: str) -> int:
+        found = self.ids.get(value)
+        if found is None:
+            found = self.ids[value] = len(self.values)
+            self.values.append(value)
+            self._pending.append(value)
+        return found
+
+    def get(self, value: str):
+        return self.ids.get(value)
+
+    def flush(self):
+        if self._pending:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("".join(v + "\n" for v in self._pending))
+                f.flush()
+                os.fsync(f.fileno())
+            self._pending = []
+
+
+class SnapshotStore:
+    """
+    Trending 快照的列式存储：每列一个二进制文件（array.tofile），
+    仓库、榜单、语言都以整数 ID 保存。行按日期顺序追加，日期范围查询用二分查找；
+    仓库的排名历史直接在 repo 列的字节上查找。
+    """
+
+    def __init__(self, path: str = HISTORY_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._check_meta()
+        self.repos = _Interner(self._file("repos.txt"))
+        self.lists = _Interner(self._file("lists.txt"))
+        self.languages = _Interner(self._file("languages.txt"))
+        self.columns = {}
+        self._repo_bytes = None
+        self._load()
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _check_meta(self):
+        meta_file = self._file("meta.json")
+        if not os.path.exists(meta_file):
+            with open(meta_file, "w", encoding="utf-8") as f:
+                json.dump({"version": FORMAT_VERSION, "byteorder": sys.byteorder,
+                           "epoch": EPOCH.isoformat(), "columns": COLUMNS}, f, indent=2)
+        with open(meta_file, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if self.meta.get("version") != FORMAT_VERSION:
+            raise ValueError(f"不支持的快照格式版本: {self.meta.get('version')}")
+
+    def _load(self):
+        """读取所有列；列长度不一致（上次写入中断）时截断到完整的行"""
+        swap = self.meta.get("byteorder", sys.byteorder) != sys.byteorder
+        for name, code in COLUMNS.items():
+            col = array(code)
+            path = self._file(f"{name}.bin")
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    data = f.read()
+                col.frombytes(data[:len(data) - len(data) % col.itemsize])
+                if swap:
+                    col.byteswap()
+            self.columns[name] = col
+        rows = min(len(col) for col in self.columns.values())
+        for name, col in self.columns.items():
+            if len(col) > rows:
+                log.warning("快照列 %s 有未完成的写入，截断到 %d 行", name, rows)
+                del col[rows:]
+                with open(self._file(f"{name}.bin"), "r+b") as f:
+                    f.truncate(rows * col.itemsize)
+
+    def __len__(self):
+        return len(self.columns["day"])
+
+    # ---- 写入 ----
+    def record(self, repos: list, day=None) -> int:
+        """
+        追加一次抓取结果。repos 为 crawl_trending 的合并结果（lists 字段记录榜单与排名），
+        没有 lists 字段时按列表顺序视为 daily 全语言榜单。
+        同一天同一榜单已经记录过的会跳过。返回新增的行数。
+        """
+        day = _to_day(day or datetime.now().date())
+        if len(self) and day < self.columns["day"][-1]:
+            raise ValueError(f"快照只能按日期顺序追加: {_from_day(day)} 早于 {_from_day(self.columns['day'][-1])}")
+
+        existing = {self.lists.values[i] for i in set(self.columns["list"][slice(*self._day_range(day, day))])}
+        rows = {name: array(code) for name, code in COLUMNS.items()}
+        for position, repo in enumerate(repos, start=1):
+            appearances = repo.get("lists") or [{"since": "daily", "language": "", "rank": position}]
+            for appearance in appearances:
+                key = list_key(appearance.get("since", "daily"), appearance.get("language", ""))
+                if key in existing:
+                    continue
+                rows["day"].append(day)
+                rows["list"].append(self.lists.id(key))
+                rows["rank"].append(min(int(appearance.get("rank", position)), 255))
+                rows["repo"].append(self.repos.id(normalize_repo_url(repo["url"])))
+                rows["language"].append(self.languages.id(repo.get("language") or ""))
+                rows["stars"].append(parse_count(repo.get("stars")))
+                rows["stars_today"].append(parse_count(repo.get("stars_today")))
+        if not rows["day"]:
+            return 0
+
+        for interner in (self.repos, self.lists, self.languages):
+            interner.flush()
+        for name in _APPEND_ORDER:
+            with open(self._file(f"{name}.bin"), "ab") as f:
+                rows[name].tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            self.columns[name].extend(rows[name])
+        self._repo_bytes = None
+        return len(rows["day"])
+
+    # ---- 查询 ----
+    def _day_range(self, start: int, end: int) -> tuple:
+        days = self.columns["day"]
+        return bisect.bisect_left(days, start), bisect.bisect_right(days, end)
+
+    def _row(self, i: int) -> Snapshot:
+        c = self.columns
+        return Snapshot(
+            _from_day(c["day"][i]), self.repos.values[c["repo"][i]], self.lists.values[c["list"][i]],
+            c["rank"][i], c["stars"][i], c["stars_today"][i], self.languages.values[c["language"][i]],
+        )
+
+    def row_range(self, start=None, end=None) -> tuple:
+        """日期范围（含两端，日期字符串或 date）对应的行号区间 [lo, hi)，供按列批量处理"""
+        days = self.columns["day"]
+        return self._day_range(
+            _to_day(start) if start else 0,
+            _to_day(end) if end else (days[-1] if days else 0),
+        )
+
+    def dates(self) -> list:
+        return [_from_day(d) for d in sorted(set(self.columns["day"]))]
+
+    def scan(self, start=None, end=None, since: str | None = None, language: str | None = None):
+        """按日期范围（含两端）遍历快照行；可只看某个榜单"""
+        lo, hi = self.row_range(start, end)
+        list_id = None
+        if since is not None or language is not None:
+            list_id = self.lists.get(list_key(since or "daily", language or ""))
+            if list_id is None:
+                return
+        lists = self.columns["list"]
+        for i in range(lo, hi):
+            if list_id is None or lists[i] == list_id:
+                yield self._row(i)
+
+    def _rows_for(self, url: str) -> array:
+        """仓库出现过的行号。直接在 repo 列的字节中查找该 ID（C 速度，无需建索引）"""
+        rows = array("I")
+        repo_id = self.repos.get(normalize_repo_url(url))
+        if repo_id is None:
+            return rows
+        if self._repo_bytes is None:
+            self._repo_bytes = self.columns["repo"].tobytes()
+        data = self._repo_bytes
+        needle = array(COLUMNS["repo"], [repo_id]).tobytes()
+        width = len(needle)
+        pos = data.find(needle)
+        while pos != -1:
+            if pos % width == 0:
+                rows.append(pos // width)
+                pos = data.find(needle, pos + width)
+            else:
+                pos = data.find(needle, pos + 1)
+        return rows
+
+    def repo_history(self, url: str) -> list:
+        """某个仓库在所有榜单上的全部快照，按日期排序"""
+        return [self._row(i) for i in self._rows_for(url)]
+
+    def rank_history(self, url: str, since: str = "daily", language: str = "") -> list:
+        """某个仓库在指定榜单上的排名历史：[(日期, 排名, stars, stars_today)]"""
+        list_id = self.lists.get(list_key(since, language))
+        lists = self.columns["list"]
+        return [
+            (row.date, row.rank, row.stars, row.stars_today)
+            for row in (self._row(i) for i in self._rows_for(url) if lists[i] == list_id)
+        ]
+
+    def disk_usage(self) -> int:
+        return sum(os.path.getsize(self._file(n)) for n in os.listdir(self.path))
+
+
+def _cmd_history(store: SnapshotStore, args):
+    for row in store.rank_history(args.url, args.since, args.language):
+        print("\t".join(str(v) for v in row))
+
+
+def _cmd_scan(store: SnapshotStore, args):
+    for row in store.scan(args.start, args.end, args.since, args.language):
+        print("\t".join(str(v) for v in row))
+
+
+def _cmd_stats(store: SnapshotStore, args):
+    dates = store.dates()
+    print(f"行数: {len(store)}，仓库: {len(store.repos.values)}，榜单: {len(store.lists.values)}")
+    if dates:
+        print(f"日期: {dates[0]} ~ {dates[-1]}（{len(dates)} 天）")
+    print(f"占用: {store.disk_usage() / 1024:.1f} KB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Trending 历史快照查询")
+    parser.add_argument("--dir", default=HISTORY_DIR)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("history", help="仓库在某个榜单上的排名历史")
+    p.add_argument("url")
+    p.add_argument("--since", default="daily")
+    p.add_argument("--language", default="")
+    p.set_defaults(func=_cmd_history)
+
+    p = sub.add_parser("scan", help="按日期范围列出快照")
+    p.add_argument("--start")
+    p.add_argument("--end")
+    p.add_argument("--since")
+    p.add_argument("--language")
+    p.set_defaults(func=_cmd_scan)
+
+    p = sub.add_parser("stats", help="存储概况")
+    p.set_defaults(func=_cmd_stats)
+
+    args = parser.parse_args()
+    args.func(SnapshotStore(args.dir), args)
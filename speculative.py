@@ -0,0 +1,71 @@
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import tracing
+from generate_post import generate_post_with_deepseek, validate_post
+
+log = logging.getLogger(__name__)
+
+# 推测生成：同时为排名前 K 的候选仓库生成文章，采用第一篇通过校验的，其余取消。
+# K <= 1 时关闭（只为第一个候选生成，与原流程相同）
+SPECULATIVE_K = int(os.getenv("SPECULATIVE_K", "1"))
+# 各候选的流式断点文件目录
+SPECULATIVE_DIR = os.getenv("SPECULATIVE_DIR", ".speculative")
+
+
+def _partial_file(repo, partial_dir):
+    name = re.sub(r"[^A-Za-z0-9\-_.]", "-", repo["name"].replace("/", "__"))
+    return os.path.join(partial_dir, f"{name}.partial")
+
+
+def _generate(repo, cancel, partial_dir):
+    """生成单篇文章并校验，返回 (repo, title, content, 不可用的原因)"""
+    partial_file = _partial_file(repo, partial_dir)
+    try:
+        title, content = generate_post_with_deepseek(repo, partial_file=partial_file, cancel=cancel)
+    except Exception as e:
+        return repo, None, None, str(e)
+    if cancel.is_set():
+        return repo, None, None, "已取消"
+    return repo, title, content, validate_post(title, content)
+
+
+def generate_first_valid(candidates, k=SPECULATIVE_K, partial_dir=SPECULATIVE_DIR):
+    """
+    并发为 candidates 的前 k 个仓库生成文章，每篇完成时立即校验，
+    返回第一篇通过校验的 (repo, title, content) 并取消其余生成；全部失败返回 None。
+    这里不记录已处理仓库，由调用方在发布成功后再写入 CSV。
+    """
+    candidates = list(candidates[:max(1, k)])
+    if not candidates:
+        return None
+    os.makedirs(partial_dir, exist_ok=True)
+    cancels = {repo["url"]: threading.Event() for repo in candidates}
+    log.info("推测生成 %d 个候选: %s", len(candidates), ", ".join(r["name"] for r in candidates))
+
+    with tracing.span("speculate", k=len(candidates)) as s:
+        pool = ThreadPoolExecutor(max_workers=len(candidates), thread_name_prefix="speculate")
+        try:
+            futures = [pool.submit(tracing.bind(_generate), repo, cancels[repo["url"]], partial_dir)
+                       for repo in candidates]
+            failed = 0
+            for future in as_completed(futures):
+                repo, title, content, error = future.result()
+                if error is None:
+                    s.set(winner=repo["url"], failed=failed)
+                    log.info("✅ 采用 %s 的文章（%d 字符），取消其余 %d 个仍在进行的生成",
+                             repo['name'], len(content), sum(1 for f in futures if not f.done()))
+                    return repo, title, content
+                failed += 1
+                log.warning("[%s] 生成结果不可用: %s", repo['name'], error)
+            s.set(failed=failed)
+            log.error("%d 个候选的文章都不可用", failed)
+            return None
+        finally:
+            # 通知仍在流式生成的线程断开连接，不等待它们结束
+            for cancel in cancels.values():
+                cancel.set()
+            pool.shutdown(wait=False, cancel_futures=True)
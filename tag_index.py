@@ -0,0 +1,175 @@
+import bisect
+import json
+import os
+from collections import deque
+
+from github_enrich import get_readme
+
+# 技术标签词表：[{"tag": 显示名, "aliases": [...], "strict": [...], "weight": 1.0}]
+# strict 中是容易误判的词（go、r、swift…），只在仓库名、topics、语言字段中匹配
+TAXONOMY_FILE = os.getenv(
+    "TAG_TAXONOMY", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tag_taxonomy.json"))
+# 各字段命中的权重；同一字段内同一标签最多计 MAX_HITS_PER_FIELD 次
+FIELD_WEIGHTS = {"name": 3.0, "topics": 3.0, "language": 2.0, "desc": 2.0, "readme": 1.0}
+STRICT_FIELDS = {"name", "topics", "language"}
+MAX_HITS_PER_FIELD = 3
+# 得分低于该值的标签不采用（例如只在 README 里出现过一次）
+MIN_SCORE = 2.0
+README_SCAN_CHARS = 20000
+
+# 连字符、下划线、斜杠统一视为空格，"machine-learning" 与 "machine learning" 等价
+_SEPARATORS = str.maketrans({"-": " ", "_": " ", "/": " "})
+
+
+def normalize(text: str) -> str:
+    return (text or "").lower().translate(_SEPARATORS)
+
+
+def _is_word_char(ch: str) -> bool:
+    """只有 ASCII 字母数字需要词边界；中文等字符之间没有空格，不做边界检查"""
+    return ch.isascii() and ch.isalnum()
+
+
+class TagIndex:
+    """
+    基于 Aho-Corasick 自动机的标签索引：所有别名一次建好，
+    对任意长度的文本只需线性扫描一遍即可找出全部命中（含重叠），并检查英文词边界。
+    """
+
+    def __init__(self, entries: list):
+        self.tags = []        # [(显示名, 权重)]
+        self.patterns = []    # [(别名, [(标签序号, 是否 strict)])]
+        pattern_ids = {}
+        for tag_id, entry in enumerate(entries):
+            self.tags.append((entry["tag"], float(entry.get("weight", 1.0))))
+            strict = {normalize(a) for a in entry.get("strict", [])}
+            aliases = {normalize(a) for a in entry.get("aliases", [])}
+            if normalize(entry["tag"]) not in strict:
+                aliases.add(normalize(entry["tag"]))
+            for alias, is_strict in [(a, False) for a in aliases - strict] + [(a, True) for a in strict]:
+                alias = alias.strip()
+                if not alias:
+                    continue
+                pid = pattern_ids.get(alias)
+                if pid is None:
+                    pid = pattern_ids[alias] = len(self.patterns)
+                    self.patterns.append((alias, []))
+                self.patterns[pid][1].append((tag_id, is_strict))
+        self._build()
+
+    def _build(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [[]]
+        for pid, (alias, _) in enumerate(self.patterns):
+            node = 0
+            for ch in alias:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = self._goto[node][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                node = nxt
+            self._out[node].append((len(alias), pid))
+
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                fail = self._fail[node]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def matches(self, text: str):
+        """在已规范化的文本中查找全部别名，产出 (起始位置, 别名序号)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        node = 0
+        last = len(text) - 1
+        for i, ch in enumerate(text):
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for length, pid in out[node]:
+                start = i - length + 1
+                alias = self.patterns[pid][0]
+                if _is_word_char(alias[0]) and start > 0 and _is_word_char(text[start - 1]):
+                    continue
+                if _is_word_char(alias[-1]) and i < last and _is_word_char(text[i + 1]):
+                    continue
+                yield start, pid
+
+    def score(self, fields: dict) -> list:
+        """
+        对多个字段（字段名见 FIELD_WEIGHTS）一次扫描打分，
+        返回 [(标签, 得分)]，按得分从高到低、得分相同按词表顺序。
+        """
+        names = [name for name in FIELD_WEIGHTS if fields.get(name)]
+        parts = [normalize(fields[name]) for name in names]
+        offsets = []
+        position = 0
+        for part in parts:
+            offsets.append(position)
+            position += len(part) + 1
+        text = "\n".join(parts)
+
+        # 被更长的命中完全包含的别名不再计数（"向量数据库" 中的 "数据库"、"node.js" 中的 "js"）
+        found = sorted(self.matches(text), key=lambda m: (m[0], -len(self.patterns[m[1]][0])))
+        hits = {}
+        covered_until = -1
+        for start, pid in found:
+            end = start + len(self.patterns[pid][0])
+            if end <= covered_until:
+                continue
+            covered_until = end
+            field = names[bisect.bisect_right(offsets, start) - 1]
+            for tag_id, strict in self.patterns[pid][1]:
+                if strict and field not in STRICT_FIELDS:
+                    continue
+                key = (tag_id, field)
+                hits[key] = hits.get(key, 0) + 1
+
+        scores = {}
+        for (tag_id, field), count in hits.items():
+            gained = FIELD_WEIGHTS[field] * min(count, MAX_HITS_PER_FIELD) * self.tags[tag_id][1]
+            scores[tag_id] = scores.get(tag_id, 0.0) + gained
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [(self.tags[tag_id][0], round(value, 2)) for tag_id, value in ranked]
+
+
+def load_taxonomy(path: str = TAXONOMY_FILE) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+_default_index = None
+
+
+def default_index() -> TagIndex:
+    """按 TAG_TAXONOMY 构建的索引（进程内只构建一次）"""
+    global _default_index
+    if _default_index is None:
+        _default_index = TagIndex(load_taxonomy())
+    return _default_index
+
+
+def repo_fields(repo: dict) -> dict:
+    """从仓库信息（含 github_enrich 的 meta）中取出参与匹配的字段"""
+    meta = repo.get("meta") or {}
+    readme = get_readme(repo) or meta.get("readme_excerpt") or ""
+    return {
+        "name": repo.get("name") or "",
+        "topics": "\n".join(meta.get("topics") or []),
+        "language": repo.get("language") or meta.get("primary_language") or "",
+        "desc": repo.get("desc") or meta.get("description") or "",
+        "readme": readme[:README_SCAN_CHARS],
+    }
+
+
+def derive_tags(repo: dict, limit: int = 3, exclude=(), index: TagIndex | None = None) -> list:
+    """根据仓库名、描述、topics、语言和 README 推导技术标签，跳过 exclude 中的标签后按得分取前 limit 个"""
+    scored = (index or default_index()).score(repo_fields(repo))
+    return [tag for tag, value in scored if value >= MIN_SCORE and tag not in exclude][:limit]
@@ -0,0 +1,21 @@
+from html_normalizer import normalize_html
+
+
+def test_unmatched_backtick_stops_at_tag():
+    out = normalize_html("<p>text with a single ` backtick</p>\n\n<p>next</p>")
+    assert out == "<p>text with a single ` backtick</p>\n\n<p>next</p>"
+
+
+def test_unmatched_backtick_stops_at_newline():
+    out = normalize_html("<p>one ` tick\nnext line `code`</p>")
+    assert out == "<p>one ` tick\nnext line <code>code</code></p>"
+
+
+def test_inline_code_escapes_content():
+    out = normalize_html("<p>use `Vec<String>` and `a && b`</p>")
+    assert out == "<p>use <code>Vec&lt;String&gt;</code> and <code>a &amp;&amp; b</code></p>"
+
+
+def test_event_attr_after_slash_is_removed():
+    assert normalize_html("<img/onerror=alert(1) src=x>") == "<img src=x>"
+    assert normalize_html('<img src=x onerror="alert(1)">') == "<img src=x>"
@@ -0,0 +1,284 @@
+import atexit
+import contextvars
+import functools
+import itertools
+import json
+import logging
+import math
+import os
+import sys
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# 结构化计时：嵌套的 span、每个 HTTP 请求的记录和 DeepSeek token 用量，
+# 写入 JSON-lines 追踪文件（TRACE_FILE 为空时不写），运行结束时打印汇总表。
+TRACE_FILE = os.getenv("TRACE_FILE", ".trace.jsonl")
+# 每条记录带上运行 ID；分开执行的各阶段脚本追加到同一个文件，可按 run 区分。未指定时按进程生成
+TRACE_RUN_ID = os.getenv("TRACE_RUN_ID") or f"{time.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+# 对这些 span（逗号分隔的名称）开启 cProfile / tracemalloc，例如 PROFILE_SPANS=generate,stage:publish
+PROFILE_SPANS = {s.strip() for s in os.getenv("PROFILE_SPANS", "").split(",") if s.strip()}
+TRACEMALLOC_SPANS = {s.strip() for s in os.getenv("TRACEMALLOC_SPANS", "").split(",") if s.strip()}
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".profile")
+PROFILE_TOP = 15
+
+log = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("tracing_span", default=None)
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_spans = defaultdict(list)
+_http = []
+_usage = defaultdict(int)
+_trace = None
+_profiling = False
+
+
+def configure_logging(level: str | None = None):
+    """脚本入口调用：日志输出到 stdout，默认只有消息本身（与原来的 print 输出一致），LOG_LEVEL=DEBUG 显示细节"""
+    logging.basicConfig(
+        level=getattr(logging, (level or LOG_LEVEL), logging.INFO),
+        format=os.getenv("LOG_FORMAT", "%(message)s"),
+        stream=sys.stdout,
+    )
+
+
+def _emit(record: dict):
+    """追加一行到追踪文件（追加写入，不覆盖之前的运行或其他阶段脚本写入的记录）"""
+    global _trace
+    if not TRACE_FILE:
+        return
+    line = json.dumps({"run": TRACE_RUN_ID, **record}, ensure_ascii=False, default=str)
+    with _lock:
+        if _trace is None:
+            try:
+                _trace = open(TRACE_FILE, "a", encoding="utf-8")
+            except OSError as e:
+                log.warning("无法写入追踪文件 %s: %s", TRACE_FILE, e)
+                return
+            atexit.register(_trace.close)
+        _trace.write(line + "\n")
+        _trace.flush()
+
+
+class Span:
+    def __init__(self, name: str, attrs: dict):
+        self.id = next(_ids)
+        self.name = name
+        self.attrs = attrs
+        self.parent = _current.get()
+        self.start = time.time()
+        self.duration = None
+
+    @property
+    def path(self) -> str:
+        return f"{self.parent.path}/{self.name}" if self.parent else self.name
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+@contextmanager
+def span(name: str, **attrs):
+    """
+    计时一段代码，可嵌套：with span("generate", repo=url) as s: ...; s.set(chars=n)。
+    名称在 PROFILE_SPANS / TRACEMALLOC_SPANS 中时同时采集 cProfile / 内存分配。
+    """
+    s = Span(name, attrs)
+    token = _current.set(s)
+    profiler = _start_profile(name)
+    tracing_memory = _start_tracemalloc(name)
+    started = time.perf_counter()
+    try:
+        yield s
+    except BaseException as e:
+        s.attrs["error"] = type(e).__name__
+        raise
+    finally:
+        s.duration = time.perf_counter() - started
+        _current.reset(token)
+        if profiler:
+            _stop_profile(profiler, s)
+        if tracing_memory:
+            _stop_tracemalloc(s)
+        with _lock:
+            _spans[s.name].append(s.duration)
+        _emit({
+            "type": "span", "id": s.id, "parent": s.parent.id if s.parent else None,
+            "name": s.name, "path": s.path, "start": round(s.start, 6),
+            "duration": round(s.duration, 6), "thread": threading.current_thread().name, **s.attrs,
+        })
+        log.debug("%s 耗时 %.3fs", s.path, s.duration)
+
+
+def traced(name: str):
+    """装饰器形式的 span"""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def bind(fn):
+    """让 fn 在线程池中运行时仍挂在当前 span 下（contextvars 不会自动传给工作线程）"""
+    parent = _current.get()
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return wrapper
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def record_http(method: str, host: str, status, nbytes, latency: float, retries: int = 0,
+                error: str | None = None, cache: str | None = None):
+    """记录一次 HTTP 调用（含重试的总耗时）；cache 为 hit / revalidated / replay 时表示由 http_cache 提供"""
+    parent = _current.get()
+    entry = {
+        "method": method, "host": host, "status": status, "bytes": nbytes,
+        "latency": latency, "retries": retries, "error": error, "cache": cache,
+    }
+    with _lock:
+        _http.append(entry)
+    _emit({"type": "http", "span": parent.path if parent else None,
+           **entry, "latency": round(latency, 6)})
+
+
+def record_usage(model: str, usage: dict | None):
+    """记录大模型返回的 token 用量（OpenAI 兼容的 usage 字段）"""
+    if not usage:
+        return
+    fields = {k: int(usage.get(k) or 0) for k in ("prompt_tokens", "completion_tokens", "total_tokens")}
+    cached = usage.get("prompt_cache_hit_tokens")
+    if cached is not None:
+        fields["prompt_cache_hit_tokens"] = int(cached)
+    with _lock:
+        for k, v in fields.items():
+            _usage[k] += v
+    parent = _current.get()
+    _emit({"type": "usage", "span": parent.path if parent else None, "model": model, **fields})
+    log.debug("%s token 用量: %s", model, fields)
+
+
+# ---- 剖析 ----
+def _start_profile(name: str):
+    global _profiling
+    if name not in PROFILE_SPANS:
+        return None
+    with _lock:
+        # 同一时间只能有一个 cProfile 在运行
+        if _profiling:
+            return None
+        _profiling = True
+    # cProfile / pstats / tracemalloc 只在开启剖析时导入，不拖慢普通命令的启动
+    import cProfile
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+
+def _stop_profile(profiler, s: Span):
+    global _profiling
+    import io
+    import pstats
+
+    profiler.disable()
+    with _lock:
+        _profiling = False
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    path = os.path.join(PROFILE_DIR, f"{s.name.replace(':', '-')}-{s.id}.prof")
+    profiler.dump_stats(path)
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(PROFILE_TOP)
+    s.set(profile=path)
+    log.info("cProfile [%s] 已保存到 %s\n%s", s.name, path, out.getvalue())
+
+
+def _start_tracemalloc(name: str) -> bool:
+    if name not in TRACEMALLOC_SPANS:
+        return False
+    import tracemalloc
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+    tracemalloc.reset_peak()
+    return True
+
+
+def _stop_tracemalloc(s: Span):
+    import tracemalloc
+
+    current, peak = tracemalloc.get_traced_memory()
+    top = tracemalloc.take_snapshot().statistics("lineno")[:5]
+    s.set(mem_current=current, mem_peak=peak, mem_top=[str(stat) for stat in top])
+    log.info("tracemalloc [%s] 当前 %.1f KB，峰值 %.1f KB\n%s",
+             s.name, current / 1024, peak / 1024, "\n".join(f"  {stat}" for stat in top))
+
+
+# ---- 汇总 ----
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[max(0, min(len(ordered) - 1, math.ceil(len(ordered) * pct / 100) - 1))] if ordered else 0.0
+
+
+def summary() -> dict:
+    with _lock:
+        spans = {name: list(values) for name, values in _spans.items()}
+        http = list(_http)
+        usage = dict(_usage)
+    hosts = defaultdict(list)
+    for entry in http:
+        hosts[entry["host"]].append(entry)
+    return {
+        "spans": {
+            name: {"count": len(v), "total": sum(v), "max": max(v)} for name, v in spans.items()
+        },
+        "http": {
+            host: {
+                "calls": len(items),
+                "errors": sum(1 for e in items if e["error"] or (e["status"] or 0) >= 400),
+                "retries": sum(e["retries"] for e in items),
+                "cached": sum(1 for e in items if e["cache"]),
+                "bytes": sum(e["bytes"] or 0 for e in items),
+                "p50": _percentile([e["latency"] for e in items], 50),
+                "p95": _percentile([e["latency"] for e in items], 95),
+                "total": sum(e["latency"] for e in items),
+            }
+            for host, items in hosts.items()
+        },
+        "usage": usage,
+    }
+
+
+def log_summary():
+    """运行结束时打印各 span、各 host 的耗时汇总和 token 用量，并写入追踪文件"""
+    data = summary()
+    if not (data["spans"] or data["http"]):
+        return
+    _emit({"type": "summary", **data})
+    lines = ["", "=== 耗时汇总 ===", f"{'span':<28}{'次数':>6}{'总耗时':>10}{'最长':>10}"]
+    for name, s in sorted(data["spans"].items(), key=lambda kv: -kv[1]["total"]):
+        lines.append(f"{name:<28}{s['count']:>6}{s['total']:>10.3f}{s['max']:>10.3f}")
+    if data["http"]:
+        lines.append(f"\n{'host':<28}{'请求':>6}{'错误':>6}{'重试':>6}{'缓存':>6}{'KB':>10}{'p50':>8}{'p95':>8}{'总耗时':>10}")
+        for host, h in sorted(data["http"].items(), key=lambda kv: -kv[1]["total"]):
+            lines.append(f"{host:<28}{h['calls']:>6}{h['errors']:>6}{h['retries']:>6}{h['cached']:>6}"
+                         f"{h['bytes'] / 1024:>10.1f}{h['p50']:>8.3f}{h['p95']:>8.3f}{h['total']:>10.3f}")
+    if data["usage"]:
+        lines.append("\nDeepSeek token: " + ", ".join(f"{k}={v}" for k, v in data["usage"].items()))
+    if TRACE_FILE:
+        lines.append(f"追踪文件: {TRACE_FILE}")
+    log.info("\n".join(lines))
@@ -0,0 +1,105 @@
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import http_client
+import tracing
+from dedup_store import normalize_repo_url
+from trending_parser import parse_trending
+
+log = logging.getLogger(__name__)
+
+TRENDING_URL = os.getenv("GITHUB_TRENDING_URL", "https://github.com/trending")
+SINCE_VALUES = ("daily", "weekly", "monthly")
+# 同时抓取的页面数（共用 http_client 的 github.com 连接池）
+CRAWL_CONCURRENCY = int(os.getenv("TRENDING_CONCURRENCY", "8"))
+
+http_client.configure_host(
+    "github.com",
+    headers={"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"},
+    timeout=30,
+    # trending 页面是匿名抓取，限流避免触发 GitHub 的 429
+    rate=5,
+    burst=10,
+)
+
+
+def _env_list(name: str, default: str) -> list:
+    return [v.strip() for v in os.getenv(name, default).split(",")]
+
+
+def default_matrix() -> tuple:
+    """
+    从环境变量读取抓取矩阵：
+    TRENDING_SINCE=daily,weekly  TRENDING_LANGUAGES=,python,rust（空值表示全部语言）
+    默认只抓取 daily + 全部语言，与原来一致。
+    """
+    sinces = [s for s in _env_list("TRENDING_SINCE", "daily") if s]
+    languages = _env_list("TRENDING_LANGUAGES", "")
+    return sinces, languages
+
+
+def trending_url(since: str = "daily", language: str = "") -> str:
+    if since not in SINCE_VALUES:
+        raise ValueError(f"since 必须是 {SINCE_VALUES} 之一: {since}")
+    url = TRENDING_URL
+    if language:
+        url += "/" + quote(language.lower(), safe="")
+    return f"{url}?since={since}"
+
+
+def fetch_trending_page(since: str = "daily", language: str = "") -> list | None:
+    """抓取并解析一页 Trending，失败返回 None"""
+    url = trending_url(since, language)
+    try:
+        response = http_client.get(url)
+    except Exception as e:
+        log.warning("抓取 %s 出错: %s", url, e)
+        return None
+    if response.status_code != 200:
+        log.warning("Failed to fetch %s. Status code: %d", url, response.status_code)
+        return None
+    return parse_trending(response.text)
+
+
+def merge_lists(pages: list) -> list:
+    """
+    合并多个榜单：按规范 URL 去重，保持首次出现的顺序，
+    并在 lists 字段中记录仓库出现在哪些榜单及其排名（从 1 开始）。
+    pages: [(since, language, repos), ...]
+    """
+    merged = {}
+    for since, language, repos in pages:
+        for rank, repo in enumerate(repos or [], start=1):
+            key = normalize_repo_url(repo["url"])
+            entry = merged.get(key)
+            if entry is None:
+                entry = dict(repo)
+                entry["lists"] = []
+                merged[key] = entry
+            entry["lists"].append({"since": since, "language": language, "rank": rank})
+    return list(merged.values())
+
+
+def crawl_trending(sinces=None, languages=None, max_workers: int = CRAWL_CONCURRENCY) -> list:
+    """
+    并发抓取 since × language 矩阵中的所有 Trending 页面，合并去重后返回。
+    榜单顺序即矩阵顺序（since 优先），合并结果按首次出现排序。
+    """
+    if sinces is None or languages is None:
+        default_sinces, default_languages = default_matrix()
+        sinces = sinces or default_sinces
+        languages = languages if languages is not None else default_languages
+    matrix = [(since, language) for since in sinces for language in languages]
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(matrix)))) as pool:
+        results = list(pool.map(tracing.bind(lambda m: fetch_trending_page(*m)), matrix))
+
+    failed = [f"{s}/{l or 'all'}" for (s, l), r in zip(matrix, results) if r is None]
+    if failed:
+        log.warning("以下榜单抓取失败: %s", ", ".join(failed))
+    pages = [(s, l, r) for (s, l), r in zip(matrix, results) if r]
+    merged = merge_lists(pages)
+    log.info("共抓取 %d/%d 个榜单，合并后 %d 个仓库", len(pages), len(matrix), len(merged))
+    return merged
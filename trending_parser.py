@@ -0,0 +1,220 @@
+import logging
+import os
+import re
+
+log = logging.getLogger(__name__)
+
+# 解析后端优先级：selectolax > lxml > BeautifulSoup（html.parser）
+# 可用 TRENDING_PARSER 环境变量强制指定
+BACKEND_ORDER = ("selectolax", "lxml", "bs4")
+
+_ARTICLE_START = re.compile(r"<article\b", re.IGNORECASE)
+_ARTICLE_END = re.compile(r"</article\s*>", re.IGNORECASE)
+_STARS_TODAY = re.compile(r"([\d,]+)\s*stars?\s+(today|this week|this month)", re.IGNORECASE)
+# 解析时用不到的部分：svg 图标、tooltip、注释、data-* / aria-* 属性（hydro 点击统计的 JSON 很长）
+_NOISE = re.compile(
+    r'<svg\b.*?</svg\s*>|<tool-tip\b.*?</tool-tip\s*>|<!--.*?-->|\s(?:data|aria)-[\w-]+="[^"]*"',
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _slice_articles(html: str) -> str:
+    """只保留第一个 <article 到最后一个 </article> 之间的片段，跳过页头页脚"""
+    start = _ARTICLE_START.search(html)
+    if not start:
+        return ""
+    end = None
+    for end in _ARTICLE_END.finditer(html, start.start()):
+        pass
+    return html[start.start():end.end() if end else len(html)]
+
+
+def _join_stripped(texts) -> str:
+    """与 BeautifulSoup 的 get_text(strip=True) 一致：逐段去空白后直接拼接"""
+    return "".join(t.strip() for t in texts if t and t.strip())
+
+
+def _stars_today(text: str) -> str:
+    match = _STARS_TODAY.search(text or "")
+    return match.group(1) if match else "N/A"
+
+
+def parse_count(text) -> int:
+    """把 Trending 上显示的数字（如 "12,345"、"1.2k"）转成整数，无法解析返回 -1"""
+    text = (text or "").strip().replace(",", "").lower()
+    if not text:
+        return -1
+    scale = 1
+    if text[-1] in "km":
+        scale = 1000 if text[-1] == "k" else 1_000_000
+        text = text[:-1]
+    try:
+        return int(float(text) * scale)
+    except ValueError:
+        return -1
+
+
+def _build_repo(name, href, desc, stars, language, forks, stars_today, built_by) -> dict:
+    return {
+        "name": name.replace("\n", "").replace(" ", ""),
+        "url": "https://github.com" + href,
+        "desc": desc if desc is not None else "No description",
+        "stars": stars if stars is not None else "N/A",
+        "language": language or "",
+        "forks": forks if forks is not None else "N/A",
+        "stars_today": stars_today,
+        "built_by": built_by,
+    }
+
+
+# ---- selectolax ----
+def _selectolax_parser():
+    """selectolax 1.0 起推荐 lexbor 后端，老版本只有 modest（selectolax.parser）"""
+    try:
+        from selectolax.lexbor import LexborHTMLParser
+        return LexborHTMLParser
+    except ImportError:
+        from selectolax.parser import HTMLParser
+        return HTMLParser
+
+
+def _parse_selectolax(html: str) -> list:
+    HTMLParser = _selectolax_parser()
+
+    def text(node):
+        return node.text(deep=True, separator="", strip=True) if node is not None else None
+
+    repos = []
+    for article in HTMLParser(html).css("article.Box-row"):
+        try:
+            link = article.css_first("h2 a")
+            stars = forks = None
+            for a in article.css("a[href]"):
+                href = a.attributes.get("href") or ""
+                if stars is None and "stargazers" in href:
+                    stars = text(a)
+                elif forks is None and href.endswith("/forks"):
+                    forks = text(a)
+            lang = article.css_first('[itemprop="programmingLanguage"]')
+            built_by = [
+                (img.attributes.get("alt") or "").lstrip("@")
+                for img in article.css("img.avatar")
+                if img.attributes.get("alt")
+            ]
+            today = next((text(s) for s in article.css("span.float-sm-right")), "")
+            repos.append(_build_repo(
+                text(link), link.attributes["href"], text(article.css_first("p")),
+                stars, text(lang), forks, _stars_today(today), built_by,
+            ))
+        except Exception as e:
+            log.warning("解析仓库信息时出错: %s", e)
+    return repos
+
+
+# ---- lxml ----
+def _parse_lxml(html: str) -> list:
+    import lxml.html
+
+    def text(node):
+        return _join_stripped(node.xpath(".//text()")) if node is not None else None
+
+    def first(nodes):
+        return nodes[0] if nodes else None
+
+    repos = []
+    root = lxml.html.fromstring(html)
+    for article in root.xpath('//article[contains(concat(" ", normalize-space(@class), " "), " Box-row ")]'):
+        try:
+            link = first(article.xpath("(.//h2)[1]//a"))
+            stars = forks = None
+            for a in article.xpath(".//a[@href]"):
+                href = a.get("href")
+                if stars is None and "stargazers" in href:
+                    stars = text(a)
+                elif forks is None and href.endswith("/forks"):
+                    forks = text(a)
+            lang = first(article.xpath('.//*[@itemprop="programmingLanguage"]'))
+            built_by = [alt.lstrip("@") for alt in article.xpath('.//img[contains(@class, "avatar")]/@alt') if alt]
+            today = first(article.xpath('.//span[contains(@class, "float-sm-right")]'))
+            repos.append(_build_repo(
+                text(link), link.get("href"), text(first(article.xpath(".//p"))),
+                stars, text(lang), forks, _stars_today(text(today)), built_by,
+            ))
+        except Exception as e:
+            log.warning("解析仓库信息时出错: %s", e)
+    return repos
+
+
+# ---- BeautifulSoup（兜底实现）----
+def _parse_bs4(html: str) -> list:
+    from bs4 import BeautifulSoup
+
+    # html.parser 是纯 Python 实现，耗时与标签和字节数成正比：先去掉用不到的部分，
+    # 真实页面的 article 片段可缩小约 3/4
+    soup = BeautifulSoup(_NOISE.sub("", html), "html.parser")
+
+    repos = []
+    for repo in soup.find_all("article", class_="Box-row"):
+        try:
+            stars_tag = repo.find("a", href=lambda x: x and "stargazers" in x)
+            forks_tag = repo.find("a", href=lambda x: x and x.endswith("/forks"))
+            lang_tag = repo.find(attrs={"itemprop": "programmingLanguage"})
+            description_tag = repo.p
+            today_tag = repo.find("span", class_="float-sm-right")
+            built_by = [
+                img["alt"].lstrip("@")
+                for img in repo.find_all("img", class_="avatar")
+                if img.get("alt")
+            ]
+            repos.append(_build_repo(
+                repo.h2.a.get_text(strip=True), repo.h2.a["href"],
+                description_tag.get_text(strip=True) if description_tag else None,
+                stars_tag.get_text(strip=True) if stars_tag else None,
+                lang_tag.get_text(strip=True) if lang_tag else "",
+                forks_tag.get_text(strip=True) if forks_tag else None,
+                _stars_today(today_tag.get_text(" ", strip=True) if today_tag else ""),
+                built_by,
+            ))
+        except Exception as e:
+            log.warning("解析仓库信息时出错: %s", e)
+    return repos
+
+
+_PARSERS = {
+    "selectolax": (_selectolax_parser, _parse_selectolax),
+    "lxml": ("lxml.html", _parse_lxml),
+    "bs4": ("bs4", _parse_bs4),
+}
+
+
+def available_backends() -> list:
+    """当前环境中可用的解析后端"""
+    found = []
+    for name in BACKEND_ORDER:
+        probe = _PARSERS[name][0]
+        try:
+            probe() if callable(probe) else __import__(probe)
+            found.append(name)
+        except ImportError:
+            continue
+    return found
+
+
+def select_backend(preferred: str | None = None) -> str:
+    preferred = preferred or os.getenv("TRENDING_PARSER")
+    backends = available_backends()
+    if preferred:
+        if preferred not in backends:
+            raise ValueError(f"解析后端不可用: {preferred}（可用: {backends}）")
+        return preferred
+    if not backends:
+        raise ImportError("没有可用的 HTML 解析库，请安装 beautifulsoup4")
+    return backends[0]
+
+
+def parse_trending(html: str, backend: str | None = None) -> list:
+    """
+    解析 GitHub Trending 页面，返回仓库列表。
+    除原有的 name/url/desc/stars 外，还包含 language、forks、stars_today、built_by。
+    """
+    return _PARSERS[select_backend(backend)][1](_slice_articles(html))